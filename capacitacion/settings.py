@@ -219,3 +219,74 @@ CSP_FRAME_ANCESTORS = ["'self'", "http://localhost:5173"]
 
 EMAIL_BACKEND = 'django.core.mail.backends.console.EmailBackend'
 #AUTHENTICATION_BACKENDS = ['globalqhse.authentication.EmailBackend', 'django.contrib.auth.backends.ModelBackend']
+
+# Recálculo del progreso de los cursos.
+# 'sync': se recalcula dentro de la misma petición.
+# 'deferred': se encola por (estudiante, curso) al confirmar la transacción y lo procesan
+# los hilos locales (PROGRESO_WORKERS) o el comando `procesar_progresos_pendientes`.
+PROGRESO_MODO = os.getenv('PROGRESO_MODO', 'sync')
+PROGRESO_WORKERS = int(os.getenv('PROGRESO_WORKERS', '2'))
+
+# Caché de la estructura de los cursos (pruebas, subcursos y módulos).
+# Con varios procesos, ESTRUCTURA_CURSO_CACHE debe apuntar a una caché compartida.
+ESTRUCTURA_CURSO_CACHE = os.getenv('ESTRUCTURA_CURSO_CACHE', 'default')
+ESTRUCTURA_CURSO_TTL = int(os.getenv('ESTRUCTURA_CURSO_TTL', '3600'))
+
+# Procesos usados por el comando `importar_estudiantes` para hashear contraseñas (la API de
+# importación las hashea siempre en el proceso de la petición).
+IMPORTACION_WORKERS = int(os.getenv('IMPORTACION_WORKERS', str(os.cpu_count() or 1)))
+
+# Hilos que crean en segundo plano los registros de los estudiantes inscritos cuando un curso
+# gana subcursos, módulos o pruebas (0: se crean al confirmar la transacción, en la misma petición).
+INSCRIPCION_WORKERS = int(os.getenv('INSCRIPCION_WORKERS', '1'))
+
+# Hilos que reconcilian los contadores de los inscritos cuando se crean o eliminan módulos o
+# subcursos (0: se reconcilian al confirmar la transacción, en la misma petición).
+RECONCILIACION_WORKERS = int(os.getenv('RECONCILIACION_WORKERS', '1'))
+
+# Hilos que ejecutan las eliminaciones de inscripciones solicitadas con `asincrono`
+# (0: se ejecutan siempre dentro de la petición).
+CASCADA_WORKERS = int(os.getenv('CASCADA_WORKERS', '1'))
+
+# Qué hacer con las inscripciones al desactivar un contrato:
+# 'archivar' las mueve a las tablas de archivo (se restauran al reactivarlo); 'eliminar' las borra.
+CONTRATOS_DESACTIVACION = os.getenv('CONTRATOS_DESACTIVACION', 'archivar')
+
+# Generación en segundo plano de los PDF de los certificados (0: se generan al confirmar la
+# transacción, en la misma petición), reintentos por certificado y espera base entre reintentos (s).
+CERTIFICADO_WORKERS = int(os.getenv('CERTIFICADO_WORKERS', '2'))
+CERTIFICADO_REINTENTOS = int(os.getenv('CERTIFICADO_REINTENTOS', '3'))
+CERTIFICADO_ESPERA_REINTENTO = float(os.getenv('CERTIFICADO_ESPERA_REINTENTO', '2'))
+# Procesos usados por el comando `emitir_certificados_organizacion` para generar los PDF de la emisión
+# masiva (la API de emisión masiva los genera siempre en el proceso de la petición).
+CERTIFICADO_PROCESOS = int(os.getenv('CERTIFICADO_PROCESOS', str(os.cpu_count() or 1)))
+
+# Envío de los archivos descargados (certificados).
+# 'django': los envía el proceso de Python en bloques, con soporte de rangos.
+# 'x-accel': nginx los envía desde la ubicación interna DESCARGAS_X_ACCEL_PREFIJO (mapeada a MEDIA_ROOT).
+# 'x-sendfile': Apache/lighttpd los envían a partir de la ruta absoluta.
+DESCARGAS_MODO = os.getenv('DESCARGAS_MODO', 'django')
+DESCARGAS_X_ACCEL_PREFIJO = os.getenv('DESCARGAS_X_ACCEL_PREFIJO', '/protected/')
+
+# Segundos que los clientes y proxies pueden cachear las respuestas de la verificación pública de
+# certificados (válidos y no encontrados).
+VERIFICACION_CACHE = int(os.getenv('VERIFICACION_CACHE', '3600'))
+VERIFICACION_CACHE_NO_ENCONTRADO = int(os.getenv('VERIFICACION_CACHE_NO_ENCONTRADO', '60'))
+
+# Hilos que recalculan las métricas diarias de los códigos de organización modificados
+# (0: solo las recalcula el comando `reconstruir_metricas --pendientes`, p. ej. desde cron).
+METRICAS_WORKERS = int(os.getenv('METRICAS_WORKERS', '1'))
+
+# Caché de las respuestas de los endpoints de métricas (segundos; 0 la desactiva). Con varios
+# procesos, METRICAS_CACHE debe apuntar a una caché compartida. METRICAS_CACHE_ESPERA es lo que
+# espera una petición a que otro proceso termine de calcular la misma respuesta.
+METRICAS_CACHE = os.getenv('METRICAS_CACHE', 'default')
+METRICAS_CACHE_TTL = int(os.getenv('METRICAS_CACHE_TTL', '300'))
+METRICAS_CACHE_ESPERA = float(os.getenv('METRICAS_CACHE_ESPERA', '5'))
+
+# Registro de eventos de avance (tendencias). Los eventos de más de EVENTOS_RETENCION_DIAS se
+# resumen por día, los de más de EVENTOS_RESUMEN_SEMANAL_DIAS por semana y los de más de
+# EVENTOS_RETENCION_MAXIMA_DIAS se eliminan (0: se conservan) con el comando `compactar_eventos`.
+EVENTOS_RETENCION_DIAS = int(os.getenv('EVENTOS_RETENCION_DIAS', '90'))
+EVENTOS_RESUMEN_SEMANAL_DIAS = int(os.getenv('EVENTOS_RESUMEN_SEMANAL_DIAS', '365'))
+EVENTOS_RETENCION_MAXIMA_DIAS = int(os.getenv('EVENTOS_RETENCION_MAXIMA_DIAS', '730'))
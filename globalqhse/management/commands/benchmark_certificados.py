@@ -0,0 +1,80 @@
+import io
+import time
+from django.core.management.base import BaseCommand
+from reportlab.lib.colors import HexColor
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.pdfgen import canvas
+from globalqhse.utils.certificado import PlantillaCertificado
+
+
+def _onda(pdf, color, puntos):
+    pdf.setFillColor(HexColor(color))
+    camino = pdf.beginPath()
+    camino.moveTo(*puntos[0])
+    camino.curveTo(*puntos[1])
+    for punto in puntos[2:]:
+        camino.lineTo(*punto)
+    camino.close()
+    pdf.drawPath(camino, fill=1, stroke=0)
+
+
+def renderizar_con_reportlab(nombre, curso, fecha):
+    """
+    Dibujo completo de la página con ReportLab en cada certificado (la implementación anterior).
+    """
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=landscape(letter))
+    width, height = landscape(letter)
+    pdf.setFillColor(HexColor("#FFFFFF"))
+    pdf.rect(0, 0, width, height, fill=1)
+    _onda(pdf, "#2F4798", [(0, height), (width * 0.3, height - 100, width * 0.7, height - 50, width, height - 80), (width, height), (0, height)])
+    _onda(pdf, "#1A2E6F", [(0, height), (width * 0.3, height - 50, width * 0.7, height - 80, width, height - 60), (width, height), (0, height)])
+    pdf.setFillColor(HexColor("#C9A66B"))
+    pdf.setFont("Helvetica-Bold", 36)
+    pdf.drawCentredString(width / 2, height - 180, "CERTIFICADO DE RECONOCIMIENTO")
+    _onda(pdf, "#2F4798", [(0, 0), (width * 0.3, 100, width * 0.7, 50, width, 80), (width, 0), (0, 0)])
+    _onda(pdf, "#1A2E6F", [(0, 0), (width * 0.3, 50, width * 0.7, 80, width, 60), (width, 0), (0, 0)])
+    for texto, fuente, tamano, color, y in (
+        ("Otorgado a", "Helvetica", 16, "#333333", height - 250),
+        (nombre, "Helvetica-Bold", 28, "#4444AA", height - 300),
+        ("Por haber completado satisfactoriamente el siguiente curso:", "Helvetica", 16, "#333333", height - 350),
+        (curso, "Helvetica-Bold", 20, "#C9A66B", height - 400),
+        (f"Fecha de emisión: {fecha}", "Helvetica", 14, "#666666", height - 450),
+        ("Firma Autorizada - Global QHSE", "Helvetica-Bold", 14, "#333333", height - 520),
+    ):
+        pdf.setFont(fuente, tamano)
+        pdf.setFillColor(HexColor(color))
+        pdf.drawCentredString(width / 2, y, texto)
+    pdf.save()
+    return buffer.getvalue()
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide cuántos certificados por segundo se generan dibujando la página completa con ReportLab '
+        'y con la plantilla prerenderizada (solo la generación del PDF, sin base de datos ni almacenamiento).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--certificados', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        cantidad = options['certificados']
+        fecha = '01 de January de 2025'
+        plantilla = PlantillaCertificado.obtener()
+        resultados = {}
+        for nombre, renderizar in (
+            ('reportlab', renderizar_con_reportlab),
+            ('plantilla', plantilla.renderizar),
+        ):
+            inicio = time.perf_counter()
+            tamano = 0
+            for i in range(cantidad):
+                tamano += len(renderizar(f'Estudiante Número {i}', 'Seguridad y Salud Ocupacional', fecha))
+            duracion = time.perf_counter() - inicio
+            resultados[nombre] = cantidad / duracion
+            self.stdout.write(
+                f"{nombre:>10}: {cantidad} certificados en {duracion:.2f} s "
+                f"({resultados[nombre]:,.0f} certificados/s, {tamano / cantidad / 1024:.1f} KiB por PDF)"
+            )
+        self.stdout.write(f"Aceleración: {resultados['plantilla'] / resultados['reportlab']:.1f}x")
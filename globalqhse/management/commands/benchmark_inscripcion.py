@@ -0,0 +1,79 @@
+import time
+from datetime import date, timedelta
+from django.contrib.auth.hashers import make_password
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from globalqhse.models import Contrato, Curso, Empresa, Estudiante, Instructor, Modulo, Prueba, Subcurso
+from globalqhse.utils.estructura import EstructuraCurso
+from globalqhse.utils.inscripcion import InscripcionService
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la inscripción masiva de estudiantes en un curso (la ruta de ContratoAPIView.post). '
+        'Crea datos temporales en la base de datos configurada y los elimina al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--estudiantes', type=int, default=10000)
+        parser.add_argument('--subcursos', type=int, default=10)
+        parser.add_argument('--modulos', type=int, default=20, help='Módulos por subcurso.')
+        parser.add_argument('--lote', type=int, default=2000, help='Filas por sentencia INSERT.')
+
+    def handle(self, *args, **options):
+        empresa = Empresa.objects.create(
+            nombre='Benchmark Inscripcion', area='Benchmark', direccion='-', telefono='-',
+            correoElectronico='benchmark-inscripcion@example.com', numeroEmpleados=0,
+        )
+        try:
+            curso_id, estudiante_ids = self._preparar(empresa, options)
+
+            consultas = []
+
+            def contar(execute, sql, params, many, context):
+                consultas.append(sql)
+                return execute(sql, params, many, context)
+
+            inicio = time.perf_counter()
+            with connection.execute_wrapper(contar), transaction.atomic():
+                totales = InscripcionService.inscribir(estudiante_ids, [curso_id], batch_size=options['lote'])
+            duracion = time.perf_counter() - inicio
+
+            filas = sum(totales.values())
+            self.stdout.write(
+                f"{len(estudiante_ids)} estudiantes x {options['subcursos'] * options['modulos']} módulos: "
+                f"{filas} filas en {duracion:.2f} s ({filas / duracion:,.0f} filas/s), {len(consultas)} consultas"
+            )
+            for nombre, cantidad in totales.items():
+                self.stdout.write(f"{nombre:>10}: {cantidad}")
+        finally:
+            Curso.objects.filter(titulo__startswith='Benchmark Inscripcion').delete()
+            Estudiante.objects.filter(codigoOrganizacion='BENCH-INSC').delete()
+            empresa.delete()
+
+    def _preparar(self, empresa, options):
+        instructor = Instructor.objects.create(email='benchmark-inscripcion@example.com', empresa=empresa)
+        ancla = Curso.objects.create(titulo='Benchmark Inscripcion (ancla)', descripcion='Benchmark', simulacion=False)
+        curso = Curso.objects.create(titulo='Benchmark Inscripcion', descripcion='Benchmark', simulacion=False)
+        Contrato.objects.create(
+            instructor=instructor, curso=ancla, codigoOrganizacion='BENCH-INSC',
+            fechaInicioCapacitacion=date.today(), fechaFinCapacitacion=date.today() + timedelta(days=1),
+        )
+        Prueba.objects.create(curso=curso, duracion=30)
+        for i in range(options['subcursos']):
+            subcurso = Subcurso.objects.create(curso=curso, nombre=f'Subcurso {i}')
+            Modulo.objects.bulk_create(
+                [Modulo(subcurso=subcurso, nombre=f'Módulo {j}') for j in range(options['modulos'])]
+            )
+        # bulk_create no dispara post_save: se descarta a mano la estructura cacheada del curso.
+        EstructuraCurso.invalidar(curso.id)
+
+        password = make_password('Benchmark123')
+        with transaction.atomic():
+            for i in range(options['estudiantes']):
+                Estudiante(
+                    email=f'benchmark-inscripcion-{i}@example.com', password=password,
+                    codigoOrganizacion='BENCH-INSC', first_name='Benchmark', last_name=str(i),
+                ).save()
+        estudiante_ids = list(Estudiante.objects.filter(codigoOrganizacion='BENCH-INSC').values_list('id', flat=True))
+        return curso.id, estudiante_ids
@@ -0,0 +1,87 @@
+import time
+from datetime import date, timedelta
+from django.core.management.base import BaseCommand
+from django.test.utils import override_settings
+from globalqhse.models import (
+    Contrato, Curso, Empresa, Estudiante, EstudianteModulo, Instructor, Modulo, Progreso, Subcurso,
+)
+from globalqhse.utils.cola_progreso import ColaProgreso
+from globalqhse.utils.estructura import EstructuraCurso
+from globalqhse.utils.progreso import ProgresoService
+
+
+class Command(BaseCommand):
+    help = (
+        'Mide la latencia de marcar módulos como completados en modo síncrono y diferido. '
+        'Crea datos temporales en la base de datos configurada y los elimina al terminar.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--estudiantes', type=int, default=20)
+        parser.add_argument('--subcursos', type=int, default=5)
+        parser.add_argument('--modulos', type=int, default=10, help='Módulos por subcurso.')
+
+    def handle(self, *args, **options):
+        empresa = Empresa.objects.create(
+            nombre='Benchmark Progreso', area='Benchmark', direccion='-', telefono='-',
+            correoElectronico='benchmark-progreso@example.com', numeroEmpleados=0,
+        )
+        try:
+            curso_id = self._preparar(empresa, options)
+            subcurso_ids = list(Subcurso.objects.filter(curso_id=curso_id).values_list('id', flat=True))
+            modulo_ids = list(Modulo.objects.filter(subcurso_id__in=subcurso_ids).values_list('id', flat=True))
+            estudiante_ids = list(Estudiante.objects.filter(codigoOrganizacion='BENCH-PROG').values_list('id', flat=True))
+
+            resultados = {}
+            for modo in ('sync', 'deferred'):
+                with override_settings(PROGRESO_MODO=modo, PROGRESO_WORKERS=0):
+                    EstudianteModulo.objects.filter(estudiante_id__in=estudiante_ids).update(completado=False)
+                    ProgresoService.reconciliar_subcursos(estudiante_ids, subcurso_ids)
+                    ProgresoService.reconciliar_progresos(estudiante_ids, curso_id)
+                    inicio = time.perf_counter()
+                    for estudiante_id in estudiante_ids:
+                        for modulo_id in modulo_ids:
+                            ProgresoService.actualizar_modulo(estudiante_id, modulo_id, True)
+                    escritura = time.perf_counter() - inicio
+
+                    inicio = time.perf_counter()
+                    ColaProgreso.drenar()
+                    drenado = time.perf_counter() - inicio
+                resultados[modo] = (escritura, drenado)
+
+                completos = Progreso.objects.filter(estudiante_id__in=estudiante_ids, contenidoCompletado=True).count()
+                self.stdout.write(f"[{modo}] progresos con contenido completo: {completos}/{len(estudiante_ids)}")
+
+            operaciones = len(estudiante_ids) * len(modulo_ids)
+            for modo, (escritura, drenado) in resultados.items():
+                self.stdout.write(
+                    f"{modo:>9}: {operaciones} escrituras, {escritura * 1000 / operaciones:.2f} ms/escritura, "
+                    f"drenado {drenado * 1000:.1f} ms"
+                )
+            sync, deferred = resultados['sync'][0], resultados['deferred'][0]
+            self.stdout.write(f"Reducción de latencia en la ruta de escritura: {(1 - deferred / sync) * 100:.1f}%")
+        finally:
+            Curso.objects.filter(titulo='Benchmark Progreso').delete()
+            Estudiante.objects.filter(codigoOrganizacion='BENCH-PROG').delete()
+            empresa.delete()
+
+    def _preparar(self, empresa, options):
+        instructor = Instructor.objects.create(email='benchmark-progreso@example.com', empresa=empresa)
+        curso = Curso.objects.create(titulo='Benchmark Progreso', descripcion='Benchmark', simulacion=False)
+        Contrato.objects.create(
+            instructor=instructor, curso=curso, codigoOrganizacion='BENCH-PROG',
+            fechaInicioCapacitacion=date.today(), fechaFinCapacitacion=date.today() + timedelta(days=1),
+        )
+        for i in range(options['subcursos']):
+            subcurso = Subcurso.objects.create(curso=curso, nombre=f'Subcurso {i}')
+            Modulo.objects.bulk_create(
+                [Modulo(subcurso=subcurso, nombre=f'Módulo {j}') for j in range(options['modulos'])]
+            )
+        # bulk_create no dispara post_save: se descarta a mano la estructura cacheada del curso.
+        EstructuraCurso.invalidar(curso.id)
+        for i in range(options['estudiantes']):
+            Estudiante.crear_estudiante_con_cursos(
+                email=f'benchmark-progreso-{i}@example.com', password='Benchmark123',
+                codigoOrganizacion='BENCH-PROG', first_name='Benchmark', last_name=str(i),
+            )
+        return curso.id
@@ -0,0 +1,18 @@
+from datetime import date
+from django.core.management.base import BaseCommand
+from globalqhse.utils.eventos import EventosAvance
+
+
+class Command(BaseCommand):
+    help = 'Resume por día y por semana los eventos de avance antiguos y elimina los que superan la retención.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--hoy', type=date.fromisoformat, help='Fecha de referencia (AAAA-MM-DD); por defecto, hoy.')
+
+    def handle(self, *args, **options):
+        resumen = EventosAvance.compactar(hoy=options['hoy'])
+        self.stdout.write(
+            f"Proceso completado. Eliminados por retención: {resumen['eliminados']}. "
+            f"Resumen diario: {resumen['diarios'][0]} filas en {resumen['diarios'][1]}. "
+            f"Resumen semanal: {resumen['semanales'][0]} filas en {resumen['semanales'][1]}."
+        )
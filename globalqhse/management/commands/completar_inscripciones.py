@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand
+from globalqhse.models import Curso
+from globalqhse.utils.inscripcion import InscripcionService
+
+
+class Command(BaseCommand):
+    help = (
+        'Crea los registros de subcursos, módulos y pruebas que les faltan a los estudiantes inscritos '
+        'y recalcula su progreso.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--curso', type=int, help='Limita el proceso a un curso.')
+        parser.add_argument('--lote', type=int, default=500, help='Estudiantes por transacción.')
+
+    def handle(self, *args, **options):
+        cursos = Curso.objects.all()
+        if options['curso']:
+            cursos = cursos.filter(id=options['curso'])
+
+        total = 0
+        for curso_id in cursos.values_list('id', flat=True):
+            total += InscripcionService.completar_inscripciones(curso_id, lote=options['lote'])
+        self.stdout.write(f"Proceso completado. Total registros creados: {total}")
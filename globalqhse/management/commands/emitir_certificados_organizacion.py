@@ -0,0 +1,30 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from globalqhse.utils.emision_masiva import EmisionMasivaCertificados
+
+
+class Command(BaseCommand):
+    help = (
+        'Emite los certificados de todos los estudiantes de un código de organización que completaron '
+        'sus cursos. Si se interrumpe, se retoma volviendo a ejecutarlo.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('codigo', help='Código de organización.')
+        parser.add_argument('--curso', type=int, action='append', dest='cursos', help='Limitar a un curso (repetible).')
+        parser.add_argument('--lote', type=int, default=500, help='Certificados por transacción.')
+        parser.add_argument('--procesos', type=int, help='Procesos para generar los PDF (por defecto CERTIFICADO_PROCESOS).')
+
+    def handle(self, *args, **options):
+        emision = EmisionMasivaCertificados(
+            options['codigo'], curso_ids=options['cursos'], lote=options['lote'],
+            procesos=options['procesos'] or getattr(settings, 'CERTIFICADO_PROCESOS', 1),
+        )
+        resumen = emision.emitir()
+        for error in resumen['errores']:
+            self.stderr.write(f"Estudiante {error['estudiante_id']}, curso {error['curso_id']}: {error['error']}")
+        self.stdout.write(
+            f"Proceso completado. Elegibles: {resumen['elegibles']}. Emitidos: {resumen['emitidos']} "
+            f"en {resumen['segundos']:.2f} s ({resumen['certificados_por_segundo']:,.0f} certificados/s). "
+            f"Errores: {len(resumen['errores'])}"
+        )
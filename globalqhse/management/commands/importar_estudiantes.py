@@ -0,0 +1,35 @@
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from globalqhse.utils.importacion import ImportacionEstudiantes
+
+
+class Command(BaseCommand):
+    help = 'Importa estudiantes de un código de organización desde un archivo CSV o JSONL.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('archivo', help='Ruta del archivo CSV (con encabezado) o JSONL.')
+        parser.add_argument('--codigo', required=True, help='Código de organización del contrato.')
+        parser.add_argument('--formato', choices=['csv', 'jsonl'], help='Por defecto se deduce de la extensión.')
+        parser.add_argument('--lote', type=int, default=1000, help='Filas por transacción.')
+        parser.add_argument('--workers', type=int, help='Procesos para hashear contraseñas (por defecto IMPORTACION_WORKERS).')
+
+    def handle(self, *args, **options):
+        try:
+            formato = ImportacionEstudiantes.detectar_formato(options['archivo'], options['formato'])
+            importacion = ImportacionEstudiantes(
+                options['codigo'], lote=options['lote'],
+                workers=options['workers'] or getattr(settings, 'IMPORTACION_WORKERS', 1),
+            )
+        except ValidationError as e:
+            raise CommandError(e.messages[0])
+
+        with open(options['archivo'], 'rb') as archivo:
+            resumen = importacion.importar(archivo, formato)
+
+        for error in resumen['errores']:
+            self.stderr.write(f"Fila {error['fila']} ({error['email']}): {error['error']}")
+        self.stdout.write(
+            f"Proceso completado. Filas procesadas: {resumen['procesadas']}. "
+            f"Estudiantes creados: {resumen['creados']}. Errores: {len(resumen['errores'])}"
+        )
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from globalqhse.utils.cola_certificados import ColaCertificados
+
+
+class Command(BaseCommand):
+    help = (
+        'Genera los PDF de los certificados pendientes (por ejemplo, los que dejó sin generar un '
+        'proceso interrumpido). Con --fallidos también vuelve a intentar los certificados fallidos.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fallidos', action='store_true', help='Reintentar también los certificados fallidos.')
+
+    def handle(self, *args, **options):
+        resumen = ColaCertificados.drenar(reintentar_fallidos=options['fallidos'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Certificados generados: {resumen['listo']}, fallidos: {resumen['fallido']}."
+        ))
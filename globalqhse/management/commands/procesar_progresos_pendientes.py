@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+from globalqhse.utils.cola_progreso import ColaProgreso
+
+
+class Command(BaseCommand):
+    help = 'Procesa los recálculos de progreso encolados en modo diferido.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--lote', type=int, default=500, help='Cantidad de solicitudes por transacción.')
+
+    def handle(self, *args, **options):
+        procesadas = ColaProgreso.drenar(lote=options['lote'])
+        self.stdout.write(f"Proceso completado. Total progresos recalculados: {procesadas}")
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from globalqhse.utils.cascada import CascadaInscripciones
+
+
+class Command(BaseCommand):
+    help = (
+        'Reanuda las tareas de eliminación, archivo o restauración de inscripciones que quedaron '
+        'pendientes o en proceso (por ejemplo, tras reiniciar el servidor). Ejecútelo cuando ningún '
+        'otro proceso esté trabajando en ellas.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('tareas', nargs='*', type=int, help='IDs de las tareas; por defecto, todas las interrumpidas.')
+        parser.add_argument('--lote', type=int, default=1000, help='Filas por lote.')
+
+    def handle(self, *args, **options):
+        tarea_ids = CascadaInscripciones.reanudar(options['tareas'], lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f"Tareas reanudadas: {len(tarea_ids)}."))
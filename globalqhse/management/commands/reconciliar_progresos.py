@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from globalqhse.utils.progreso import ProgresoService
+
+
+class Command(BaseCommand):
+    help = 'Corrige los contadores de progreso que se hayan desviado de los registros de módulos y subcursos.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--curso', type=int, help='Limita la reconciliación a un curso.')
+        parser.add_argument('--lote', type=int, default=5000, help='Cantidad de filas por transacción.')
+
+    def handle(self, *args, **options):
+        subcursos, progresos = ProgresoService.reparar_contadores(curso_id=options['curso'], lote=options['lote'])
+        self.stdout.write(
+            f"Proceso completado. Subcursos corregidos: {subcursos}. Progresos corregidos: {progresos}"
+        )
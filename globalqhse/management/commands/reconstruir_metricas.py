@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from globalqhse.utils.metricas_diarias import MetricasDiarias
+
+
+class Command(BaseCommand):
+    help = 'Reconstruye desde cero las métricas diarias de todos los códigos de organización.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--pendientes', action='store_true',
+            help='Recalcula solo los códigos marcados como pendientes (para ejecutarlo periódicamente).',
+        )
+        parser.add_argument('--lote', type=int, default=200, help='Cantidad de códigos por transacción.')
+
+    def handle(self, *args, **options):
+        if options['pendientes']:
+            procesados = MetricasDiarias.drenar(lote=options['lote'])
+        else:
+            procesados = MetricasDiarias.reconstruir(lote=options['lote'])
+        self.stdout.write(f"Proceso completado. Total códigos recalculados: {procesados}")
@@ -0,0 +1,28 @@
+# Generated by Django 4.2 on 2026-10-18 18:15
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('globalqhse', '0003_alter_contrato_unique_together_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProgresoPendiente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fechaSolicitud', models.DateTimeField(auto_now_add=True)),
+                ('curso', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progresos_pendientes', to='globalqhse.curso')),
+                ('estudiante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progresos_pendientes', to='globalqhse.estudiante')),
+            ],
+            options={
+                'verbose_name': 'Progreso pendiente',
+                'verbose_name_plural': 'Progresos pendientes',
+                'unique_together': {('estudiante', 'curso')},
+            },
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 4.2 on 2026-10-18 18:20
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def _conteo(queryset, campo_grupo):
+    subconsulta = queryset.order_by().values(campo_grupo).annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(subconsulta), Value(0))
+
+
+def poblar_contadores(apps, schema_editor):
+    EstudianteSubcurso = apps.get_model('globalqhse', 'EstudianteSubcurso')
+    EstudianteModulo = apps.get_model('globalqhse', 'EstudianteModulo')
+    Modulo = apps.get_model('globalqhse', 'Modulo')
+    Subcurso = apps.get_model('globalqhse', 'Subcurso')
+    Progreso = apps.get_model('globalqhse', 'Progreso')
+
+    EstudianteSubcurso.objects.update(
+        modulos_totales=_conteo(Modulo.objects.filter(subcurso_id=OuterRef('subcurso_id')), 'subcurso_id'),
+        modulos_completados=_conteo(
+            EstudianteModulo.objects.filter(
+                estudiante_id=OuterRef('estudiante_id'),
+                modulo__subcurso_id=OuterRef('subcurso_id'),
+                completado=True,
+            ),
+            'estudiante_id',
+        ),
+    )
+    estudiante_subcursos = EstudianteSubcurso.objects.filter(
+        estudiante_id=OuterRef('estudiante_id'),
+        subcurso__curso_id=OuterRef('curso_id'),
+    ).order_by().values('estudiante_id')
+    Progreso.objects.update(
+        subcursos_totales=_conteo(Subcurso.objects.filter(curso_id=OuterRef('curso_id')), 'curso_id'),
+        subcursos_completados=_conteo(estudiante_subcursos.filter(completado=True), 'estudiante_id'),
+        suma_porcentajes_subcursos=Coalesce(
+            Subquery(estudiante_subcursos.annotate(s=Sum('porcentajeCompletado')).values('s')),
+            Value(0.0),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('globalqhse', '0004_progresopendiente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='estudiantesubcurso',
+            name='modulos_completados',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='estudiantesubcurso',
+            name='modulos_totales',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='progreso',
+            name='subcursos_completados',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='progreso',
+            name='subcursos_totales',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='progreso',
+            name='suma_porcentajes_subcursos',
+            field=models.FloatField(default=0.0),
+        ),
+        migrations.RunPython(poblar_contadores, migrations.RunPython.noop),
+    ]
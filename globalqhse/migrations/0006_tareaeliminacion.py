@@ -0,0 +1,31 @@
+# Generated by Django 4.2 on 2026-10-18 18:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('globalqhse', '0005_contadores_progreso'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TareaEliminacion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigoOrganizacion', models.CharField(max_length=100)),
+                ('cursos', models.JSONField(default=list)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('en_proceso', 'En proceso'), ('completada', 'Completada'), ('fallida', 'Fallida')], default='pendiente', max_length=20)),
+                ('total', models.IntegerField(default=0)),
+                ('eliminados', models.IntegerField(default=0)),
+                ('error', models.TextField(blank=True, null=True)),
+                ('fechaCreacion', models.DateTimeField(auto_now_add=True)),
+                ('fechaFin', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Tarea de eliminación',
+                'verbose_name_plural': 'Tareas de eliminación',
+            },
+        ),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2 on 2026-10-18 18:33
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('globalqhse', '0006_tareaeliminacion'),
+    ]
+
+    operations = [
+        migrations.RenameField(
+            model_name='tareaeliminacion',
+            old_name='eliminados',
+            new_name='procesados',
+        ),
+        migrations.AddField(
+            model_name='tareaeliminacion',
+            name='operacion',
+            field=models.CharField(choices=[('eliminar', 'Eliminar'), ('archivar', 'Archivar'), ('restaurar', 'Restaurar')], default='eliminar', max_length=20),
+        ),
+        migrations.CreateModel(
+            name='ProgresoArchivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('simulacionCompletada', models.BooleanField(null=True)),
+                ('fechaInicioCurso', models.DateField(null=True)),
+                ('fechaFinCurso', models.DateField(null=True)),
+                ('fechaArchivo', models.DateTimeField()),
+                ('curso', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progresos_archivados', to='globalqhse.curso')),
+                ('estudiante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='progresos_archivados', to='globalqhse.estudiante')),
+            ],
+            options={
+                'verbose_name': 'Progreso archivado',
+                'verbose_name_plural': 'Progresos archivados',
+                'unique_together': {('estudiante', 'curso')},
+            },
+        ),
+        migrations.CreateModel(
+            name='EstudiantePruebaArchivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estaAprobado', models.BooleanField(default=False)),
+                ('calificacion', models.FloatField(default=0.0)),
+                ('intento', models.IntegerField(default=0)),
+                ('fechaPrueba', models.DateField()),
+                ('fechaArchivo', models.DateTimeField()),
+                ('estudiante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='pruebas_archivadas', to='globalqhse.estudiante')),
+                ('prueba', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archivados', to='globalqhse.prueba')),
+            ],
+            options={
+                'verbose_name': 'Estudiante-Prueba archivado',
+                'verbose_name_plural': 'Estudiantes-Pruebas archivados',
+                'unique_together': {('estudiante', 'prueba')},
+            },
+        ),
+        migrations.CreateModel(
+            name='EstudianteModuloArchivado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fechaArchivo', models.DateTimeField()),
+                ('estudiante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='modulos_archivados', to='globalqhse.estudiante')),
+                ('modulo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archivados', to='globalqhse.modulo')),
+            ],
+            options={
+                'verbose_name': 'Estudiante-Modulo archivado',
+                'verbose_name_plural': 'Estudiantes-Modulos archivados',
+                'unique_together': {('estudiante', 'modulo')},
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 4.2 on 2026-10-18 18:37
+
+from django.db import migrations, models
+
+
+def marcar_emitidos(apps, schema_editor):
+    """
+    Los certificados existentes con PDF ya están listos; los que no lo tienen quedan pendientes.
+    """
+    Certificado = apps.get_model('globalqhse', 'Certificado')
+    Certificado.objects.exclude(archivoPdf__isnull=True).exclude(archivoPdf='').update(estado='listo')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('globalqhse', '0007_archivo_inscripciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificado',
+            name='error',
+            field=models.TextField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='certificado',
+            name='estado',
+            field=models.CharField(choices=[('pendiente', 'Pendiente'), ('listo', 'Listo'), ('fallido', 'Fallido')], default='pendiente', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='certificado',
+            name='intentos',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(marcar_emitidos, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+import hashlib
+
+from django.db import migrations, models
+
+import globalqhse.models
+
+
+def asignar_verificacion(apps, schema_editor):
+    """
+    Asigna un código de verificación a los certificados existentes y registra el SHA-256 de los
+    PDF que siguen en el almacenamiento.
+    """
+    Certificado = apps.get_model('globalqhse', 'Certificado')
+    for certificado in Certificado.objects.filter(codigoVerificacion__isnull=True).iterator():
+        certificado.codigoVerificacion = globalqhse.models.generar_codigo_verificacion()
+        if certificado.archivoPdf:
+            try:
+                with certificado.archivoPdf.open('rb') as archivo:
+                    certificado.hashPdf = hashlib.sha256(archivo.read()).hexdigest()
+            except (FileNotFoundError, ValueError):
+                pass
+        certificado.save(update_fields=['codigoVerificacion', 'hashPdf'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('globalqhse', '0008_estado_certificado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='certificado',
+            name='codigoVerificacion',
+            field=models.CharField(max_length=10, null=True),
+        ),
+        migrations.AddField(
+            model_name='certificado',
+            name='hashPdf',
+            field=models.CharField(blank=True, db_index=True, max_length=64, null=True),
+        ),
+        migrations.RunPython(asignar_verificacion, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='certificado',
+            name='codigoVerificacion',
+            field=models.CharField(default=globalqhse.models.generar_codigo_verificacion, max_length=10, null=True, unique=True),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2 on 2026-10-18 18:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('globalqhse', '0009_verificacion_certificado'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MetricaPendiente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigoOrganizacion', models.CharField(max_length=100, unique=True)),
+                ('fechaSolicitud', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Métrica pendiente',
+                'verbose_name_plural': 'Métricas pendientes',
+            },
+        ),
+        migrations.CreateModel(
+            name='MetricaDiaria',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('codigoOrganizacion', models.CharField(db_index=True, max_length=100)),
+                ('dia', models.DateField()),
+                ('fechaInicioCapacitacion', models.DateField(null=True)),
+                ('fechaFinCapacitacion', models.DateField(null=True)),
+                ('estudiantes', models.PositiveIntegerField(default=0)),
+                ('certificados', models.PositiveIntegerField(default=0)),
+                ('pruebas', models.PositiveIntegerField(default=0)),
+                ('pruebasAprobadas', models.PositiveIntegerField(default=0)),
+                ('curso', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='metricas_diarias', to='globalqhse.curso')),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metricas_diarias', to='globalqhse.empresa')),
+                ('instructor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metricas_diarias', to='globalqhse.instructor')),
+            ],
+            options={
+                'verbose_name': 'Métrica diaria',
+                'verbose_name_plural': 'Métricas diarias',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='metricadiaria',
+            index=models.Index(fields=['empresa', 'curso'], name='metrica_empresa_curso_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='metricadiaria',
+            index=models.Index(fields=['instructor', 'curso'], name='metrica_instructor_curso_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='metricadiaria',
+            index=models.Index(fields=['curso', 'dia'], name='metrica_curso_dia_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-18 18:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('globalqhse', '0010_metricas_diarias'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='metricadiaria',
+            name='progresos',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='metricadiaria',
+            name='sumaPorcentajes',
+            field=models.FloatField(default=0.0),
+        ),
+    ]
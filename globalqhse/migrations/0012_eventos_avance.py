@@ -0,0 +1,43 @@
+# Generated by Django 4.2 on 2026-10-18 18:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('globalqhse', '0011_progreso_metricas_diarias'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventoAvance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.PositiveSmallIntegerField(choices=[(1, 'Módulo completado'), (2, 'Prueba aprobada'), (3, 'Simulación completada'), (4, 'Curso completado')])),
+                ('objeto', models.PositiveIntegerField(null=True)),
+                ('fecha', models.DateField()),
+                ('cantidad', models.PositiveIntegerField(default=1)),
+                ('curso', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='eventos_avance', to='globalqhse.curso')),
+                ('empresa', models.ForeignKey(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='eventos_avance', to='globalqhse.empresa')),
+                ('estudiante', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='eventos_avance', to='globalqhse.estudiante')),
+            ],
+            options={
+                'verbose_name': 'Evento de avance',
+                'verbose_name_plural': 'Eventos de avance',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='eventoavance',
+            index=models.Index(fields=['curso', 'tipo', 'fecha'], name='evento_curso_tipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventoavance',
+            index=models.Index(fields=['empresa', 'tipo', 'fecha'], name='evento_empresa_tipo_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='eventoavance',
+            index=models.Index(fields=['tipo', 'fecha'], name='evento_tipo_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 4.2 on 2026-10-18 19:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('globalqhse', '0012_eventos_avance'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RankingInstructor',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('instructores', models.PositiveIntegerField(default=0)),
+                ('estudiantes', models.PositiveIntegerField(default=0)),
+                ('certificados', models.PositiveIntegerField(default=0)),
+                ('pruebas', models.PositiveIntegerField(default=0)),
+                ('pruebasAprobadas', models.PositiveIntegerField(default=0)),
+                ('tasaCertificacion', models.FloatField(default=0.0)),
+                ('tasaAprobacion', models.FloatField(default=0.0)),
+                ('progresoPromedio', models.FloatField(default=0.0)),
+                ('posicionEmpresaCertificacion', models.PositiveIntegerField(null=True)),
+                ('posicionEmpresaAprobacion', models.PositiveIntegerField(null=True)),
+                ('posicionEmpresaProgreso', models.PositiveIntegerField(null=True)),
+                ('posicionCertificacion', models.PositiveIntegerField(null=True)),
+                ('posicionAprobacion', models.PositiveIntegerField(null=True)),
+                ('posicionProgreso', models.PositiveIntegerField(null=True)),
+                ('fechaActualizacion', models.DateTimeField(auto_now=True)),
+                ('empresa', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ranking', to='globalqhse.empresa')),
+                ('instructor', models.OneToOneField(null=True, on_delete=django.db.models.deletion.CASCADE, related_name='ranking', to='globalqhse.instructor')),
+            ],
+            options={
+                'verbose_name': 'Ranking de instructor',
+                'verbose_name_plural': 'Ranking de instructores',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='rankinginstructor',
+            index=models.Index(fields=['empresa', 'posicionEmpresaCertificacion'], name='ranking_empresa_cert_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rankinginstructor',
+            index=models.Index(fields=['empresa', 'posicionEmpresaAprobacion'], name='ranking_empresa_aprob_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rankinginstructor',
+            index=models.Index(fields=['empresa', 'posicionEmpresaProgreso'], name='ranking_empresa_prog_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rankinginstructor',
+            index=models.Index(fields=['posicionCertificacion'], name='ranking_cert_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rankinginstructor',
+            index=models.Index(fields=['posicionAprobacion'], name='ranking_aprob_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='rankinginstructor',
+            index=models.Index(fields=['posicionProgreso'], name='ranking_prog_idx'),
+        ),
+    ]
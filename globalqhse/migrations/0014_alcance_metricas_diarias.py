@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-18 21:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('globalqhse', '0013_ranking_instructores'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='metricadiaria',
+            name='alcance',
+            field=models.PositiveSmallIntegerField(default=3),
+        ),
+    ]
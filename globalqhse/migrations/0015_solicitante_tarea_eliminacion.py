@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-18 21:10
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('globalqhse', '0014_alcance_metricas_diarias'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='tareaeliminacion',
+            name='solicitante',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='tareas_eliminacion', to=settings.AUTH_USER_MODEL),
+        ),
+    ]
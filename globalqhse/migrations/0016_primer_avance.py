@@ -0,0 +1,49 @@
+# Generated by Django 4.2 on 2026-10-18 21:20
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def marcar_primeros_avances(apps, schema_editor):
+    """
+    Crea la marca de primer avance de cada evento que aún conserva su estudiante.
+    """
+    EventoAvance = apps.get_model('globalqhse', 'EventoAvance')
+    PrimerAvance = apps.get_model('globalqhse', 'PrimerAvance')
+    avances = (
+        EventoAvance.objects.filter(estudiante__isnull=False)
+        .values_list('tipo', 'estudiante_id', 'curso_id', 'objeto').distinct().iterator()
+    )
+    lote = []
+    for tipo, estudiante_id, curso_id, objeto in avances:
+        lote.append(PrimerAvance(tipo=tipo, estudiante_id=estudiante_id, curso_id=curso_id, objeto=objeto or 0))
+        if len(lote) >= 1000:
+            PrimerAvance.objects.bulk_create(lote, ignore_conflicts=True)
+            lote = []
+    PrimerAvance.objects.bulk_create(lote, ignore_conflicts=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('globalqhse', '0015_solicitante_tarea_eliminacion'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PrimerAvance',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.PositiveSmallIntegerField(choices=[(1, 'Módulo completado'), (2, 'Prueba aprobada'), (3, 'Simulación completada'), (4, 'Curso completado')])),
+                ('objeto', models.PositiveIntegerField(default=0)),
+                ('curso', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='primeros_avances', to='globalqhse.curso')),
+                ('estudiante', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='primeros_avances', to='globalqhse.estudiante')),
+            ],
+            options={
+                'verbose_name': 'Primer avance',
+                'verbose_name_plural': 'Primeros avances',
+                'unique_together': {('estudiante', 'tipo', 'curso', 'objeto')},
+            },
+        ),
+        migrations.RunPython(marcar_primeros_avances, migrations.RunPython.noop),
+    ]
@@ -2,28 +2,20 @@ from datetime import datetime
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
-from reportlab.pdfgen import canvas
-from reportlab.lib.colors import HexColor
 from django.db.models import Q
-from reportlab.lib.pagesizes import letter,landscape
 from rest_framework.response import Response
 from rest_framework import status
-import pytz
 from django.core.exceptions import ValidationError
 import random
 import string
 import secrets
+import hashlib
 from django.db import transaction
 from django.core.files.base import File
-from reportlab.pdfgen import canvas
 import os
 import io
-from django.utils.timezone import now
 import logging
 from io import BytesIO
-from reportlab.lib.pagesizes import letter
-from reportlab.pdfgen import canvas
-from reportlab.lib import colors
 logger = logging.getLogger(__name__)
 
 
@@ -243,6 +235,9 @@ class Progreso(models.Model):
     porcentajeCompletado = models.FloatField(default=0)
     fechaInicioCurso=models.DateField(auto_now_add=True,null=True)
     fechaFinCurso=models.DateField(null=True)
+    subcursos_completados = models.IntegerField(default=0)
+    subcursos_totales = models.IntegerField(default=0)
+    suma_porcentajes_subcursos = models.FloatField(default=0.0)
     _skip_post_save = False
 
     class Meta:
@@ -256,69 +251,75 @@ class Progreso(models.Model):
     def calcular_porcentaje_completado(self):
         """
         Calcula el porcentaje completado del curso basado en el progreso de subcursos, módulos, simulaciones y pruebas.
-								   
+        El cálculo lo realiza el motor de progreso en la base de datos; la instancia se refresca con el resultado.
         """
-        
-        subcursos = Subcurso.objects.filter(curso=self.curso)
-        total_subcursos = subcursos.count() or 1  
-
-       
-        avance_total_subcursos = 0
-        for subcurso in subcursos:
-            estudiante_subcurso = EstudianteSubcurso.objects.filter(
-                estudiante=self.estudiante, subcurso=subcurso
-            ).first()
-            if estudiante_subcurso:
-                avance_total_subcursos += estudiante_subcurso.porcentajeCompletado
-
-        
-        porcentaje_contenido = avance_total_subcursos / total_subcursos
-
-        
-        simulacion_completada = self.simulacionCompletada or False
-        prueba = EstudiantePrueba.objects.filter(estudiante=self.estudiante, prueba__curso=self.curso).first()
-        esta_aprobado = prueba.estaAprobado if prueba else False
+        from .utils.progreso import ProgresoService
+
+        ProgresoService.reconciliar_progresos(self.estudiante_id, self.curso_id)
+        self.refresh_from_db(fields=[
+            'porcentajeCompletado', 'contenidoCompletado', 'completado',
+            'subcursos_completados', 'subcursos_totales', 'suma_porcentajes_subcursos',
+        ])
+
+class ProgresoPendiente(models.Model):
+    """
+    Cola de recálculos de progreso pendientes, uno por (estudiante, curso).
+    """
+    estudiante = models.ForeignKey('Estudiante', on_delete=models.CASCADE, related_name='progresos_pendientes')
+    curso = models.ForeignKey(Curso, on_delete=models.CASCADE, related_name='progresos_pendientes')
+    fechaSolicitud = models.DateTimeField(auto_now_add=True)
 
-        
-        if self.curso.simulacion:
-           
-            peso_contenido = 0.5
-            peso_simulacion = 0.3
-            peso_prueba = 0.2
-
-            porcentaje_simulacion = 100 if simulacion_completada else 0
-            porcentaje_prueba = 100 if esta_aprobado else 0
-
-            self.porcentajeCompletado = (
-                (porcentaje_contenido * peso_contenido) +
-                (porcentaje_simulacion * peso_simulacion) +
-                (porcentaje_prueba * peso_prueba)
-            )
-        else:
-            
-            peso_contenido = 0.8
-            peso_prueba = 0.2
-
-            porcentaje_prueba = 100 if esta_aprobado else 0
+    class Meta:
+        verbose_name = "Progreso pendiente"
+        verbose_name_plural = "Progresos pendientes"
+        unique_together = ('estudiante', 'curso')
 
-            self.porcentajeCompletado = (
-                (porcentaje_contenido * peso_contenido) +
-                (porcentaje_prueba * peso_prueba)
-            )
+    def __str__(self):
+        return f"Pendiente: {self.estudiante_id} - {self.curso_id}"
+
+class TareaEliminacion(models.Model):
+    """
+    Eliminación, archivo o restauración por lotes de los registros de inscripción de un código de
+    organización en uno o más cursos.
+    """
+    OPERACION_CHOICES = [
+        ('eliminar', 'Eliminar'),
+        ('archivar', 'Archivar'),
+        ('restaurar', 'Restaurar'),
+    ]
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('en_proceso', 'En proceso'),
+        ('completada', 'Completada'),
+        ('fallida', 'Fallida'),
+    ]
+    codigoOrganizacion = models.CharField(max_length=100)
+    cursos = models.JSONField(default=list)
+    operacion = models.CharField(max_length=20, choices=OPERACION_CHOICES, default='eliminar')
+    solicitante = models.ForeignKey(
+        Usuario, on_delete=models.SET_NULL, related_name='tareas_eliminacion', null=True, blank=True
+    )
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    total = models.IntegerField(default=0)
+    procesados = models.IntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+    fechaCreacion = models.DateTimeField(auto_now_add=True)
+    fechaFin = models.DateTimeField(null=True, blank=True)
 
-        
-        self.porcentajeCompletado = round(self.porcentajeCompletado, 2)
-        if self.porcentajeCompletado >= 99:
-            self.porcentajeCompletado = 100
+    class Meta:
+        verbose_name = "Tarea de eliminación"
+        verbose_name_plural = "Tareas de eliminación"
 
-        
-        self.contenidoCompletado = porcentaje_contenido == 100
-        self.completado = self.porcentajeCompletado == 100
+    def __str__(self):
+        return f"{self.get_operacion_display()} {self.codigoOrganizacion} ({self.estado})"
 
-       
-        self._skip_post_save = True
-        self.save()
-        self._skip_post_save = False
+    @property
+    def porcentaje(self):
+        if self.estado == 'completada':
+            return 100.0
+        if not self.total:
+            return 0.0
+        return round(min(self.procesados / self.total, 1) * 100, 2)
 
 class Estudiante(Usuario):
    
@@ -363,51 +364,9 @@ class Estudiante(Usuario):
                 estudiante.save()
  
                 
-                cursos_ids = contratos.values_list('curso_id', flat=True)
-                cursos = Curso.objects.filter(id__in=cursos_ids)
-                progreso_records = []
-                estudiante_prueba_records = []
-                estudiante_subcurso_records = []
-                estudiante_modulo_records = []
- 
-                for curso in cursos:
-                    
-                    progreso_records.append(
-                        Progreso(
-                            estudiante=estudiante,
-                            curso=curso,
-                            completado=False,
-                            porcentajeCompletado=0,
-                            simulacionCompletada=False
-                        )
-                    )
- 
-                    
-                    pruebas = Prueba.objects.filter(curso=curso)
-                    for prueba in pruebas:
-                        estudiante_prueba_records.append(
-                            EstudiantePrueba(estudiante=estudiante, prueba=prueba)
-                        )
- 
-                    
-                    subcursos = Subcurso.objects.filter(curso=curso)
-                    for subcurso in subcursos:
-                        estudiante_subcurso_records.append(
-                            EstudianteSubcurso(estudiante=estudiante, subcurso=subcurso, completado=False, porcentajeCompletado=0.0)
-                        )
- 
-                        
-                        modulos = Modulo.objects.filter(subcurso=subcurso)
-                        for modulo in modulos:
-                            estudiante_modulo_records.append(
-                                EstudianteModulo(estudiante=estudiante, modulo=modulo, completado=False)
-                            )
- 
-                
-                Progreso.objects.bulk_create(progreso_records)
-                EstudiantePrueba.objects.bulk_create(estudiante_prueba_records)
-                EstudianteSubcurso.objects.bulk_create(estudiante_subcurso_records)
-                EstudianteModulo.objects.bulk_create(estudiante_modulo_records)
+                from .utils.inscripcion import InscripcionService
+
+                InscripcionService.inscribir([estudiante.id], contratos.values_list('curso_id', flat=True))
  
             return estudiante
  
@@ -428,8 +387,11 @@ class EstudiantePrueba(models.Model):
         unique_together = ('estudiante', 'prueba')
 
     def calificar(self, respuestas_estudiante):
+        from .utils.eventos import EventosAvance
+
         logger.info(f"Calificando prueba {self.prueba.id} para estudiante {self.estudiante.id}")
         try:
+            aprobado_antes = self.estaAprobado
             preguntas = self.prueba.preguntas.all()
             if not preguntas.exists():
                 raise ValueError("No hay preguntas asociadas a la prueba.")
@@ -447,13 +409,30 @@ class EstudiantePrueba(models.Model):
             self._skip_post_save = True
             self.save()
             self._skip_post_save = False
+            if self.estaAprobado and not aprobado_antes:
+                EventosAvance.registrar(EventoAvance.PRUEBA, [(self.estudiante_id, self.prueba.curso_id, self.prueba_id)])
         except Exception as e:
             logger.error(f"Error al calificar: {e}")
             raise
 
 
     
+ALFABETO_VERIFICACION = '23456789ABCDEFGHJKLMNPQRSTUVWXYZ'
+
+
+def generar_codigo_verificacion():
+    """
+    Código de verificación público de un certificado: 10 caracteres sin símbolos ambiguos (0/O, 1/I).
+    """
+    return ''.join(secrets.choice(ALFABETO_VERIFICACION) for _ in range(10))
+
+
 class Certificado(models.Model):
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('listo', 'Listo'),
+        ('fallido', 'Fallido'),
+    ]
     estudiante = models.ForeignKey(
         Estudiante, on_delete=models.CASCADE, related_name="certificados", null=True
     )
@@ -462,6 +441,11 @@ class Certificado(models.Model):
     )
     fechaEmision = models.DateField(auto_now_add=True)
     archivoPdf = models.FileField(upload_to="certificados/", null=True, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    intentos = models.PositiveIntegerField(default=0)
+    error = models.TextField(null=True, blank=True)
+    codigoVerificacion = models.CharField(max_length=10, unique=True, null=True, default=generar_codigo_verificacion)
+    hashPdf = models.CharField(max_length=64, null=True, blank=True, db_index=True)
 
     class Meta:
         unique_together = ("estudiante", "curso")
@@ -471,6 +455,12 @@ class Certificado(models.Model):
 
     @classmethod
     def emitir_certificado(cls, estudiante, curso):
+        """
+        Registra el certificado como pendiente y encola la generación del PDF, que se hace en
+        segundo plano al confirmar la transacción (ver `ColaCertificados`).
+        """
+        from .utils.cola_certificados import ColaCertificados
+
         try:
             
             progreso = Progreso.objects.filter(estudiante=estudiante, curso=curso, completado=True).first()
@@ -487,122 +477,31 @@ class Certificado(models.Model):
             if not curso.titulo:
                 return "El título del curso no está disponible."
 
-           
-            buffer = io.BytesIO()
-            pdf = canvas.Canvas(buffer, pagesize=landscape(letter))
-            width, height = landscape(letter)
-
-        
-            pdf.setFillColor(HexColor("#FFFFFF"))
-            pdf.rect(0, 0, width, height, fill=1)
-
-            pdf.setFillColor(HexColor("#2F4798")) 
-            top_wave_1 = pdf.beginPath()
-            top_wave_1.moveTo(0, height)
-            top_wave_1.curveTo(width * 0.3, height - 100, width * 0.7, height - 50, width, height - 80)
-            top_wave_1.lineTo(width, height)
-            top_wave_1.lineTo(0, height)
-            top_wave_1.close()
-            pdf.drawPath(top_wave_1, fill=1, stroke=0)
-
-            
-            pdf.setFillColor(HexColor("#1A2E6F"))  
-            top_wave_2 = pdf.beginPath()
-            top_wave_2.moveTo(0, height)
-            top_wave_2.curveTo(width * 0.3, height - 50, width * 0.7, height - 80, width, height - 60)
-            top_wave_2.lineTo(width, height)
-            top_wave_2.lineTo(0, height)
-            top_wave_2.close()
-            pdf.drawPath(top_wave_2, fill=1, stroke=0)
-
-          
-            pdf.setFillColor(HexColor("#C9A66B")) 
-            pdf.setFont("Helvetica-Bold", 36)
-            pdf.drawCentredString(width / 2, height - 180, "CERTIFICADO DE RECONOCIMIENTO")
-
-            
-            pdf.setFillColor(HexColor("#2F4798"))
-            bottom_wave_1 = pdf.beginPath()
-            bottom_wave_1.moveTo(0, 0)
-            bottom_wave_1.curveTo(width * 0.3, 100, width * 0.7, 50, width, 80)
-            bottom_wave_1.lineTo(width, 0)
-            bottom_wave_1.lineTo(0, 0)
-            bottom_wave_1.close()
-            pdf.drawPath(bottom_wave_1, fill=1, stroke=0)
-
-            
-            pdf.setFillColor(HexColor("#1A2E6F"))
-            bottom_wave_2 = pdf.beginPath()
-            bottom_wave_2.moveTo(0, 0)
-            bottom_wave_2.curveTo(width * 0.3, 50, width * 0.7, 80, width, 60)
-            bottom_wave_2.lineTo(width, 0)
-            bottom_wave_2.lineTo(0, 0)
-            bottom_wave_2.close()
-            pdf.drawPath(bottom_wave_2, fill=1, stroke=0)
-
-           
-            pdf.setFillColor(HexColor("#333333"))
-            pdf.setFont("Helvetica", 16)
-            pdf.drawCentredString(width / 2, height - 250, "Otorgado a")
-
-          
-            pdf.setFont("Helvetica-Bold", 28)
-            pdf.setFillColor(HexColor("#4444AA"))
-            pdf.drawCentredString(
-                width / 2,
-                height - 300,
-                f"{estudiante.first_name} {estudiante.last_name}"
-            )
-
-            
-            pdf.setFont("Helvetica", 16)
-            pdf.setFillColor(HexColor("#333333"))
-            pdf.drawCentredString(
-                width / 2,
-                height - 350,
-                "Por haber completado satisfactoriamente el siguiente curso:"
-            )
-
-      
-            pdf.setFont("Helvetica-Bold", 20)
-            pdf.setFillColor(HexColor("#C9A66B"))  
-            pdf.drawCentredString(width / 2, height - 400, curso.titulo)
-
-            fecha_actual_utc = now()
-
-            
-            zona_horaria_ecuador = pytz.timezone('America/Guayaquil')
-            fecha_actual_ecuador = fecha_actual_utc.astimezone(zona_horaria_ecuador)
-
-            pdf.setFont("Helvetica", 14)
-            pdf.setFillColor(HexColor("#666666"))
-            pdf.drawCentredString(
-                width / 2,
-                height - 450,
-                f"Fecha de emisión: {fecha_actual_ecuador.strftime('%d de %B de %Y')}"
-            )
-
-         
-            pdf.setFont("Helvetica-Bold", 14)
-            pdf.setFillColor(HexColor("#333333"))
-            pdf.drawCentredString(width / 2, height - 520, "Firma Autorizada - Global QHSE")
-
-           
-            pdf.save()
-            buffer.seek(0)
-
-          
-            with transaction.atomic():
-                certificado = cls.objects.create(estudiante=estudiante, curso=curso)
-                certificado.archivoPdf.save(
-                    f"certificado_{curso.id}_{estudiante.id}.pdf",
-                    File(buffer)
-                )
-
+            ColaCertificados.encolar([(estudiante.id, curso.id)])
             return "Certificado emitido exitosamente."
 
         except Exception as e:
             return f"Error al emitir el certificado: {str(e)}"
+
+    def generar_pdf(self):
+        """
+        Genera el PDF del certificado con la plantilla, lo guarda en `archivoPdf` y registra su SHA-256.
+        """
+        from .utils.certificado import PlantillaCertificado, fecha_emision
+
+        estudiante, curso = self.estudiante, self.curso
+        if not estudiante.first_name or not estudiante.last_name:
+            raise ValidationError("Los datos del estudiante son incompletos.")
+        if not curso.titulo:
+            raise ValidationError("El título del curso no está disponible.")
+
+        if not self.codigoVerificacion:
+            self.codigoVerificacion = generar_codigo_verificacion()
+        pdf = PlantillaCertificado.obtener().renderizar(
+            f"{estudiante.first_name} {estudiante.last_name}", curso.titulo, fecha_emision(), self.codigoVerificacion
+        )
+        self.hashPdf = hashlib.sha256(pdf).hexdigest()
+        self.archivoPdf.save(f"certificado_{curso.id}_{estudiante.id}.pdf", File(io.BytesIO(pdf)), save=False)
  
     def post(self, request):
         estudiante_id = request.data.get('estudiante_id')
@@ -642,6 +541,8 @@ class EstudianteSubcurso(models.Model):
     subcurso = models.ForeignKey(Subcurso, on_delete=models.CASCADE, related_name="estudiantes")
     completado = models.BooleanField(default=False)
     porcentajeCompletado = models.FloatField(default=0.0)
+    modulos_completados = models.IntegerField(default=0)
+    modulos_totales = models.IntegerField(default=0)
 
     class Meta:
         unique_together = ('estudiante', 'subcurso')
@@ -662,4 +563,213 @@ class EstudianteModulo(models.Model):
         verbose_name_plural = "Estudiantes-Modulos"
 
     def __str__(self):
-        return f"{self.estudiante.email} - {self.modulo.nombre}"								   
\ No newline at end of file
+        return f"{self.estudiante.email} - {self.modulo.nombre}"								   
+
+
+# Historial archivado de los contratos desactivados. Solo se guarda lo que no puede
+# reconstruirse: los porcentajes y contadores se recalculan al restaurar.
+class ProgresoArchivado(models.Model):
+    estudiante = models.ForeignKey(Estudiante, on_delete=models.CASCADE, related_name="progresos_archivados")
+    curso = models.ForeignKey(Curso, on_delete=models.CASCADE, related_name="progresos_archivados")
+    simulacionCompletada = models.BooleanField(null=True)
+    fechaInicioCurso = models.DateField(null=True)
+    fechaFinCurso = models.DateField(null=True)
+    fechaArchivo = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('estudiante', 'curso')
+        verbose_name = "Progreso archivado"
+        verbose_name_plural = "Progresos archivados"
+
+
+class EstudiantePruebaArchivado(models.Model):
+    estudiante = models.ForeignKey(Estudiante, on_delete=models.CASCADE, related_name="pruebas_archivadas")
+    prueba = models.ForeignKey(Prueba, on_delete=models.CASCADE, related_name="archivados")
+    estaAprobado = models.BooleanField(default=False)
+    calificacion = models.FloatField(default=0.0)
+    intento = models.IntegerField(default=0)
+    fechaPrueba = models.DateField()
+    fechaArchivo = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('estudiante', 'prueba')
+        verbose_name = "Estudiante-Prueba archivado"
+        verbose_name_plural = "Estudiantes-Pruebas archivados"
+
+
+class EstudianteModuloArchivado(models.Model):
+    """
+    Módulos completados de un contrato desactivado; los no completados se recrean al restaurar.
+    """
+    estudiante = models.ForeignKey(Estudiante, on_delete=models.CASCADE, related_name="modulos_archivados")
+    modulo = models.ForeignKey(Modulo, on_delete=models.CASCADE, related_name="archivados")
+    fechaArchivo = models.DateTimeField()
+
+    class Meta:
+        unique_together = ('estudiante', 'modulo')
+        verbose_name = "Estudiante-Modulo archivado"
+        verbose_name_plural = "Estudiantes-Modulos archivados"
+
+
+class MetricaDiaria(models.Model):
+    """
+    Cifras agregadas por (empresa, instructor, curso, código de organización, día) que leen los
+    endpoints de métricas.
+
+    Las filas sin curso guardan los estudiantes del código, una por cada instructor con contrato en
+    él; `alcance` indica hasta qué nivel se suman (solo el instructor, también su empresa o también
+    el total) para contar cada código una sola vez por nivel. Las filas con curso guardan los
+    estudiantes del código que tienen contrato en ese curso, más sus certificados, pruebas y
+    progresos (cantidad y suma de porcentajes, para promediarlos), y las fechas de ese contrato
+    para contar los estudiantes activos al leerlas.
+    """
+    ALCANCE_INSTRUCTOR = 1
+    ALCANCE_EMPRESA = 2
+    ALCANCE_CODIGO = 3
+
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='metricas_diarias')
+    instructor = models.ForeignKey(Instructor, on_delete=models.CASCADE, related_name='metricas_diarias')
+    curso = models.ForeignKey(Curso, on_delete=models.CASCADE, related_name='metricas_diarias', null=True)
+    codigoOrganizacion = models.CharField(max_length=100, db_index=True)
+    dia = models.DateField()
+    fechaInicioCapacitacion = models.DateField(null=True)
+    fechaFinCapacitacion = models.DateField(null=True)
+    estudiantes = models.PositiveIntegerField(default=0)
+    certificados = models.PositiveIntegerField(default=0)
+    pruebas = models.PositiveIntegerField(default=0)
+    pruebasAprobadas = models.PositiveIntegerField(default=0)
+    progresos = models.PositiveIntegerField(default=0)
+    sumaPorcentajes = models.FloatField(default=0.0)
+    alcance = models.PositiveSmallIntegerField(default=ALCANCE_CODIGO)
+
+    class Meta:
+        verbose_name = "Métrica diaria"
+        verbose_name_plural = "Métricas diarias"
+        indexes = [
+            models.Index(fields=['empresa', 'curso'], name='metrica_empresa_curso_idx'),
+            models.Index(fields=['instructor', 'curso'], name='metrica_instructor_curso_idx'),
+            models.Index(fields=['curso', 'dia'], name='metrica_curso_dia_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.codigoOrganizacion} - {self.curso_id} - {self.dia}"
+
+
+class MetricaPendiente(models.Model):
+    """
+    Códigos de organización cuyas métricas diarias deben recalcularse.
+    """
+    codigoOrganizacion = models.CharField(max_length=100, unique=True)
+    fechaSolicitud = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = "Métrica pendiente"
+        verbose_name_plural = "Métricas pendientes"
+
+    def __str__(self):
+        return f"Pendiente: {self.codigoOrganizacion}"
+
+
+class EventoAvance(models.Model):
+    """
+    Registro de solo inserción de los avances de los estudiantes (módulo, prueba aprobada,
+    simulación y curso completados) del que se obtienen las tendencias.
+
+    Cada fila ocupa unos pocos enteros: el tipo es un entero pequeño, `objeto` es el módulo o la
+    prueba y la empresa se copia al registrar el evento para filtrar sin joins. Las filas
+    compactadas por antigüedad no tienen estudiante y `cantidad` acumula los eventos del día o
+    de la semana que resumen.
+    """
+    MODULO = 1
+    PRUEBA = 2
+    SIMULACION = 3
+    CURSO = 4
+    TIPOS = [
+        (MODULO, 'Módulo completado'),
+        (PRUEBA, 'Prueba aprobada'),
+        (SIMULACION, 'Simulación completada'),
+        (CURSO, 'Curso completado'),
+    ]
+
+    tipo = models.PositiveSmallIntegerField(choices=TIPOS)
+    curso = models.ForeignKey(Curso, on_delete=models.CASCADE, related_name='eventos_avance')
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='eventos_avance', null=True)
+    estudiante = models.ForeignKey(Estudiante, on_delete=models.SET_NULL, related_name='eventos_avance', null=True)
+    objeto = models.PositiveIntegerField(null=True)
+    fecha = models.DateField()
+    cantidad = models.PositiveIntegerField(default=1)
+
+    class Meta:
+        verbose_name = "Evento de avance"
+        verbose_name_plural = "Eventos de avance"
+        indexes = [
+            models.Index(fields=['curso', 'tipo', 'fecha'], name='evento_curso_tipo_fecha_idx'),
+            models.Index(fields=['empresa', 'tipo', 'fecha'], name='evento_empresa_tipo_fecha_idx'),
+            models.Index(fields=['tipo', 'fecha'], name='evento_tipo_fecha_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.curso_id} - {self.fecha} ({self.cantidad})"
+
+
+class PrimerAvance(models.Model):
+    """
+    Marca de la primera vez que un estudiante completa o aprueba un objeto. `EventosAvance.registrar`
+    la consulta para no contar dos veces el mismo avance y, a diferencia de los eventos, la
+    compactación no la resume. `objeto` es 0 en los avances sin objeto (simulación y curso).
+    """
+    tipo = models.PositiveSmallIntegerField(choices=EventoAvance.TIPOS)
+    estudiante = models.ForeignKey(Estudiante, on_delete=models.CASCADE, related_name='primeros_avances')
+    curso = models.ForeignKey(Curso, on_delete=models.CASCADE, related_name='primeros_avances')
+    objeto = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Primer avance"
+        verbose_name_plural = "Primeros avances"
+        unique_together = ('estudiante', 'tipo', 'curso', 'objeto')
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} - {self.estudiante_id} - {self.curso_id} - {self.objeto}"
+
+
+class RankingInstructor(models.Model):
+    """
+    Ranking precalculado de instructores por tasa de certificación, tasa de aprobación y progreso
+    promedio, dentro de su empresa y en toda la plataforma.
+
+    Hay una fila por instructor y una por empresa (sin instructor) con los totales de la empresa;
+    en las filas de empresa las posiciones globales son las de la empresa entre todas las empresas.
+    Las cifras salen de `MetricaDiaria` y se actualizan por empresa cuando cambian sus métricas.
+    """
+    instructor = models.OneToOneField(Instructor, on_delete=models.CASCADE, related_name='ranking', null=True)
+    empresa = models.ForeignKey(Empresa, on_delete=models.CASCADE, related_name='ranking')
+    instructores = models.PositiveIntegerField(default=0)
+    estudiantes = models.PositiveIntegerField(default=0)
+    certificados = models.PositiveIntegerField(default=0)
+    pruebas = models.PositiveIntegerField(default=0)
+    pruebasAprobadas = models.PositiveIntegerField(default=0)
+    tasaCertificacion = models.FloatField(default=0.0)
+    tasaAprobacion = models.FloatField(default=0.0)
+    progresoPromedio = models.FloatField(default=0.0)
+    posicionEmpresaCertificacion = models.PositiveIntegerField(null=True)
+    posicionEmpresaAprobacion = models.PositiveIntegerField(null=True)
+    posicionEmpresaProgreso = models.PositiveIntegerField(null=True)
+    posicionCertificacion = models.PositiveIntegerField(null=True)
+    posicionAprobacion = models.PositiveIntegerField(null=True)
+    posicionProgreso = models.PositiveIntegerField(null=True)
+    fechaActualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Ranking de instructor"
+        verbose_name_plural = "Ranking de instructores"
+        indexes = [
+            models.Index(fields=['empresa', 'posicionEmpresaCertificacion'], name='ranking_empresa_cert_idx'),
+            models.Index(fields=['empresa', 'posicionEmpresaAprobacion'], name='ranking_empresa_aprob_idx'),
+            models.Index(fields=['empresa', 'posicionEmpresaProgreso'], name='ranking_empresa_prog_idx'),
+            models.Index(fields=['posicionCertificacion'], name='ranking_cert_idx'),
+            models.Index(fields=['posicionAprobacion'], name='ranking_aprob_idx'),
+            models.Index(fields=['posicionProgreso'], name='ranking_prog_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.instructor_id or 'Empresa'} - {self.empresa_id}"
@@ -1,7 +1,7 @@
 from rest_framework import serializers
 from .models import Usuario, Administrador, Instructor, Estudiante, Curso, Subcurso, Modulo, Empresa,Contrato,Progreso,EstudiantePrueba, Pregunta, Prueba
 from .utils.email import EmailService
-from .models import EstudianteSubcurso, EstudianteModulo,EstudiantePrueba
+from .models import EstudianteSubcurso, EstudianteModulo,EstudiantePrueba, TareaEliminacion
 from rest_framework.response import Response
 import secrets
 from rest_framework.exceptions import ValidationError
@@ -390,5 +390,14 @@ class PruebaConPreguntasSerializer(serializers.ModelSerializer):
         return prueba
 
 
+class TareaEliminacionSerializer(serializers.ModelSerializer):
+    porcentaje = serializers.FloatField(read_only=True)
+
+    class Meta:
+        model = TareaEliminacion
+        fields = ['id', 'codigoOrganizacion', 'cursos', 'operacion', 'estado', 'total', 'procesados', 'porcentaje',
+                  'error', 'fechaCreacion', 'fechaFin']
+
+
 
    
\ No newline at end of file
@@ -1,25 +1,37 @@
+from django.db import transaction
 from django.db.models.signals import post_save, post_delete
 from django.dispatch import receiver
 from .utils.email import EmailService
-from .models import Curso, Subcurso, Modulo,Progreso,Certificado,EstudiantePrueba,EstudianteSubcurso,EstudianteModulo,Contrato
+from .models import Curso, Subcurso, Modulo,Progreso,Certificado,EstudiantePrueba,EstudianteSubcurso,EstudianteModulo,Contrato,Prueba,Estudiante,Instructor,Empresa
+from .utils.progreso import ProgresoService
+from .utils.cola_progreso import ColaProgreso
+from .utils.estructura import EstructuraCurso
+from .utils.inscripcion import InscripcionService
+from .utils.metricas_diarias import MetricasDiarias
+from .utils.cache_metricas import CacheMetricas
+from .utils.ranking import RankingInstructores
 
 @receiver(post_save, sender=Modulo)
 def actualizar_cantidad_modulos_y_progreso(sender, instance, created, **kwargs):
     subcurso = instance.subcurso
+    if subcurso:
+        EstructuraCurso.invalidar(subcurso.curso_id)
     if created:
         subcurso.cantidad_modulos += 1
         subcurso.save()
-    
+        ProgresoService.programar_reconciliacion(subcurso.curso_id, subcurso.id)
+        InscripcionService.programar_completado(subcurso.curso_id)
 
 
 @receiver(post_delete, sender=Modulo)
 def disminuir_cantidad_modulos(sender, instance, **kwargs):
     try:
         subcurso = instance.subcurso
+        EstructuraCurso.invalidar(subcurso.curso_id)
         if subcurso.cantidad_modulos > 0:
             subcurso.cantidad_modulos -= 1
             subcurso.save()
-        
+        ProgresoService.programar_reconciliacion(subcurso.curso_id, subcurso.id)
     except Subcurso.DoesNotExist:
         pass
 
@@ -28,19 +40,45 @@ def actualizar_cantidad_subcursos(sender, instance, created, **kwargs):
     """
     Actualiza la cantidad de subcursos en el curso cuando se crea un nuevo subcurso.
     """
+    EstructuraCurso.invalidar(instance.curso_id)
     if created:
         curso = instance.curso
         curso.cantidadSubcursos = curso.subcursos.count()
         curso.save()
+        ProgresoService.programar_reconciliacion(curso.id)
+        InscripcionService.programar_completado(curso.id)
 
 @receiver(post_delete, sender=Subcurso)
 def disminuir_cantidad_subcursos(sender, instance, **kwargs):
     """
     Actualiza la cantidad de subcursos en el curso cuando se elimina un subcurso.
     """
+    EstructuraCurso.invalidar(instance.curso_id)
     curso = instance.curso
     curso.cantidadSubcursos = curso.subcursos.count()
     curso.save()
+    ProgresoService.programar_reconciliacion(curso.id)
+
+
+@receiver(post_save, sender=Prueba)
+@receiver(post_delete, sender=Prueba)
+def invalidar_estructura_por_prueba(sender, instance, **kwargs):
+    """
+    Descarta la estructura cacheada del curso cuando se crea, modifica o elimina una prueba
+    y, si es nueva, programa su registro para los estudiantes ya inscritos.
+    """
+    EstructuraCurso.invalidar(instance.curso_id)
+    if kwargs.get('created'):
+        InscripcionService.programar_completado(instance.curso_id)
+
+
+@receiver(post_save, sender=Curso)
+@receiver(post_delete, sender=Curso)
+def invalidar_estructura_por_curso(sender, instance, **kwargs):
+    """
+    Descarta la estructura cacheada del curso cuando cambia el propio curso (por ejemplo, `simulacion`).
+    """
+    EstructuraCurso.invalidar(instance.id)
 
 
 @receiver(post_save, sender=Progreso)
@@ -56,92 +94,115 @@ def actualizar_progreso_curso(sender, instance, **kwargs):
     """
     if hasattr(instance, '_skip_post_save') and instance._skip_post_save:
         return
-   
-    
-    instance._skip_post_save = True
+
     instance.calcular_porcentaje_completado()
-    instance._skip_post_save = False
- 
- 
+
+
 @receiver(post_save, sender=EstudiantePrueba)
 def actualizar_progreso_con_prueba(sender, instance, **kwargs):
     """
     Actualiza el progreso del curso relacionado cada vez que se guarda un registro de prueba.
     """
-    progreso = Progreso.objects.filter(estudiante=instance.estudiante, curso=instance.prueba.curso).first()
-    if progreso:
-        # Evitar el ciclo infinito
-        if hasattr(progreso, '_skip_post_save') and progreso._skip_post_save:
-            return
- 
-        progreso._skip_post_save = True
-        progreso.calcular_porcentaje_completado()
-        progreso._skip_post_save = False
- 
+    ProgresoService.recalcular_progresos(instance.estudiante_id, instance.prueba.curso_id)
+
 
 @receiver(post_save, sender=EstudianteModulo)
 def actualizar_progreso_con_modulo(sender, instance, **kwargs):
     """
-    Actualiza el progreso del subcurso relacionado cada vez que se guarda un registro de EstudianteModulo.
+    Actualiza el progreso del subcurso y del curso relacionados cada vez que se guarda un registro de EstudianteModulo.
     """
     subcurso = instance.modulo.subcurso
-    estudiante = instance.estudiante
+    if subcurso is None:
+        return
+    ProgresoService.propagar_modulo(instance.estudiante_id, subcurso.id, subcurso.curso_id)
 
-    
-    modulos = Modulo.objects.filter(subcurso=subcurso)
-    total_modulos = modulos.count()
 
-    
-    modulos_completados = EstudianteModulo.objects.filter(
-        estudiante=estudiante, modulo__in=modulos, completado=True
-    ).count()
+@receiver(post_save, sender=EstudianteSubcurso)
+def actualizar_progreso_con_subcurso(sender, instance, **kwargs):
+    """
+    Actualiza el progreso del curso relacionado cada vez que se guarda un registro de EstudianteSubcurso.
+    """
+    if ColaProgreso.modo_diferido():
+        ColaProgreso.encolar([(instance.estudiante_id, instance.subcurso.curso_id)])
+        return
+    ProgresoService.reconciliar_progresos(instance.estudiante_id, instance.subcurso.curso_id)
+
 
-    
-    porcentaje_completado = (modulos_completados / total_modulos) * 100 if total_modulos > 0 else 0
-    
-    porcentaje_completado = round(porcentaje_completado, 2)
-    
-    porcentaje_completado = 100 if porcentaje_completado >= 99 else porcentaje_completado
+@receiver(post_save, sender=Contrato)
+@receiver(post_delete, sender=Contrato)
+def marcar_metricas_por_contrato(sender, instance, **kwargs):
+    """
+    Recalcula las métricas diarias del código cuando se crea, modifica o elimina un contrato.
+    """
+    MetricasDiarias.marcar([instance.codigoOrganizacion])
 
 
-    
-    estudiante_subcurso, created = EstudianteSubcurso.objects.get_or_create(
-        estudiante=estudiante, subcurso=subcurso
-    )
-    estudiante_subcurso.porcentajeCompletado = porcentaje_completado
-    estudiante_subcurso.completado = porcentaje_completado == 100
-    estudiante_subcurso.save()
+@receiver(post_save, sender=Instructor)
+@receiver(post_delete, sender=Instructor)
+def actualizar_ranking_por_instructor(sender, instance, **kwargs):
+    """
+    Actualiza el ranking de la empresa del instructor al crearlo, eliminarlo o cambiarlo de empresa.
+    """
+    if kwargs.get('update_fields') and 'empresa' not in kwargs['update_fields']:
+        return
+    empresa_id = instance.empresa_id
+    transaction.on_commit(lambda: RankingInstructores.actualizar([empresa_id]))
 
 
-@receiver(post_save, sender=EstudianteSubcurso)
-def actualizar_progreso_con_subcurso(sender, instance, **kwargs):
+@receiver(post_save, sender=Estudiante)
+@receiver(post_delete, sender=Estudiante)
+def marcar_metricas_por_estudiante(sender, instance, **kwargs):
     """
-    Actualiza el progreso del curso relacionado cada vez que se guarda un registro de EstudianteSubcurso.
+    Recalcula las métricas diarias del código al registrar, modificar o eliminar un estudiante.
+    Los guardados parciales (por ejemplo, `last_login`) no cambian las métricas.
     """
-    curso = instance.subcurso.curso
-    estudiante = instance.estudiante
+    if kwargs.get('update_fields') and 'codigoOrganizacion' not in kwargs['update_fields']:
+        return
+    MetricasDiarias.marcar([instance.codigoOrganizacion])
 
-    
-    subcursos = Subcurso.objects.filter(curso=curso)
-    total_subcursos = subcursos.count()
 
-    if total_subcursos == 0:
-        return  
+@receiver(post_save, sender=Certificado)
+@receiver(post_delete, sender=Certificado)
+def marcar_metricas_por_certificado(sender, instance, **kwargs):
+    """
+    Recalcula las métricas diarias del código del estudiante al emitir o eliminar un certificado.
+    """
+    if kwargs.get('created') is False:
+        return
+    MetricasDiarias.marcar_estudiantes([instance.estudiante_id])
 
-    
-    subcursos_completados = EstudianteSubcurso.objects.filter(
-        estudiante=estudiante, subcurso__in=subcursos, completado=True
-    ).count()
 
-    
-    porcentaje_completado = (subcursos_completados / total_subcursos) * 100
+@receiver(post_save, sender=EstudiantePrueba)
+def marcar_metricas_por_prueba(sender, instance, **kwargs):
+    """
+    Recalcula las métricas diarias del código del estudiante cuando cambia el resultado de una prueba.
+    Las eliminaciones en bloque las marca `CascadaInscripciones`.
+    """
+    MetricasDiarias.marcar_estudiantes([instance.estudiante_id])
 
-   
-    progreso, created = Progreso.objects.get_or_create(
-        estudiante=estudiante, curso=curso
-    )
-    progreso.contenidoCompletado = porcentaje_completado == 100
-    progreso.save()  
 
-    
-    progreso.calcular_porcentaje_completado()
\ No newline at end of file
+@receiver(post_save, sender=Contrato)
+@receiver(post_delete, sender=Contrato)
+@receiver(post_save, sender=Progreso)
+@receiver(post_delete, sender=Progreso)
+@receiver(post_save, sender=Certificado)
+@receiver(post_delete, sender=Certificado)
+@receiver(post_save, sender=EstudiantePrueba)
+@receiver(post_delete, sender=EstudiantePrueba)
+@receiver(post_save, sender=Empresa)
+@receiver(post_delete, sender=Empresa)
+@receiver(post_save, sender=Curso)
+@receiver(post_delete, sender=Curso)
+@receiver(post_save, sender=Estudiante)
+@receiver(post_delete, sender=Estudiante)
+@receiver(post_save, sender=Instructor)
+@receiver(post_delete, sender=Instructor)
+def invalidar_cache_metricas(sender, instance, **kwargs):
+    """
+    Deja obsoletas las respuestas cacheadas de los endpoints de métricas que dependen del modelo.
+    Los guardados parciales de otros campos de un usuario (por ejemplo, `last_login`) no las afectan.
+    """
+    update_fields = kwargs.get('update_fields')
+    if sender in (Estudiante, Instructor) and update_fields and not {'codigoOrganizacion', 'empresa'} & set(update_fields):
+        return
+    CacheMetricas.invalidar(sender.__name__)
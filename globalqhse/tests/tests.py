@@ -1,10 +1,34 @@
-from django.test import TestCase
-from rest_framework.test import APITestCase
-from datetime import date
+import csv
+import hashlib
+import io
+import json
+import tempfile
+import threading
+import zipfile
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.db.models import Q
+from django.db.models.fields.files import FieldFile
+from django.http import QueryDict
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from pypdf import PdfReader
+from rest_framework import status
+from rest_framework.test import APIClient, APITestCase
+from rest_framework_simplejwt.tokens import RefreshToken
 from globalqhse.models import (
     Empresa, Usuario, Administrador, Instructor, Estudiante,
     Curso, Subcurso, Modulo, Prueba, Progreso, Contrato,
-    Certificado, Pregunta, EstudianteSubcurso, EstudianteModulo, EstudiantePrueba
+    Certificado, Pregunta, EstudianteSubcurso, EstudianteModulo, EstudiantePrueba,
+    EstudianteModuloArchivado, EventoAvance, MetricaDiaria, MetricaPendiente, ProgresoArchivado,
+    ProgresoPendiente, RankingInstructor, TareaEliminacion
 )
 
 from globalqhse.serializers import (
@@ -12,10 +36,22 @@ from globalqhse.serializers import (
     CursoSerializer, SubcursoSerializer, ModuloSerializer, ContratoSerializer, ProgresoSerializer,
     PreguntaSerializer, PruebaSerializer
 )
-from django.core.exceptions import ValidationError
-from rest_framework import status
-
-from rest_framework_simplejwt.tokens import RefreshToken
+from globalqhse.utils.cache_metricas import CacheMetricas
+from globalqhse.utils.cascada import CascadaInscripciones
+from globalqhse.utils.certificado import PlantillaCertificado
+from globalqhse.utils.cola_certificados import ColaCertificados
+from globalqhse.utils.cola_progreso import ColaProgreso
+from globalqhse.utils.dashboard import DashboardEstudiante
+from globalqhse.utils.descargas import servir_archivo
+from globalqhse.utils.emision_masiva import EmisionMasivaCertificados
+from globalqhse.utils.estructura import EstructuraCurso
+from globalqhse.utils.eventos import EventosAvance
+from globalqhse.utils.exportacion import ExportacionNomina
+from globalqhse.utils.inscripcion import InscripcionService
+from globalqhse.utils.metricas import DistribucionProgreso, contar_consultas, percentil_cont
+from globalqhse.utils.metricas_diarias import MetricasAgrupadas, MetricasDiarias
+from globalqhse.utils.progreso import ProgresoService
+from globalqhse.utils.ranking import RankingInstructores
 
 #models
 class EmpresaModelTests(TestCase):
@@ -428,7 +464,6 @@ class ModuloSignalTests(TestCase):
 
 class CertificadoSignalTests(TestCase):
     def test_emitir_certificado_automatico(self):
-
         empresa = Empresa.objects.create(
             nombre="Empresa Test",
             area="Educación",
@@ -532,3 +567,1227 @@ class SubcursoSignalTests(TestCase):
         self.assertEqual(curso.cantidadSubcursos, 1) 
 
 
+
+
+# progreso
+
+class ProgresoServiceTests(TestCase):
+    def setUp(self):
+        empresa = Empresa.objects.create(
+            nombre="Empresa Progreso",
+            area="Seguridad",
+            direccion="Calle Real 456",
+            telefono="987654321",
+            correoElectronico="empresa_progreso@example.com",
+            numeroEmpleados=100
+        )
+        instructor = Instructor.objects.create(
+            first_name="Instructor",
+            last_name="Uno",
+            email="instructor@example.com",
+            password="Password123",
+            empresa=empresa
+        )
+        self.curso = Curso.objects.create(titulo="Curso Progreso", descripcion="Motor de progreso", simulacion=False)
+        Contrato.objects.create(
+            instructor=instructor,
+            curso=self.curso,
+            codigoOrganizacion="ORG123",
+            fechaInicioCapacitacion="2024-01-01",
+            fechaFinCapacitacion="2024-12-31"
+        )
+        self.prueba = Prueba.objects.create(curso=self.curso, duracion=30)
+        self.subcursos = [Subcurso.objects.create(curso=self.curso, nombre=f"Subcurso {i}") for i in range(2)]
+        self.modulos = [
+            Modulo.objects.create(subcurso=subcurso, nombre=f"Módulo {i}")
+            for subcurso in self.subcursos for i in range(2)
+        ]
+        self.estudiante = Estudiante.crear_estudiante_con_cursos(
+            email="estudiante@example.com",
+            password="Password123",
+            codigoOrganizacion="ORG123",
+            first_name="Estudiante",
+            last_name="Uno"
+        )
+
+    def test_actualizar_modulo_recalcula_subcurso_y_curso(self):
+        self.assertTrue(ProgresoService.actualizar_modulo(self.estudiante.id, self.modulos[0].id, True))
+        self.assertFalse(ProgresoService.actualizar_modulo(self.estudiante.id, self.modulos[0].id, True))
+
+        estudiante_subcurso = EstudianteSubcurso.objects.get(estudiante=self.estudiante, subcurso=self.subcursos[0])
+        self.assertEqual(estudiante_subcurso.porcentajeCompletado, 50)
+        progreso = Progreso.objects.get(estudiante=self.estudiante, curso=self.curso)
+        self.assertEqual(progreso.porcentajeCompletado, 20)
+
+        for modulo in self.modulos[1:]:
+            ProgresoService.actualizar_modulo(self.estudiante.id, modulo.id, True)
+        progreso.refresh_from_db()
+        self.assertEqual(progreso.porcentajeCompletado, 80)
+        self.assertTrue(progreso.contenidoCompletado)
+        self.assertFalse(progreso.completado)
+
+        estudiante_prueba = EstudiantePrueba.objects.get(estudiante=self.estudiante, prueba=self.prueba)
+        estudiante_prueba.estaAprobado = True
+        estudiante_prueba.save()
+        progreso.refresh_from_db()
+        self.assertEqual(progreso.porcentajeCompletado, 100)
+        self.assertTrue(progreso.completado)
+        self.assertTrue(Certificado.objects.filter(estudiante=self.estudiante, curso=self.curso).exists())
+
+    def test_consultas_constantes_por_cantidad_de_subcursos(self):
+        with CaptureQueriesContext(connection) as pocos:
+            ProgresoService.actualizar_modulo(self.estudiante.id, self.modulos[0].id, True)
+
+        for i in range(2, 8):
+            subcurso = Subcurso.objects.create(curso=self.curso, nombre=f"Subcurso {i}")
+            modulo = Modulo.objects.create(subcurso=subcurso, nombre="Módulo extra")
+            EstudianteSubcurso.objects.create(estudiante=self.estudiante, subcurso=subcurso)
+            EstudianteModulo.objects.create(estudiante=self.estudiante, modulo=modulo)
+
+        with CaptureQueriesContext(connection) as muchos:
+            ProgresoService.actualizar_modulo(self.estudiante.id, self.modulos[1].id, True)
+
+        self.assertEqual(len(pocos), len(muchos))
+
+    def test_update_completion_batch(self):
+        client = APIClient()
+        client.force_authenticate(user=self.estudiante)
+        response = client.patch(
+            '/api/estudianteModulo/update-completion-batch/',
+            {
+                "estudiante_id": self.estudiante.id,
+                "modulos": [
+                    {"modulo_id": self.modulos[0].id, "completado": True},
+                    {"modulo_id": self.modulos[1].id, "completado": True},
+                    {"modulo_id": self.modulos[2].id, "completado": True},
+                    {"modulo_id": 9999, "completado": True},
+                ],
+            },
+            format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["actualizados"], 3)
+        self.assertEqual(response.data["no_encontrados"], [{"estudiante_id": self.estudiante.id, "modulo_id": 9999}])
+        porcentajes = {s["subcurso_id"]: s["porcentajeCompletado"] for s in response.data["subcursos"]}
+        self.assertEqual(porcentajes, {self.subcursos[0].id: 100, self.subcursos[1].id: 50})
+        self.assertEqual(response.data["progresos"][0]["porcentajeCompletado"], 60)
+
+        for modulos in ([7], ["x"], [{"modulo_id": "uno", "completado": True}], [{"modulo_id": 1.5, "completado": True}], {"modulo_id": 1}):
+            response = client.patch(
+                '/api/estudianteModulo/update-completion-batch/',
+                {"estudiante_id": self.estudiante.id, "modulos": modulos},
+                format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, modulos)
+
+    def test_modo_diferido_encola_y_vaciar_recalcula(self):
+        with override_settings(PROGRESO_MODO='deferred', PROGRESO_WORKERS=0):
+            with self.captureOnCommitCallbacks(execute=True):
+                ProgresoService.actualizar_modulo(self.estudiante.id, self.modulos[0].id, True)
+                ProgresoService.actualizar_modulo(self.estudiante.id, self.modulos[1].id, True)
+
+            self.assertEqual(ProgresoPendiente.objects.count(), 1)
+            progreso = Progreso.objects.get(estudiante=self.estudiante, curso=self.curso)
+            self.assertEqual(progreso.porcentajeCompletado, 0)
+
+            ColaProgreso.vaciar(self.estudiante.id, self.curso.id)
+            progreso.refresh_from_db()
+            self.assertEqual(progreso.porcentajeCompletado, 40)
+            self.assertFalse(ProgresoPendiente.objects.exists())
+
+    def test_contadores_siguen_cambios_de_modulos_y_estructura(self):
+        ProgresoService.actualizar_modulo(self.estudiante.id, self.modulos[0].id, True)
+        ProgresoService.actualizar_modulo(self.estudiante.id, self.modulos[1].id, True)
+        ProgresoService.actualizar_modulo(self.estudiante.id, self.modulos[1].id, False)
+        estudiante_subcurso = EstudianteSubcurso.objects.get(estudiante=self.estudiante, subcurso=self.subcursos[0])
+        self.assertEqual((estudiante_subcurso.modulos_completados, estudiante_subcurso.modulos_totales), (1, 2))
+        self.assertEqual(estudiante_subcurso.porcentajeCompletado, 50)
+
+        with override_settings(RECONCILIACION_WORKERS=0), self.captureOnCommitCallbacks(execute=True):
+            Modulo.objects.create(subcurso=self.subcursos[0], nombre="Módulo nuevo")
+            # La reconciliación de los inscritos espera a que se confirme la transacción.
+            estudiante_subcurso.refresh_from_db()
+            self.assertEqual(estudiante_subcurso.modulos_totales, 2)
+        estudiante_subcurso.refresh_from_db()
+        self.assertEqual(estudiante_subcurso.modulos_totales, 3)
+        self.assertEqual(estudiante_subcurso.porcentajeCompletado, 33.33)
+        progreso = Progreso.objects.get(estudiante=self.estudiante, curso=self.curso)
+        self.assertEqual((progreso.subcursos_completados, progreso.subcursos_totales), (0, 2))
+        self.assertEqual(progreso.porcentajeCompletado, 13.33)
+
+    def test_reparar_contadores_corrige_desviaciones(self):
+        ProgresoService.actualizar_modulo(self.estudiante.id, self.modulos[0].id, True)
+        EstudianteSubcurso.objects.filter(estudiante=self.estudiante).update(modulos_completados=2)
+        Progreso.objects.filter(estudiante=self.estudiante).update(subcursos_totales=5, suma_porcentajes_subcursos=0)
+
+        self.assertEqual(ProgresoService.reparar_contadores(curso_id=self.curso.id), (2, 1))
+        self.assertEqual(ProgresoService.reparar_contadores(), (0, 0))
+        progreso = Progreso.objects.get(estudiante=self.estudiante, curso=self.curso)
+        self.assertEqual(progreso.porcentajeCompletado, 20)
+        call_command('reconciliar_progresos', stdout=StringIO())
+
+    def test_estructura_nueva_se_completa_para_inscritos(self):
+        ProgresoService.actualizar_modulo(self.estudiante.id, self.modulos[0].id, True)
+        ProgresoService.actualizar_modulo(self.estudiante.id, self.modulos[1].id, True)
+        with override_settings(INSCRIPCION_WORKERS=0, RECONCILIACION_WORKERS=0), self.captureOnCommitCallbacks(execute=True):
+            modulo_nuevo = Modulo.objects.create(subcurso=self.subcursos[1], nombre="Módulo nuevo")
+            subcurso_nuevo = Subcurso.objects.create(curso=self.curso, nombre="Subcurso nuevo")
+            Modulo.objects.create(subcurso=subcurso_nuevo, nombre="Módulo del subcurso nuevo")
+            self.prueba.delete()
+            prueba_nueva = Prueba.objects.create(curso=self.curso, duracion=15)
+
+        self.assertTrue(EstudianteModulo.objects.filter(estudiante=self.estudiante, modulo=modulo_nuevo).exists())
+        self.assertTrue(EstudiantePrueba.objects.filter(estudiante=self.estudiante, prueba=prueba_nueva).exists())
+        estudiante_subcurso = EstudianteSubcurso.objects.get(estudiante=self.estudiante, subcurso=subcurso_nuevo)
+        self.assertEqual(estudiante_subcurso.modulos_totales, 1)
+        self.assertEqual(EstudianteModulo.objects.filter(estudiante=self.estudiante).count(), 6)
+
+        self.assertTrue(ProgresoService.actualizar_modulo(self.estudiante.id, modulo_nuevo.id, True))
+        progreso = Progreso.objects.get(estudiante=self.estudiante, curso=self.curso)
+        self.assertEqual((progreso.subcursos_completados, progreso.subcursos_totales), (1, 3))
+        self.assertEqual(progreso.porcentajeCompletado, round(0.8 * (100 + 33.33) / 3, 2))
+
+# inscripcion
+class CursoOrganizacionTestCase(TestCase):
+    """
+    Curso con tres subcursos (1, 2 y 3 módulos) y una prueba, contratado por un instructor para
+    el código ORG456, y cuatro estudiantes de ese código todavía sin inscribir.
+    """
+
+    def setUp(self):
+        empresa = Empresa.objects.create(
+            nombre="Empresa Inscripcion",
+            area="Seguridad",
+            direccion="Calle Real 456",
+            telefono="987654321",
+            correoElectronico="empresa_inscripcion@example.com",
+            numeroEmpleados=100
+        )
+        self.instructor = Instructor.objects.create(
+            first_name="Instructor",
+            last_name="Uno",
+            email="instructor_inscripcion@example.com",
+            password="Password123",
+            empresa=empresa
+        )
+        self.curso = Curso.objects.create(titulo="Curso Inscripcion", descripcion="Inscripción masiva", simulacion=False)
+        Contrato.objects.create(
+            instructor=self.instructor,
+            curso=self.curso,
+            codigoOrganizacion="ORG456",
+            fechaInicioCapacitacion="2024-01-01",
+            fechaFinCapacitacion="2024-12-31"
+        )
+        Prueba.objects.create(curso=self.curso, duracion=30)
+        for i in range(3):
+            subcurso = Subcurso.objects.create(curso=self.curso, nombre=f"Subcurso {i}")
+            for j in range(i + 1):
+                Modulo.objects.create(subcurso=subcurso, nombre=f"Módulo {j}")
+        self.estudiantes = [
+            Estudiante.objects.create(email=f"inscrito{i}@example.com", codigoOrganizacion="ORG456")
+            for i in range(4)
+        ]
+
+
+class InscripcionServiceTests(CursoOrganizacionTestCase):
+    def test_inscribir_es_idempotente_y_con_consultas_constantes(self):
+        ids = [estudiante.id for estudiante in self.estudiantes]
+        with CaptureQueriesContext(connection) as consultas:
+            totales = InscripcionService.inscribir(ids, [self.curso.id], batch_size=1000)
+        self.assertEqual(totales, {'progresos': 4, 'pruebas': 4, 'subcursos': 12, 'modulos': 24})
+        self.assertEqual(len(consultas), 4 + 4)
+
+        InscripcionService.inscribir(ids, [self.curso.id])
+        self.assertEqual(EstudianteModulo.objects.filter(estudiante_id__in=ids).count(), 24)
+        progreso = Progreso.objects.get(estudiante=self.estudiantes[0], curso=self.curso)
+        self.assertEqual(progreso.subcursos_totales, 3)
+        self.assertEqual(
+            sorted(EstudianteSubcurso.objects.filter(estudiante=self.estudiantes[0]).values_list('modulos_totales', flat=True)),
+            [1, 2, 3]
+        )
+
+    def test_estructura_cacheada_se_invalida_con_cambios(self):
+        estructura = EstructuraCurso.obtener(self.curso.id)
+        self.assertEqual(sorted(estructura['subcursos'].values()), [1, 2, 3])
+        self.assertEqual(len(estructura['pruebas']), 1)
+        with CaptureQueriesContext(connection) as consultas:
+            self.assertIs(EstructuraCurso.obtener(self.curso.id), estructura)
+        self.assertEqual(len(consultas), 0)
+
+        subcurso = Subcurso.objects.filter(curso=self.curso).first()
+        Modulo.objects.create(subcurso=subcurso, nombre="Módulo extra")
+        self.assertEqual(len(EstructuraCurso.obtener(self.curso.id)['modulos']), 7)
+        client = APIClient()
+        client.force_authenticate(user=self.instructor)
+        with CaptureQueriesContext(connection) as consultas:
+            response = client.get('/api/pruebas/verificar-prueba/', {'curso_id': self.curso.id})
+        self.assertTrue(response.json()['tiene_prueba'])
+        self.assertFalse(any('globalqhse_prueba' in consulta['sql'] for consulta in consultas.captured_queries))
+        Prueba.objects.filter(curso=self.curso).delete()
+        self.assertEqual(EstructuraCurso.obtener(self.curso.id)['pruebas'], ())
+        response = client.get('/api/pruebas/verificar-prueba/', {'curso_id': self.curso.id})
+        self.assertFalse(response.json()['tiene_prueba'])
+
+
+class ImportacionEstudiantesTests(CursoOrganizacionTestCase):
+    def test_importar_estudiantes_csv_informa_errores_por_fila(self):
+        contenido = (
+            "email,first_name,last_name,password\n"
+            "nuevo1@example.com,Ana,Uno,Password123\n"
+            "nuevo2@example.com,Luis,Dos,Password123\n"
+            "nuevo1@example.com,Ana,Repetida,Password123\n"
+            "inscrito0@example.com,Ya,Existe,Password123\n"
+            "nuevo3@example.com,Sin,Numero,Password\n"
+            "correo-invalido,Mal,Correo,Password123\n"
+            ",Sin,Correo,Password123\n"
+        ).encode()
+        client = APIClient()
+        client.force_authenticate(user=Administrador.objects.create(email="admin_importacion@example.com"))
+        self.assertEqual(client.get('/api/usuarios-total/').json()['total_estudiantes'], 4)
+        self.assertEqual(client.get('/api/usuarios-total/')['X-Cache'], 'HIT')
+        client.force_authenticate(user=self.instructor)
+        with override_settings(IMPORTACION_WORKERS=4, METRICAS_WORKERS=0), self.captureOnCommitCallbacks(execute=True), \
+                mock.patch('globalqhse.utils.importacion.ProcessPoolExecutor') as pool:
+            response = client.post(
+                '/api/importarEstudiantes/',
+                {"archivo": SimpleUploadedFile("estudiantes.csv", contenido), "codigoOrganizacion": "ORG456"},
+                format='multipart'
+            )
+        # Dentro de la petición las contraseñas se hashean sin crear un pool de procesos.
+        pool.assert_not_called()
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["procesadas"], 7)
+        self.assertEqual(response.data["creados"], 2)
+        self.assertEqual([error["fila"] for error in response.data["errores"]], [4, 5, 6, 7, 8])
+
+        estudiante = Estudiante.objects.get(email="nuevo2@example.com")
+        self.assertEqual(estudiante.codigoOrganizacion, "ORG456")
+        self.assertEqual(estudiante.rol, "estudiante")
+        self.assertTrue(estudiante.check_password("Password123"))
+        self.assertEqual(EstudianteModulo.objects.filter(estudiante=estudiante).count(), 6)
+        self.assertTrue(Progreso.objects.filter(estudiante=estudiante, curso=self.curso).exists())
+
+        self.assertTrue(MetricaPendiente.objects.filter(codigoOrganizacion="ORG456").exists())
+        client.force_authenticate(user=Administrador.objects.get(email="admin_importacion@example.com"))
+        response = client.get('/api/usuarios-total/')
+        self.assertEqual((response['X-Cache'], response.json()['total_estudiantes']), ('MISS', 6))
+
+        def importar(contenido, codigo="ORG456"):
+            return client.post(
+                '/api/importarEstudiantes/',
+                {"archivo": SimpleUploadedFile("estudiantes.csv", contenido), "codigoOrganizacion": codigo},
+                format='multipart'
+            )
+
+        # Un archivo que no es UTF-8 o un CSV mal formado es un error de los datos enviados.
+        with override_settings(METRICAS_WORKERS=0):
+            self.assertEqual(importar("email,first_name\nj\xe9@example.com,Jos\xe9\n".encode('latin-1')).status_code, 400)
+            self.assertEqual(importar(b"email,first_name\n" + b"a" * 200000 + b"\n").status_code, 400)
+
+        # Un instructor solo importa estudiantes en los códigos de sus contratos.
+        ajeno = Instructor.objects.create(email="instructor_ajeno_importacion@example.com", empresa=self.instructor.empresa)
+        client.force_authenticate(user=ajeno)
+        self.assertEqual(importar(contenido).status_code, status.HTTP_403_FORBIDDEN)
+        self.assertFalse(Estudiante.objects.filter(email="nuevo3@example.com").exists())
+
+    def test_comando_importar_estudiantes_jsonl(self):
+        with tempfile.NamedTemporaryFile('w', suffix='.jsonl', delete=False) as archivo:
+            for i in range(5):
+                archivo.write(json.dumps({
+                    "email": f"jsonl{i}@example.com", "first_name": "Json", "last_name": str(i), "password": "Password123"
+                }) + "\n")
+            archivo.write("{no es json\n")
+        salida, errores = StringIO(), StringIO()
+        call_command('importar_estudiantes', archivo.name, codigo='ORG456', lote=2, workers=2, stdout=salida, stderr=errores)
+
+        self.assertIn("Estudiantes creados: 5", salida.getvalue())
+        self.assertIn("Fila 6", errores.getvalue())
+        self.assertEqual(Progreso.objects.filter(estudiante__email__startswith="jsonl", curso=self.curso).count(), 5)
+
+
+class EliminacionContratosTests(CursoOrganizacionTestCase):
+    def test_eliminar_contratos_borra_inscripciones_por_lotes(self):
+        ids = [estudiante.id for estudiante in self.estudiantes]
+        InscripcionService.inscribir(ids, [self.curso.id])
+        tarea = CascadaInscripciones.crear_tarea("ORG456", [self.curso.id])
+        CascadaInscripciones.ejecutar(tarea.id, lote=5)
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.total, tarea.procesados, tarea.porcentaje), ('completada', 44, 44, 100.0))
+        self.assertFalse(EstudianteModulo.objects.filter(estudiante_id__in=ids).exists())
+
+        InscripcionService.inscribir(ids, [self.curso.id])
+        client = APIClient()
+        client.force_authenticate(user=self.instructor)
+        with override_settings(CASCADA_WORKERS=0):
+            response = client.delete(
+                '/api/eliminar-contrato/', {"codigoOrganizacion": "ORG456", "asincrono": True}, format='json'
+            )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data["procesados"], 44)
+        self.assertFalse(Contrato.objects.filter(codigoOrganizacion="ORG456").exists())
+        self.assertFalse(Progreso.objects.filter(estudiante_id__in=ids).exists())
+
+        url = f'/api/tareas-eliminacion/{response.data["tarea_id"]}/'
+        response = client.get(url)
+        self.assertEqual(response.data["estado"], "completada")
+        self.assertEqual(TareaEliminacion.objects.count(), 2)
+
+        # Solo el solicitante, los instructores con contratos del código y los administradores ven la tarea.
+        self.assertEqual(client.get(f'/api/tareas-eliminacion/{tarea.id}/').status_code, status.HTTP_403_FORBIDDEN)
+        client.force_authenticate(user=self.estudiantes[0])
+        self.assertEqual(client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        client.force_authenticate(user=Instructor.objects.create(email="instructor_tarea@example.com", empresa=self.instructor.empresa))
+        self.assertEqual(client.get(url).status_code, status.HTTP_403_FORBIDDEN)
+        client.force_authenticate(user=Administrador.objects.create(email="admin_tarea@example.com"))
+        self.assertEqual(client.get(f'/api/tareas-eliminacion/{tarea.id}/').status_code, status.HTTP_200_OK)
+
+    def test_reanudar_una_eliminacion_interrumpida(self):
+        ids = [estudiante.id for estudiante in self.estudiantes]
+        InscripcionService.inscribir(ids, [self.curso.id])
+        tarea = CascadaInscripciones.crear_tarea("ORG456", [self.curso.id])
+        # El proceso se detuvo después del primer lote de módulos.
+        primeros = EstudianteModulo.objects.filter(estudiante_id__in=ids).order_by('id').values_list('id', flat=True)[:10]
+        EstudianteModulo.objects.filter(id__in=list(primeros)).delete()
+        TareaEliminacion.objects.filter(id=tarea.id).update(estado='en_proceso', total=44, procesados=10)
+
+        salida = StringIO()
+        with override_settings(METRICAS_WORKERS=0), self.captureOnCommitCallbacks(execute=True):
+            call_command('reanudar_eliminaciones', lote=5, stdout=salida)
+        self.assertIn("Tareas reanudadas: 1", salida.getvalue())
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.total, tarea.procesados), ('completada', 44, 44))
+        self.assertFalse(Progreso.objects.filter(estudiante_id__in=ids).exists())
+        self.assertFalse(EstudiantePrueba.objects.filter(estudiante_id__in=ids).exists())
+        self.assertTrue(MetricaPendiente.objects.filter(codigoOrganizacion="ORG456").exists())
+        self.assertEqual(CascadaInscripciones.reanudar(), [])
+
+
+class ArchivoContratosTests(CursoOrganizacionTestCase):
+    def test_desactivar_contrato_archiva_y_reactivar_restaura(self):
+        ids = [estudiante.id for estudiante in self.estudiantes]
+        InscripcionService.inscribir(ids, [self.curso.id])
+        estudiante = self.estudiantes[0]
+        modulo = Modulo.objects.filter(subcurso__curso=self.curso).order_by('id').first()
+        ProgresoService.actualizar_modulo(estudiante.id, modulo.id, True)
+        EstudiantePrueba.objects.filter(estudiante=estudiante).update(estaAprobado=True, calificacion=90)
+        ProgresoService.reconciliar_progresos(estudiante.id, self.curso.id)
+        porcentaje = Progreso.objects.get(estudiante=estudiante, curso=self.curso).porcentajeCompletado
+
+        client = APIClient()
+        client.force_authenticate(user=self.instructor)
+        response = client.patch('/api/actualizar-contrato/', {"codigoOrganizacion": "ORG456", "activo": False}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(Progreso.objects.filter(estudiante_id__in=ids).exists())
+        self.assertFalse(EstudianteModulo.objects.filter(estudiante_id__in=ids).exists())
+        self.assertEqual(ProgresoArchivado.objects.filter(estudiante_id__in=ids).count(), 4)
+        self.assertEqual(EstudianteModuloArchivado.objects.count(), 1)
+
+        Modulo.objects.create(subcurso=modulo.subcurso, nombre="Módulo agregado durante el archivo")
+        response = client.patch('/api/actualizar-contrato/', {"codigoOrganizacion": "ORG456", "activo": True}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(ProgresoArchivado.objects.exists())
+        self.assertTrue(EstudianteModulo.objects.get(estudiante=estudiante, modulo=modulo).completado)
+        self.assertEqual(EstudianteModulo.objects.filter(estudiante_id__in=ids).count(), 28)
+        self.assertEqual(EstudiantePrueba.objects.get(estudiante=estudiante).calificacion, 90)
+        progreso = Progreso.objects.get(estudiante=estudiante, curso=self.curso)
+        self.assertLess(progreso.porcentajeCompletado, porcentaje)
+        self.assertGreater(progreso.porcentajeCompletado, 20)
+
+    def test_desactivar_dos_veces_conserva_el_archivo(self):
+        ids = [estudiante.id for estudiante in self.estudiantes]
+        InscripcionService.inscribir(ids, [self.curso.id])
+        estudiante = self.estudiantes[0]
+        modulo = Modulo.objects.filter(subcurso__curso=self.curso).order_by('id').first()
+        ProgresoService.actualizar_modulo(estudiante.id, modulo.id, True)
+        EstudiantePrueba.objects.filter(estudiante=estudiante).update(estaAprobado=True, calificacion=90)
+
+        client = APIClient()
+        client.force_authenticate(user=self.instructor)
+        for _ in range(2):
+            response = client.patch('/api/actualizar-contrato/', {"codigoOrganizacion": "ORG456", "activo": False}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(TareaEliminacion.objects.count(), 1)
+        self.assertEqual(ProgresoArchivado.objects.filter(estudiante_id__in=ids).count(), 4)
+        self.assertEqual(EstudianteModuloArchivado.objects.count(), 1)
+
+        # Una tarea repetida sobre las mismas inscripciones tampoco borra el archivo sin reemplazarlo.
+        CascadaInscripciones.iniciar(CascadaInscripciones.crear_tarea("ORG456", [self.curso.id], 'archivar'))
+        self.assertEqual(ProgresoArchivado.objects.filter(estudiante_id__in=ids).count(), 4)
+
+        response = client.patch('/api/actualizar-contrato/', {"codigoOrganizacion": "ORG456", "activo": True}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertTrue(EstudianteModulo.objects.get(estudiante=estudiante, modulo=modulo).completado)
+        self.assertEqual(EstudiantePrueba.objects.get(estudiante=estudiante).calificacion, 90)
+
+
+class DashboardAdministradorTests(CursoOrganizacionTestCase):
+    def test_dashboard_administrador_coincide_con_los_endpoints_individuales(self):
+        InscripcionService.inscribir([estudiante.id for estudiante in self.estudiantes], [self.curso.id])
+        EstudiantePrueba.objects.filter(estudiante=self.estudiantes[0]).update(estaAprobado=True, calificacion=90)
+        Progreso.objects.filter(estudiante=self.estudiantes[1]).update(porcentajeCompletado=50)
+        client = APIClient()
+        client.force_authenticate(user=Administrador.objects.create(email="admin_dashboard@example.com"))
+
+        for filtros in ({}, {'empresa_id': self.instructor.empresa_id}, {'curso_id': self.curso.id}):
+            response = client.get('/api/dashboard-administrador/', filtros)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertEqual(response['X-Query-Count'], '6')
+            data = response.json()
+            individuales = {}
+            for url in ('empresas-total', 'usuarios-total', 'cursos-total', 'progreso-promedio',
+                        'tasa-certificacion', 'tasa-aprobacion'):
+                individuales.update(client.get(f'/api/{url}/', filtros).json())
+            for clave, valor in individuales.items():
+                self.assertEqual(data[clave], valor, clave)
+            self.assertEqual(data['simulaciones'], client.get('/api/simulaciones-completadas/', filtros).json())
+            self.assertEqual(data['estudiantes_por_empresa'], client.get('/api/estudiante-empresa/').json())
+            self.assertEqual(data['instructores_por_empresa'], client.get('/api/instructor-empresa/').json())
+
+        self.assertEqual(client.get('/api/dashboard-administrador/', {'curso_id': 999999}).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class MetricasAgrupadasTests(CursoOrganizacionTestCase):
+    def test_metricas_agrupadas_con_una_consulta_ordenadas_y_paginadas(self):
+        otra = Empresa.objects.create(
+            nombre="Empresa Agrupada", area="Calidad", direccion="Av. Central 1", telefono="111222333",
+            correoElectronico="agrupada@example.com", numeroEmpleados=10,
+        )
+        instructor = Instructor.objects.create(email="instructor_agrupado@example.com", empresa=otra)
+        Contrato.objects.create(
+            instructor=instructor, curso=self.curso, codigoOrganizacion="ORG789",
+            fechaInicioCapacitacion="2024-01-01", fechaFinCapacitacion="2024-12-31",
+        )
+        nuevo = Estudiante.objects.create(email="agrupado@example.com", codigoOrganizacion="ORG789")
+        InscripcionService.inscribir([estudiante.id for estudiante in self.estudiantes] + [nuevo.id], [self.curso.id])
+        EstudiantePrueba.objects.filter(estudiante=nuevo).update(estaAprobado=True)
+        Progreso.objects.filter(estudiante=nuevo).update(porcentajeCompletado=80)
+        Progreso.objects.filter(estudiante=self.estudiantes[0]).update(porcentajeCompletado=40)
+        MetricasDiarias.reconstruir()
+
+        with contar_consultas() as contador:
+            total, filas, _ = MetricasAgrupadas('empresa', ordenar='nombre').pagina(1, 10)
+        self.assertEqual(contador['consultas'], 1)
+        self.assertEqual(total, 2)
+        self.assertEqual(filas, [
+            {'id': otra.id, 'nombre': "Empresa Agrupada", 'estudiantes': 1, 'certificados': 0,
+             'aprobacion': 100.0, 'progreso_promedio': 80.0},
+            {'id': self.instructor.empresa_id, 'nombre': "Empresa Inscripcion", 'estudiantes': 4, 'certificados': 0,
+             'aprobacion': 0.0, 'progreso_promedio': 10.0},
+        ])
+
+        client = APIClient()
+        client.force_authenticate(user=Administrador.objects.create(email="admin_agrupadas@example.com"))
+        response = client.get('/api/metricas-agrupadas/', {
+            'group_by': 'codigoOrganizacion', 'metric': 'estudiantes', 'ordering': '-estudiantes', 'page_size': 1,
+        })
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.json()
+        self.assertEqual(
+            (data['count'], data['results'], data['previous']),
+            (2, [{'id': "ORG456", 'nombre': "ORG456", 'estudiantes': 4}], None),
+        )
+        segunda = client.get(data['next']).json()
+        self.assertEqual((segunda['results'][0]['id'], segunda['next']), ("ORG789", None))
+        # El tamaño pedido se acota al máximo y los enlaces usan el tamaño aplicado.
+        with mock.patch('globalqhse.utils.paginacion.TAMANO_PAGINA_MAXIMO', 1):
+            data = client.get('/api/metricas-agrupadas/', {'group_by': 'codigoOrganizacion', 'page_size': 50}).json()
+        self.assertEqual((data['count'], len(data['results'])), (2, 1))
+        self.assertIsNotNone(data['next'])
+        curso = client.get('/api/metricas-agrupadas/', {'group_by': 'curso', 'metric': 'estudiantes,aprobacion'}).json()
+        self.assertEqual(curso['results'], [{'id': self.curso.id, 'nombre': self.curso.titulo, 'estudiantes': 5, 'aprobacion': 20.0}])
+
+        for parametros in (
+            {'group_by': 'region'},
+            {'group_by': 'curso', 'metric': 'ingresos'},
+            {'group_by': 'curso', 'metric': 'estudiantes', 'ordering': 'aprobacion'},
+            {'group_by': 'curso', 'page': 'x'},
+        ):
+            self.assertEqual(client.get('/api/metricas-agrupadas/', parametros).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(client.get('/api/metricas-agrupadas/', {'group_by': 'curso', 'page': 5}).status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CacheMetricasTests(CursoOrganizacionTestCase):
+    def test_cache_de_metricas_se_invalida_con_las_senales(self):
+        client = APIClient()
+        client.force_authenticate(user=Administrador.objects.create(email="admin_cache@example.com"))
+        antes = CacheMetricas.estadisticas()['tasa_certificacion']
+
+        primera = client.get('/api/tasa-certificacion/', {'curso_id': self.curso.id})
+        segunda = client.get('/api/tasa-certificacion/', {'curso_id': self.curso.id, 'empresa_id': ''})
+        self.assertEqual((primera['X-Cache'], segunda['X-Cache']), ('MISS', 'HIT'))
+        self.assertEqual(segunda.json(), {"tasa_certificacion": 0})
+        self.assertEqual(client.get('/api/tasa-certificacion/')['X-Cache'], 'MISS')
+        self.assertEqual(client.get('/api/empresas-total/')['X-Cache'], 'MISS')
+
+        Certificado.objects.create(estudiante=self.estudiantes[0], curso=self.curso)
+        tercera = client.get('/api/tasa-certificacion/', {'curso_id': self.curso.id})
+        self.assertEqual((tercera['X-Cache'], tercera.json()), ('MISS', {"tasa_certificacion": 25.0}))
+        self.assertEqual(client.get('/api/empresas-total/')['X-Cache'], 'HIT')
+
+        despues = client.get('/api/metricas-cache/').json()['tasa_certificacion']
+        self.assertEqual((despues['aciertos'] - antes['aciertos'], despues['fallos'] - antes['fallos']), (1, 3))
+
+        # Mientras otro proceso calcula la misma respuesta, la petición espera su resultado.
+        cache = CacheMetricas._cache()
+        clave = CacheMetricas._clave('cursos_total', QueryDict(), ('Curso', 'Contrato', 'Instructor', 'Empresa'))
+        self.assertTrue(cache.add(f'{clave}:calculando', 1))
+        threading.Timer(0.1, lambda: cache.set(clave, {"total_cursos": 99})).start()
+        response = client.get('/api/cursos-total/')
+        self.assertEqual((response['X-Cache'], response.json()), ('HIT', {"total_cursos": 99}))
+
+    def test_invalidacion_pendiente_de_la_cache_por_bloque_atomico(self):
+        def version():
+            return CacheMetricas._versiones(['Estudiante'])[0]
+
+        # La invalidación pendiente del bloque del test nunca se confirma y no debe reutilizarse.
+        CacheMetricas.invalidar('Estudiante')
+        antes = version()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with transaction.atomic():
+                CacheMetricas.invalidar('Estudiante')
+                CacheMetricas.invalidar('Estudiante')
+                self.assertEqual(version(), antes + 1)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(version(), antes + 2)
+
+
+class MetricasDiariasTests(CursoOrganizacionTestCase):
+    def test_metricas_generales_se_leen_de_las_metricas_diarias(self):
+        InscripcionService.inscribir([estudiante.id for estudiante in self.estudiantes], [self.curso.id])
+        EstudiantePrueba.objects.filter(estudiante=self.estudiantes[0]).update(estaAprobado=True)
+        Certificado.objects.create(estudiante=self.estudiantes[0], curso=self.curso)
+        otro_curso = Curso.objects.create(titulo="Curso Vigente", descripcion="Contrato activo hoy", simulacion=False)
+        Contrato.objects.create(
+            instructor=self.instructor, curso=otro_curso, codigoOrganizacion="ORG456",
+            fechaInicioCapacitacion=date.today(), fechaFinCapacitacion=date.today(),
+        )
+        self.assertEqual(MetricasDiarias.reconstruir(), 1)
+
+        with contar_consultas() as contador:
+            totales = MetricasDiarias.totales({
+                'todo': (Q(), MetricaDiaria.ALCANCE_CODIGO),
+                'empresa': (Q(empresa_id=self.instructor.empresa_id), MetricaDiaria.ALCANCE_EMPRESA),
+            })
+        self.assertEqual(contador['consultas'], 1)
+        esperado = {'estudiantes': 4, 'estudiantes_activos': 4, 'certificados': 1, 'pruebas': 4, 'pruebas_aprobadas': 1}
+        self.assertEqual(totales, {'todo': esperado, 'empresa': esperado})
+
+        client = APIClient()
+        client.force_authenticate(user=Administrador.objects.create(email="admin_metricas@example.com"))
+        data = client.get('/api/metricas-general/', {'curso_id': self.curso.id}).json()
+        self.assertEqual(
+            (data['total_estudiantes'], data['estudiantes_activos'], data['total_certificados'], data['tasa_aprobacion']),
+            (4, 0, 1, 25.0),
+        )
+        data = client.get('/api/metricas-general/', {'curso_id': otro_curso.id}).json()
+        self.assertEqual((data['total_estudiantes'], data['estudiantes_activos'], data['total_pruebas']), (4, 4, 0))
+        data = client.get('/api/metricas-instructor/', {'instructor_id': self.instructor.id}).json()
+        self.assertEqual(data['instructor_metrics']['tasa_certificacion'], 25.0)
+        self.assertEqual(data['empresa_metrics']['total_cursos'], 2)
+
+        with override_settings(METRICAS_WORKERS=0), self.captureOnCommitCallbacks(execute=True):
+            nuevo = Estudiante.objects.create(email="inscrito_nuevo@example.com", codigoOrganizacion="ORG456")
+            InscripcionService.inscribir([nuevo.id], [self.curso.id])
+        self.assertTrue(MetricaPendiente.objects.filter(codigoOrganizacion="ORG456").exists())
+        self.assertEqual(MetricasDiarias.drenar(), 1)
+        self.assertFalse(MetricaPendiente.objects.exists())
+        data = client.get('/api/metricas-general/').json()
+        self.assertEqual((data['total_estudiantes'], data['total_pruebas'], data['pruebas_aprobadas']), (5, 5, 1))
+
+        filas = sorted(MetricaDiaria.objects.values_list('curso_id', 'dia', 'estudiantes', 'certificados', 'pruebas'), key=str)
+        call_command('reconstruir_metricas', stdout=StringIO())
+        self.assertEqual(
+            sorted(MetricaDiaria.objects.values_list('curso_id', 'dia', 'estudiantes', 'certificados', 'pruebas'), key=str),
+            filas,
+        )
+
+    def test_metricas_de_un_codigo_compartido_entre_instructores(self):
+        hoy = date.today()
+        empresa = self.instructor.empresa
+        companero = Instructor.objects.create(email="instructor_companero@example.com", empresa=empresa)
+        Contrato.objects.create(
+            instructor=companero, curso=Curso.objects.create(titulo="Curso Vigente", descripcion="Hoy", simulacion=False),
+            codigoOrganizacion="ORG456", fechaInicioCapacitacion=hoy, fechaFinCapacitacion=hoy,
+        )
+        otra_empresa = Empresa.objects.create(
+            nombre="Empresa Compartida", area="Minería", direccion="Calle 2", telefono="2",
+            correoElectronico="compartida@example.com", numeroEmpleados=5,
+        )
+        externo = Instructor.objects.create(email="instructor_externo@example.com", empresa=otra_empresa)
+        # Un contrato ya terminado y otro futuro: el código no está activo hoy para este instructor.
+        for inicio, fin in ((hoy - timedelta(days=60), hoy - timedelta(days=30)), (hoy + timedelta(days=30), hoy + timedelta(days=60))):
+            Contrato.objects.create(
+                instructor=externo, curso=Curso.objects.create(titulo=f"Curso {inicio}", descripcion="x", simulacion=False),
+                codigoOrganizacion="ORG456", fechaInicioCapacitacion=inicio, fechaFinCapacitacion=fin,
+            )
+        MetricasDiarias.reconstruir()
+
+        totales = MetricasDiarias.totales({
+            'todo': (Q(), MetricaDiaria.ALCANCE_CODIGO),
+            'empresa': (Q(empresa_id=empresa.id), MetricaDiaria.ALCANCE_EMPRESA),
+            'otra_empresa': (Q(empresa_id=otra_empresa.id), MetricaDiaria.ALCANCE_EMPRESA),
+            'instructor': (Q(instructor_id=self.instructor.id), MetricaDiaria.ALCANCE_INSTRUCTOR),
+            'companero': (Q(instructor_id=companero.id), MetricaDiaria.ALCANCE_INSTRUCTOR),
+            'externo': (Q(instructor_id=externo.id), MetricaDiaria.ALCANCE_INSTRUCTOR),
+        })
+        self.assertEqual(
+            {nombre: (medidas['estudiantes'], medidas['estudiantes_activos']) for nombre, medidas in totales.items()},
+            {'todo': (4, 4), 'empresa': (4, 4), 'otra_empresa': (4, 0), 'instructor': (4, 0), 'companero': (4, 4), 'externo': (4, 0)},
+        )
+
+        _, instructores, _ = MetricasAgrupadas('instructor', ['estudiantes']).pagina(1, 10)
+        self.assertEqual({fila['id']: fila['estudiantes'] for fila in instructores}, {
+            self.instructor.id: 4, companero.id: 4, externo.id: 4,
+        })
+        _, empresas, _ = MetricasAgrupadas('empresa', ['estudiantes']).pagina(1, 10)
+        self.assertEqual({fila['id']: fila['estudiantes'] for fila in empresas}, {empresa.id: 4, otra_empresa.id: 4})
+        _, codigos, _ = MetricasAgrupadas('codigoOrganizacion', ['estudiantes']).pagina(1, 10)
+        self.assertEqual(codigos, [{'id': "ORG456", 'nombre': "ORG456", 'estudiantes': 4}])
+
+        fila = RankingInstructor.objects.get(empresa=empresa, instructor__isnull=True)
+        self.assertEqual((fila.instructores, fila.estudiantes), (2, 4))
+        self.assertEqual(RankingInstructor.objects.get(instructor=companero).estudiantes, 4)
+
+
+class EventosAvanceTests(CursoOrganizacionTestCase):
+    def test_eventos_de_avance_alimentan_las_tendencias_y_se_compactan(self):
+        estudiante = self.estudiantes[0]
+        InscripcionService.inscribir([estudiante.id], [self.curso.id])
+        modulos = list(Modulo.objects.filter(subcurso__curso=self.curso).values_list('id', flat=True))
+        ProgresoService.actualizar_modulos([(estudiante.id, modulo_id, True) for modulo_id in modulos])
+        ProgresoService.actualizar_modulos([(estudiante.id, modulo_id, True) for modulo_id in modulos])
+        # Desmarcar y volver a completar un módulo no cuenta como un segundo avance.
+        ProgresoService.actualizar_modulo(estudiante.id, modulos[0], False)
+        ProgresoService.actualizar_modulo(estudiante.id, modulos[0], True)
+        prueba = EstudiantePrueba.objects.get(estudiante=estudiante)
+        self.assertEqual(EventosAvance.registrar(EventoAvance.PRUEBA, [(estudiante.id, self.curso.id, prueba.prueba_id)] * 2), 1)
+        self.assertEqual(EventosAvance.registrar(EventoAvance.PRUEBA, [(estudiante.id, self.curso.id, prueba.prueba_id)]), 0)
+        EstudiantePrueba.objects.filter(estudiante=estudiante).update(estaAprobado=True)
+        ProgresoService.recalcular_progresos(estudiante.id, self.curso.id)
+        ProgresoService.recalcular_progresos(estudiante.id, self.curso.id)
+
+        empresa_id = self.instructor.empresa_id
+        self.assertEqual(EventoAvance.objects.filter(tipo=EventoAvance.MODULO, empresa_id=empresa_id).count(), len(modulos))
+        self.assertEqual(EventoAvance.objects.filter(tipo=EventoAvance.CURSO, estudiante=estudiante).count(), 1)
+
+        hoy = date.today()
+        with contar_consultas() as contador:
+            serie = EventosAvance.tendencias('modulo', hoy - timedelta(days=6), hoy, curso_id=self.curso.id)
+        self.assertEqual(contador['consultas'], 1)
+        self.assertEqual(len(serie), 7)
+        self.assertEqual(serie[-1], {'fecha': hoy, 'cantidad': len(modulos)})
+
+        client = APIClient()
+        client.force_authenticate(user=Administrador.objects.create(email="admin_tendencias@example.com"))
+        data = client.get('/api/tendencias/', {'tipo': 'curso', 'intervalo': 'semana', 'empresa_id': empresa_id}).json()
+        self.assertEqual(data['total'], 1)
+        self.assertTrue(all(date.fromisoformat(punto['fecha']).weekday() == 0 for punto in data['serie']))
+        self.assertEqual(client.get('/api/tendencias/', {'tipo': 'otro'}).status_code, 400)
+
+        antiguos = [
+            EventoAvance(tipo=EventoAvance.MODULO, curso=self.curso, empresa_id=empresa_id,
+                         estudiante=estudiante, objeto=modulos[0], fecha=fecha)
+            for fecha in (hoy - timedelta(days=100),) * 3 + (hoy - timedelta(days=400),) * 2 + (hoy - timedelta(days=800),)
+        ]
+        EventoAvance.objects.bulk_create(antiguos)
+        resumen = EventosAvance.compactar()
+        self.assertEqual((resumen['eliminados'], resumen['diarios'], resumen['semanales']), (1, (3, 1), (2, 1)))
+        self.assertEqual(
+            EventosAvance.tendencias('modulo', hoy - timedelta(days=100), hoy - timedelta(days=100),
+                                     curso_id=self.curso.id, objeto=modulos[0]),
+            [{'fecha': hoy - timedelta(days=100), 'cantidad': 3}],
+        )
+        self.assertEqual(EventosAvance.compactar(), {'eliminados': 0, 'diarios': (0, 0), 'semanales': (0, 0)})
+
+        # Después de compactar los eventos del estudiante, volver a completar un módulo no cuenta otra vez.
+        EventosAvance.compactar(hoy=hoy + timedelta(days=200))
+        self.assertFalse(EventoAvance.objects.filter(estudiante=estudiante).exists())
+        ProgresoService.actualizar_modulo(estudiante.id, modulos[1], False)
+        ProgresoService.actualizar_modulo(estudiante.id, modulos[1], True)
+        self.assertFalse(EventoAvance.objects.filter(estudiante=estudiante).exists())
+
+
+class DistribucionProgresoTests(CursoOrganizacionTestCase):
+    def test_distribucion_del_progreso_por_curso(self):
+        InscripcionService.inscribir([estudiante.id for estudiante in self.estudiantes], [self.curso.id])
+        for estudiante, porcentaje in zip(self.estudiantes, (0, 15, 55, 100)):
+            Progreso.objects.filter(estudiante=estudiante, curso=self.curso).update(
+                porcentajeCompletado=porcentaje, completado=porcentaje == 100
+            )
+
+        with contar_consultas() as contador:
+            (curso,) = DistribucionProgreso(instructor_id=self.instructor.id).calcular()
+        self.assertLessEqual(contador['consultas'], 2)
+        self.assertEqual((curso['no_iniciados'], curso['en_curso'], curso['completados']), (1, 2, 1))
+        self.assertEqual([tramo['cantidad'] for tramo in curso['histograma']], [1, 1, 0, 0, 0, 1, 0, 0, 0, 1])
+        self.assertEqual(curso['percentiles'], {'p25': 11.25, 'p50': 35.0, 'p90': 86.5})
+        self.assertEqual(percentil_cont([(0, 1), (15, 1), (55, 1), (100, 1)], 0.9), 86.5)
+        self.assertEqual(DistribucionProgreso(empresa_id=self.instructor.empresa_id + 1).calcular(), [])
+
+        client = APIClient()
+        client.force_authenticate(user=Administrador.objects.create(email="admin_distribucion@example.com"))
+        data = client.get('/api/progreso-distribucion/', {'curso_id': self.curso.id}).json()
+        self.assertEqual(data['cursos'][0]['promedio'], 42.5)
+        self.assertEqual(client.get('/api/progreso-distribucion/', {'curso_id': 'x'}).status_code, 400)
+
+
+class RankingInstructoresTests(CursoOrganizacionTestCase):
+    def test_ranking_de_instructores_por_empresa_y_global(self):
+        empresa = self.instructor.empresa
+        segundo = Instructor.objects.create(email="instructor_ranking@example.com", empresa=empresa)
+        Contrato.objects.create(
+            instructor=segundo, curso=self.curso, codigoOrganizacion="ORG789",
+            fechaInicioCapacitacion="2024-01-01", fechaFinCapacitacion="2024-12-31",
+        )
+        otros = [Estudiante.objects.create(email=f"ranking{i}@example.com", codigoOrganizacion="ORG789") for i in range(2)]
+        otra_empresa = Empresa.objects.create(
+            nombre="Empresa Ranking", area="Minería", direccion="Calle 1", telefono="1",
+            correoElectronico="ranking@example.com", numeroEmpleados=5,
+        )
+        tercero = Instructor.objects.create(email="instructor_ranking_2@example.com", empresa=otra_empresa)
+        Certificado.objects.create(estudiante=self.estudiantes[0], curso=self.curso)
+        Certificado.objects.create(estudiante=otros[0], curso=self.curso)
+        MetricasDiarias.reconstruir()
+
+        posiciones = dict(RankingInstructor.objects.filter(instructor__isnull=False).values_list(
+            'instructor_id', 'posicionCertificacion'
+        ))
+        self.assertEqual(posiciones, {segundo.id: 1, self.instructor.id: 2, tercero.id: 3})
+        with contar_consultas() as contador:
+            del_instructor, de_empresa = RankingInstructores.comparacion(self.instructor.id)
+        self.assertEqual(contador['consultas'], 1)
+        self.assertEqual((del_instructor.tasaCertificacion, del_instructor.posicionEmpresaCertificacion), (25.0, 2))
+        self.assertEqual((de_empresa.instructores, de_empresa.estudiantes, de_empresa.tasaCertificacion), (2, 6, 33.33))
+        self.assertEqual(de_empresa.posicionCertificacion, 1)
+
+        Certificado.objects.create(estudiante=self.estudiantes[1], curso=self.curso)
+        MetricasDiarias.recalcular(["ORG456"])
+        self.assertEqual(
+            list(RankingInstructores.pagina('certificacion', empresa.id)[1][i]['posicion'] for i in range(2)), [1, 1]
+        )
+
+        client = APIClient()
+        client.force_authenticate(user=Administrador.objects.create(email="admin_ranking@example.com"))
+        data = client.get('/api/ranking-instructores/', {'page_size': 2}).json()
+        self.assertEqual((data['count'], len(data['results'])), (3, 2))
+        self.assertIsNotNone(data['next'])
+        with mock.patch('globalqhse.utils.paginacion.TAMANO_PAGINA_MAXIMO', 2):
+            data = client.get('/api/ranking-instructores/', {'page_size': 50}).json()
+        self.assertEqual((data['count'], len(data['results'])), (3, 2))
+        self.assertIsNotNone(data['next'])
+        self.assertEqual(client.get('/api/ranking-instructores/', {'metrica': 'otra'}).status_code, 400)
+
+        client.force_authenticate(user=Usuario.objects.get(id=tercero.id))
+        data = client.get('/api/ranking-instructores/comparacion/').json()
+        self.assertEqual((data['instructor']['posicion_empresa']['certificacion'], data['empresa']['total_instructores']), (1, 1))
+        self.assertEqual(
+            client.get('/api/ranking-instructores/comparacion/', {'instructor_id': segundo.id}).status_code, 403
+        )
+
+
+class ExportacionNominaTests(CursoOrganizacionTestCase):
+    def test_exportacion_de_nomina_en_csv_y_xlsx(self):
+        otro_instructor = Instructor.objects.create(email="instructor_nomina@example.com", empresa=self.instructor.empresa)
+        Contrato.objects.create(
+            instructor=otro_instructor, curso=self.curso, codigoOrganizacion="ORG999",
+            fechaInicioCapacitacion="2024-01-01", fechaFinCapacitacion="2024-12-31",
+        )
+        externo = Estudiante.objects.create(email="externo_nomina@example.com", codigoOrganizacion="ORG999")
+        InscripcionService.inscribir([estudiante.id for estudiante in self.estudiantes] + [externo.id], [self.curso.id])
+        primero = self.estudiantes[0]
+        Usuario.objects.filter(id=primero.id).update(first_name='=HYPERLINK("http://x")', last_name='-1')
+        Progreso.objects.filter(estudiante=primero).update(porcentajeCompletado=100, completado=True)
+        EstudiantePrueba.objects.filter(estudiante=primero).update(calificacion=80, estaAprobado=True)
+        Certificado.objects.create(estudiante=primero, curso=self.curso, estado='listo')
+        Certificado.objects.create(estudiante=self.estudiantes[1], curso=self.curso, estado='pendiente')
+
+        with contar_consultas() as contador:
+            filas = list(ExportacionNomina("ORG456", lote=2).filas())
+        self.assertEqual(contador['consultas'], 1)
+        self.assertEqual(len(filas), 4)
+        por_estudiante = {fila[0]: fila for fila in filas}
+        self.assertEqual(
+            por_estudiante[primero.id][7:],
+            (100.0, 'Sí', 80.0, 'Sí', 'No aplica', date.today().isoformat()),
+        )
+        self.assertEqual(por_estudiante[self.estudiantes[1].id][-1], '')
+        self.assertEqual(por_estudiante[primero.id][2:4], ('\'=HYPERLINK("http://x")', "'-1"))
+
+        client = APIClient()
+        client.force_authenticate(user=Usuario.objects.get(id=self.instructor.id))
+        response = client.get('/api/nomina/exportar/', {'codigoOrganizacion': 'ORG456'})
+        self.assertEqual(response['Content-Type'], 'text/csv; charset=utf-8')
+        lineas = list(csv.reader(io.StringIO(b''.join(response.streaming_content).decode('utf-8-sig'))))
+        self.assertEqual((lineas[0], len(lineas)), (list(ExportacionNomina.COLUMNAS), 5))
+        self.assertTrue(all(not linea[2].startswith('=') for linea in lineas))
+
+        # Por curso, el instructor solo ve a los estudiantes de sus propios códigos.
+        response = client.get('/api/nomina/exportar/', {'curso_id': self.curso.id, 'formato': 'xlsx'})
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as xlsx:
+            self.assertIn('xl/workbook.xml', xlsx.namelist())
+            hoja = xlsx.read('xl/worksheets/sheet1.xml').decode('utf-8')
+        self.assertEqual(hoja.count('<row>'), 5)
+        self.assertIn(primero.email, hoja)
+        self.assertNotIn(externo.email, hoja)
+
+        self.assertEqual(client.get('/api/nomina/exportar/', {'codigoOrganizacion': 'ORG456', 'formato': 'pdf'}).status_code, 400)
+        self.assertEqual(client.get('/api/nomina/exportar/', {'codigoOrganizacion': 'OTRO'}).status_code, 403)
+        self.assertEqual(client.get('/api/nomina/exportar/', {'codigoOrganizacion': 'ORG999'}).status_code, 403)
+
+        client.force_authenticate(user=Administrador.objects.create(email="admin_nomina@example.com"))
+        response = client.get('/api/nomina/exportar/', {'curso_id': self.curso.id})
+        self.assertEqual(len(b''.join(response.streaming_content).decode('utf-8-sig').splitlines()), 6)
+
+
+class DashboardEstudianteTests(CursoOrganizacionTestCase):
+    def test_dashboard_del_estudiante_con_consultas_constantes_y_etag(self):
+        estudiante = self.estudiantes[0]
+        InscripcionService.inscribir([estudiante.id], [self.curso.id])
+        with contar_consultas() as contador:
+            DashboardEstudiante(estudiante.id).construir()
+        consultas = contador['consultas']
+
+        otro_curso = Curso.objects.create(titulo="Curso Dashboard", descripcion="Segundo curso", simulacion=True)
+        for i in range(2):
+            subcurso = Subcurso.objects.create(curso=otro_curso, nombre=f"Subcurso extra {i}")
+            Modulo.objects.create(subcurso=subcurso, nombre="Módulo extra")
+        Contrato.objects.create(
+            instructor=self.instructor, curso=otro_curso, codigoOrganizacion="ORG456",
+            fechaInicioCapacitacion="2024-01-01", fechaFinCapacitacion="2024-12-31",
+        )
+        InscripcionService.inscribir([estudiante.id], [otro_curso.id])
+        with contar_consultas() as contador:
+            cursos = DashboardEstudiante(estudiante.id).construir()
+        self.assertEqual(contador['consultas'], consultas)
+        self.assertEqual([curso['curso_id'] for curso in cursos], sorted([self.curso.id, otro_curso.id]))
+        curso = next(curso for curso in cursos if curso['curso_id'] == self.curso.id)
+        self.assertEqual([len(subcurso['modulos']) for subcurso in curso['subcursos']], [1, 2, 3])
+        self.assertEqual((curso['prueba']['estaAprobado'], curso['certificado']), (False, None))
+
+        client = APIClient()
+        client.force_authenticate(user=Usuario.objects.get(id=estudiante.id))
+        response = client.get('/api/me/dashboard/')
+        self.assertEqual(response.status_code, 200)
+        etag = response['ETag']
+        self.assertEqual(client.get('/api/me/dashboard/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        modulo = curso['subcursos'][0]['modulos'][0]['id']
+        ProgresoService.actualizar_modulo(estudiante.id, modulo, True)
+        response = client.get('/api/me/dashboard/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        datos = next(curso for curso in response.json()['cursos'] if curso['curso_id'] == self.curso.id)
+        self.assertEqual((datos['subcursos'][0]['modulos'][0]['completado'], datos['subcursos'][0]['completado']), (True, True))
+
+        client.force_authenticate(user=Usuario.objects.get(id=self.instructor.id))
+        self.assertEqual(client.get('/api/me/dashboard/').status_code, 403)
+
+
+class PlantillaCertificadoTests(TestCase):
+    def test_renderizar_genera_un_pdf_legible(self):
+        pdf = PlantillaCertificado.obtener().renderizar(
+            "José Pérez (Jr)", "Seguridad Industrial", "01 de March de 2025", codigo="ABC123"
+        )
+        lector = PdfReader(io.BytesIO(pdf), strict=True)
+        self.assertEqual(len(lector.pages), 1)
+        pagina = lector.pages[0]
+        self.assertEqual(set(pagina['/Resources']['/Font']), {'/F1', '/F2'})
+        self.assertIn('/Fondo', pagina['/Resources']['/XObject'])
+
+        texto = pagina.extract_text()
+        for fragmento in (
+            "CERTIFICADO DE RECONOCIMIENTO", "Otorgado a", "José Pérez (Jr)", "Seguridad Industrial",
+            "Fecha de emisión: 01 de March de 2025", "Código de verificación: ABC123", "Firma Autorizada - Global QHSE",
+        ):
+            self.assertIn(fragmento, texto)
+
+    def test_emitir_certificado_usa_la_plantilla(self):
+        empresa = Empresa.objects.create(
+            nombre="Empresa Certificados", area="Seguridad", direccion="Calle 1", telefono="123",
+            correoElectronico="empresa_certificados@example.com", numeroEmpleados=10
+        )
+        instructor = Instructor.objects.create(email="instructor_certificados@example.com", empresa=empresa)
+        curso = Curso.objects.create(titulo="Primeros Auxilios", descripcion="Curso", simulacion=False)
+        Contrato.objects.create(
+            instructor=instructor, curso=curso, codigoOrganizacion="ORG789",
+            fechaInicioCapacitacion="2024-01-01", fechaFinCapacitacion="2024-12-31"
+        )
+        estudiante = Estudiante.objects.create(
+            email="certificado@example.com", first_name="Ana", last_name="Mora", codigoOrganizacion="ORG789"
+        )
+        Progreso.objects.filter(estudiante=estudiante, curso=curso).delete()
+        client = APIClient()
+        client.force_authenticate(user=instructor)
+
+        with self.settings(CERTIFICADO_WORKERS=0), self.captureOnCommitCallbacks() as callbacks:
+            Progreso.objects.create(estudiante=estudiante, curso=curso, completado=True, porcentajeCompletado=100)
+        self.assertEqual(Certificado.objects.get(estudiante=estudiante, curso=curso).estado, 'pendiente')
+        response = client.get('/api/certificado/', {'curso_id': curso.id, 'estudiante_id': estudiante.id})
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.json()['estado'], 'pendiente')
+
+        with self.settings(CERTIFICADO_WORKERS=0):
+            for callback in callbacks:
+                callback()
+        certificado = Certificado.objects.get(estudiante=estudiante, curso=curso)
+        self.assertEqual(certificado.estado, 'listo')
+        with certificado.archivoPdf.open('rb') as archivo:
+            contenido = archivo.read()
+        self.assertIn(b"(Ana Mora)", contenido)
+        self.assertIn(b"(Primeros Auxilios)", contenido)
+        self.assertEqual(len(certificado.codigoVerificacion), 10)
+        self.assertIn(f"(Código de verificación: {certificado.codigoVerificacion})".encode('cp1252'), contenido)
+        self.assertEqual(certificado.hashPdf, hashlib.sha256(contenido).hexdigest())
+
+        publico = APIClient()
+        codigo = certificado.codigoVerificacion
+        with self.assertNumQueries(1):
+            response = publico.get(f'/api/verificar-certificado/{codigo[:5]}-{codigo[5:].lower()}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['estudiante'], "Ana Mora")
+        self.assertIn('public', response['Cache-Control'])
+        response = publico.get('/api/verificar-certificado/', {'sha256': certificado.hashPdf})
+        self.assertEqual(response.json()['codigoVerificacion'], codigo)
+        self.assertEqual(publico.get('/api/verificar-certificado/XXXXXXXXXX/').status_code, status.HTTP_404_NOT_FOUND)
+
+        url = f'/api/certificado/?curso_id={curso.id}&estudiante_id={estudiante.id}'
+        response = client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(response.streaming_content), contenido)
+        self.assertEqual(response['Content-Length'], str(len(contenido)))
+        etag = response['ETag']
+
+        self.assertEqual(client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+        response = client.get(url, HTTP_RANGE='bytes=0-7')
+        self.assertEqual(response.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(response.streaming_content), b'%PDF-1.4')
+        self.assertEqual(response['Content-Range'], f'bytes 0-7/{len(contenido)}')
+        response = client.get(url, HTTP_RANGE='bytes=-5', HTTP_IF_RANGE=etag)
+        self.assertEqual(b''.join(response.streaming_content), contenido[-5:])
+        response = client.get(url, HTTP_RANGE=f'bytes={len(contenido)}-')
+        self.assertEqual(response.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+
+        with self.settings(DESCARGAS_MODO='x-accel', DESCARGAS_X_ACCEL_PREFIJO='/protegido/'):
+            response = client.get(url)
+        self.assertEqual(response['X-Accel-Redirect'], f'/protegido/{certificado.archivoPdf.name}')
+        self.assertEqual(response.content, b'')
+        certificado.archivoPdf.delete()
+
+
+class ColaCertificadosTests(TestCase):
+    def test_generar_reintenta_y_marca_fallido(self):
+        curso = Curso.objects.create(titulo="Curso Fallido", descripcion="Curso", simulacion=False)
+        certificado = Certificado.objects.create(curso=curso)
+        with self.settings(CERTIFICADO_REINTENTOS=2, CERTIFICADO_ESPERA_REINTENTO=0), \
+                mock.patch.object(Certificado, 'generar_pdf', side_effect=OSError("disco lleno")) as generar_pdf:
+            self.assertEqual(ColaCertificados.generar(certificado.id), 'fallido')
+        self.assertEqual(generar_pdf.call_count, 2)
+        certificado.refresh_from_db()
+        self.assertEqual((certificado.estado, certificado.intentos, certificado.error), ('fallido', 2, "disco lleno"))
+
+
+class EmisionMasivaCertificadosTests(TestCase):
+    def test_emision_masiva_omite_listos_y_se_puede_repetir(self):
+        empresa = Empresa.objects.create(
+            nombre="Empresa Emision", area="Seguridad", direccion="Calle 2", telefono="456",
+            correoElectronico="empresa_emision@example.com", numeroEmpleados=10
+        )
+        instructor = Instructor.objects.create(email="instructor_emision@example.com", empresa=empresa)
+        curso = Curso.objects.create(titulo="Trabajo en Alturas", descripcion="Curso", simulacion=False)
+        Contrato.objects.create(
+            instructor=instructor, curso=curso, codigoOrganizacion="ORG999",
+            fechaInicioCapacitacion="2024-01-01", fechaFinCapacitacion="2024-12-31"
+        )
+        estudiantes = [
+            Estudiante.objects.create(
+                email=f"emision{i}@example.com", first_name="Estudiante", last_name=str(i), codigoOrganizacion="ORG999"
+            )
+            for i in range(3)
+        ]
+        InscripcionService.inscribir([estudiante.id for estudiante in estudiantes], [curso.id])
+        Progreso.objects.filter(curso=curso).update(completado=True, porcentajeCompletado=100)
+        Certificado.objects.create(estudiante=estudiantes[0], curso=curso, estado='listo')
+        fallido = Certificado.objects.create(estudiante=estudiantes[1], curso=curso, estado='fallido', intentos=3)
+        fallido.archivoPdf.save(f"certificado_{curso.id}_{estudiantes[1].id}.pdf", ContentFile(b"viejo"))
+        Certificado.objects.filter(pk=fallido.pk).update(fechaEmision=date(2024, 1, 15))
+        archivo_anterior = fallido.archivoPdf.name
+        storage = fallido.archivoPdf.storage
+
+        guardados = []
+
+        def guardar(nombre, contenido):
+            guardados.append(guardar_original(nombre, contenido))
+            return guardados[-1]
+
+        guardar_original = storage.save
+        with mock.patch.object(storage, 'save', side_effect=guardar), \
+                mock.patch.object(Certificado.objects, 'bulk_create', side_effect=DatabaseError("sin conexión")):
+            with self.assertRaises(DatabaseError):
+                EmisionMasivaCertificados("ORG999").emitir()
+        # Los PDF escritos por un lote que no se confirmó se borran.
+        self.assertEqual(len(guardados), 2)
+        self.assertFalse(any(storage.exists(nombre) for nombre in guardados))
+        self.assertTrue(storage.exists(archivo_anterior))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            resumen = EmisionMasivaCertificados("ORG999").emitir()
+        self.assertEqual((resumen['elegibles'], resumen['emitidos'], resumen['errores']), (2, 2, []))
+        certificados = Certificado.objects.filter(curso=curso, estudiante__in=estudiantes[1:])
+        self.assertEqual(set(certificados.values_list('estado', flat=True)), {'listo'})
+        # El certificado reemitido lleva la fecha de la nueva emisión, no la del intento fallido.
+        self.assertEqual(set(certificados.values_list('fechaEmision', flat=True)), {timezone.localdate()})
+        # El nombre ocupado por el certificado fallido obliga a guardar el nuevo con otro nombre,
+        # y el archivo anterior se borra al confirmar.
+        self.assertNotEqual(certificados.get(estudiante=estudiantes[1]).archivoPdf.name, archivo_anterior)
+        self.assertFalse(storage.exists(archivo_anterior))
+        for certificado in certificados:
+            with certificado.archivoPdf.open('rb') as archivo:
+                self.assertIn(f"(Estudiante {certificado.estudiante.last_name})".encode(), archivo.read())
+            certificado.archivoPdf.delete()
+
+        client = APIClient()
+        client.force_authenticate(user=instructor)
+        response = client.post('/api/emitir-certificados-organizacion/', {"codigoOrganizacion": "ORG999"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+        client.force_authenticate(user=Administrador.objects.create(email="admin_emision@example.com"))
+        response = client.post('/api/emitir-certificados-organizacion/', {"codigoOrganizacion": "ORG999"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.json()['elegibles'], 0)
+        for curso_ids in (["1"], [True], [1.5], "1"):
+            response = client.post(
+                '/api/emitir-certificados-organizacion/', {"codigoOrganizacion": "ORG999", "curso_ids": curso_ids}, format='json'
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ExportacionZipCertificadosTests(TestCase):
+    def test_exportacion_zip_de_certificados(self):
+        empresa = Empresa.objects.create(
+            nombre="Empresa Zip", area="Seguridad", direccion="Calle 3", telefono="789",
+            correoElectronico="empresa_zip@example.com", numeroEmpleados=10
+        )
+        instructor = Instructor.objects.create(email="instructor_zip@example.com", empresa=empresa)
+        ajeno = Instructor.objects.create(email="instructor_zip_ajeno@example.com", empresa=empresa)
+        curso = Curso.objects.create(titulo="Trabajo en Alturas", descripcion="Curso", simulacion=False)
+        for dueno, codigo in ((instructor, "ORGZIP"), (ajeno, "ORGAJENO")):
+            Contrato.objects.create(
+                instructor=dueno, curso=curso, codigoOrganizacion=codigo,
+                fechaInicioCapacitacion="2024-01-01", fechaFinCapacitacion="2024-12-31"
+            )
+        estudiantes = [
+            Estudiante.objects.create(
+                email=f"zip{i}@example.com", first_name="Estudiante", last_name=str(i),
+                codigoOrganizacion="ORGAJENO" if i == 3 else "ORGZIP",
+            )
+            for i in range(4)
+        ]
+        certificados = []
+        for estudiante in estudiantes[1:]:
+            certificado = Certificado(estudiante=estudiante, curso=curso, estado='listo')
+            certificado.generar_pdf()
+            certificado.save()
+            certificados.append(certificado)
+        Certificado.objects.create(estudiante=estudiantes[0], curso=curso, estado='fallido')
+
+        client = APIClient()
+        client.force_authenticate(user=Administrador.objects.create(email="admin_zip@example.com"))
+        response = client.get('/api/certificados/zip/', {'codigoOrganizacion': 'ORGZIP', 'curso_id': curso.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as zip_:
+            self.assertEqual(
+                zip_.namelist(),
+                [f"{curso.id}_Trabajo_en_Alturas/1_Estudiante_{estudiantes[1].id}.pdf",
+                 f"{curso.id}_Trabajo_en_Alturas/2_Estudiante_{estudiantes[2].id}.pdf"]
+            )
+            self.assertEqual({info.compress_type for info in zip_.infolist()}, {zipfile.ZIP_STORED})
+            self.assertTrue(zip_.read(zip_.namelist()[0]).startswith(b"%PDF-1.4"))
+        self.assertEqual(client.get('/api/certificados/zip/').status_code, status.HTTP_400_BAD_REQUEST)
+
+        # Por curso, el instructor solo recibe los certificados de sus propios códigos.
+        client.force_authenticate(user=instructor)
+        response = client.get('/api/certificados/zip/', {'curso_id': curso.id})
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as zip_:
+            self.assertEqual(len(zip_.namelist()), 2)
+        self.assertEqual(client.get('/api/certificados/zip/', {'codigoOrganizacion': 'ORGAJENO'}).status_code, 403)
+        for certificado in certificados:
+            certificado.archivoPdf.delete()
+
+
+class ServirArchivoTests(TestCase):
+    def setUp(self):
+        self.contenido = b"0123456789" * 10
+        campo = Certificado._meta.get_field('archivoPdf')
+        nombre = campo.storage.save(campo.generate_filename(None, "descarga.pdf"), ContentFile(self.contenido))
+        self.archivo = FieldFile(None, campo, nombre)
+
+    def tearDown(self):
+        self.archivo.storage.delete(self.archivo.name)
+
+    def _servir(self, **cabeceras):
+        return servir_archivo(RequestFactory().get('/descarga/', **cabeceras), self.archivo, 'application/pdf')
+
+    def test_x_accel_codifica_el_nombre(self):
+        campo = Certificado._meta.get_field('archivoPdf')
+        nombre = campo.storage.save(campo.generate_filename(None, "año ñandú.pdf"), ContentFile(self.contenido))
+        self.addCleanup(campo.storage.delete, nombre)
+        with self.settings(DESCARGAS_MODO='x-accel', DESCARGAS_X_ACCEL_PREFIJO='/protegido/'):
+            response = servir_archivo(RequestFactory().get('/descarga/'), FieldFile(None, campo, nombre))
+        self.assertEqual(
+            response['X-Accel-Redirect'], '/protegido/' + nombre.replace('año_ñandú', 'a%C3%B1o_%C3%B1and%C3%BA')
+        )
+
+    def test_rangos_y_validadores(self):
+        completa = self._servir()
+        self.assertEqual(completa.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(completa.streaming_content), self.contenido)
+        self.assertEqual(completa['Accept-Ranges'], 'bytes')
+        etag, modificado = completa['ETag'], completa['Last-Modified']
+        completa.close()
+
+        parcial = self._servir(HTTP_RANGE='bytes=10-19')
+        self.assertEqual(parcial.status_code, status.HTTP_206_PARTIAL_CONTENT)
+        self.assertEqual(b''.join(parcial.streaming_content), self.contenido[10:20])
+        self.assertEqual((parcial['Content-Range'], parcial['Content-Length']), ('bytes 10-19/100', '10'))
+        self.assertEqual(b''.join(self._servir(HTTP_RANGE='bytes=95-').streaming_content), self.contenido[95:])
+        self.assertEqual(b''.join(self._servir(HTTP_RANGE='bytes=-3').streaming_content), self.contenido[-3:])
+
+        for rango in ('bytes=100-', 'bytes=20-10'):
+            fuera = self._servir(HTTP_RANGE=rango)
+            self.assertEqual(fuera.status_code, status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE)
+            self.assertEqual(fuera['Content-Range'], 'bytes */100')
+
+        # Con If-Range que coincide se atiende el rango; si no coincide se envía el archivo completo.
+        self.assertEqual(self._servir(HTTP_RANGE='bytes=0-4', HTTP_IF_RANGE=etag).status_code, 206)
+        self.assertEqual(self._servir(HTTP_RANGE='bytes=0-4', HTTP_IF_RANGE=modificado).status_code, 206)
+        distinta = self._servir(HTTP_RANGE='bytes=0-4', HTTP_IF_RANGE='"otra-version"')
+        self.assertEqual(distinta.status_code, status.HTTP_200_OK)
+        self.assertEqual(b''.join(distinta.streaming_content), self.contenido)
+        distinta.close()
+        antigua = self._servir(HTTP_RANGE='bytes=0-4', HTTP_IF_RANGE='Mon, 01 Jan 2001 00:00:00 GMT')
+        self.assertEqual(antigua.status_code, status.HTTP_200_OK)
+        antigua.close()
+
+        self.assertEqual(self._servir(HTTP_IF_NONE_MATCH=etag).status_code, status.HTTP_304_NOT_MODIFIED)
+
+
+@override_settings(
+    PROGRESO_WORKERS=0, INSCRIPCION_WORKERS=0, RECONCILIACION_WORKERS=0, CERTIFICADO_WORKERS=0, METRICAS_WORKERS=0,
+)
+class BenchmarkComandosTests(TransactionTestCase):
+    """
+    Los benchmarks crean los módulos con `bulk_create`, que no dispara `post_save`: deben medir
+    inscripciones y progresos correctos con la estructura recién creada. Sin la transacción de
+    `TestCase`, los `on_commit` de las señales se ejecutan (y cachean la estructura) como en producción.
+    """
+
+    def test_benchmark_progreso_completa_el_contenido(self):
+        salida = StringIO()
+        call_command('benchmark_progreso', estudiantes=3, subcursos=2, modulos=3, stdout=salida)
+        self.assertIn("[sync] progresos con contenido completo: 3/3", salida.getvalue())
+        self.assertIn("[deferred] progresos con contenido completo: 3/3", salida.getvalue())
+
+    def test_benchmark_inscripcion_inscribe_todos_los_modulos(self):
+        salida = StringIO()
+        call_command('benchmark_inscripcion', estudiantes=4, subcursos=3, modulos=4, stdout=salida)
+        self.assertIn("4 estudiantes x 12 módulos", salida.getvalue())
+        self.assertRegex(salida.getvalue(), r"modulos: 48\b")
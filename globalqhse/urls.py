@@ -5,12 +5,20 @@ from drf_yasg import openapi
 from rest_framework import permissions
 from .views import InstructorCursosTasaFinalizacionAPIView, InstructorGeneralMetricsAPIView, PreguntasPorPruebaAPIView
 from .views import ResponderPruebaAPIView
-from .views import UsuarioViewSet, AdministradorViewSet, InstructorViewSet, EstudianteViewSet, LoginView,  RegistroEstudianteAPIView
+from .views import UsuarioViewSet, AdministradorViewSet, InstructorViewSet, EstudianteViewSet, LoginView,  RegistroEstudianteAPIView, ImportarEstudiantesAPIView
 from .views import CursoViewSet, SubcursoViewSet, ModuloViewSet,EmpresaViewSet,ModificarInstructorAPIView,RegisterInstructorAPIView
 from . import views
 from rest_framework_simplejwt.views import TokenRefreshView, TokenVerifyView
 from rest_framework import permissions
 from .views import CambiarContraseñaAPIView,CrearContratosAPIView,ObtenerContratosAPIView,EliminarContratosAPIView,ActualizarContratosAPIView
+from .views import TareaEliminacionAPIView, EmisionMasivaCertificadosAPIView, ExportarCertificadosZipAPIView
+from .views import ExportarNominaAPIView
+from .views import DashboardEstudianteAPIView
+from .views import VerificarCertificadoAPIView, DashboardAdministradorAPIView, EstadisticasCacheMetricasAPIView
+from .views import MetricasAgrupadasAPIView
+from .views import TendenciasAvanceAPIView
+from .views import DistribucionProgresoAPIView
+from .views import ComparacionInstructorAPIView, RankingInstructoresAPIView
 from .views import SubcursosPorCursoAPIView,EstudiantePruebaViewSet,CertificadoAPIView,ContratosPorInstructorAPIView
 from .views import SubcursosPorCursoAPIView,EstudiantePruebaViewSet, PreguntaViewSet, PruebaViewSet, ActualizarEstudiantePruebaAPIView
 from .views import ModulosPorSubcursoAPIView,ContratoAPIView,EstudiantesPorCodigoOrganizacionAPIView,ProgresoViewSet,EmitirCertificadoAPIView
@@ -61,6 +69,7 @@ urlpatterns = [
     path('token/refresh/', TokenRefreshView.as_view(), name='token_refresh'),
     path('token/verify/', TokenVerifyView.as_view(), name='token_verify'),
     path('registroEstudiante/', RegistroEstudianteAPIView.as_view(), name='registro-estudiante'),
+    path('importarEstudiantes/', ImportarEstudiantesAPIView.as_view(), name='importar-estudiantes'),
     path('modificacionInstructor/', ModificarInstructorAPIView.as_view(), name='modificacion-instructor'),
     path('registrarInstructor/', RegisterInstructorAPIView.as_view(), name='registrar-instructor'),
     path('subcursos/curso/<int:curso_id>/', SubcursosPorCursoAPIView.as_view(), name='subcursos_por_curso'),
@@ -70,10 +79,23 @@ urlpatterns = [
     path('estudiante-codigoOrganizacion/', EstudiantesPorCodigoOrganizacionAPIView.as_view(), name='estudiante_codigoOrganizacion'),
     path('emitir-certificado/', EmitirCertificadoAPIView.as_view(), name='emitir_certificado'),
     path('certificado/', CertificadoAPIView.as_view(), name='certificado'),
+    path('verificar-certificado/', VerificarCertificadoAPIView.as_view(), name='verificar_certificado_hash'),
+    path('verificar-certificado/<str:codigo>/', VerificarCertificadoAPIView.as_view(), name='verificar_certificado'),
+    path('certificados/zip/', ExportarCertificadosZipAPIView.as_view(), name='exportar_certificados_zip'),
+    path('nomina/exportar/', ExportarNominaAPIView.as_view(), name='exportar_nomina'),
+    path('me/dashboard/', DashboardEstudianteAPIView.as_view(), name='dashboard_estudiante'),
+    path('emitir-certificados-organizacion/', EmisionMasivaCertificadosAPIView.as_view(), name='emitir_certificados_organizacion'),
     path('actualizar-prueba/', ActualizarEstudiantePruebaAPIView.as_view(), name='actualizar_prueba'),
     path('pruebas-estudiante/', PruebasEstudianteAPIView.as_view(), name='pruebas-estudiante'),
     path('responder-prueba/', ResponderPruebaAPIView.as_view(), name='responder-prueba'),
     path("api/preguntas/por-prueba/", PreguntasPorPruebaAPIView.as_view(), name="preguntas_por_prueba"),
+    path('dashboard-administrador/', DashboardAdministradorAPIView.as_view(), name='dashboard_administrador'),
+    path('metricas-cache/', EstadisticasCacheMetricasAPIView.as_view(), name='metricas_cache'),
+    path('metricas-agrupadas/', MetricasAgrupadasAPIView.as_view(), name='metricas_agrupadas'),
+    path('tendencias/', TendenciasAvanceAPIView.as_view(), name='tendencias'),
+    path('progreso-distribucion/', DistribucionProgresoAPIView.as_view(), name='progreso_distribucion'),
+    path('ranking-instructores/', RankingInstructoresAPIView.as_view(), name='ranking_instructores'),
+    path('ranking-instructores/comparacion/', ComparacionInstructorAPIView.as_view(), name='comparacion_instructor'),
 	path('empresas-total/', EmpresasTotalesAPIView.as_view(), name='empresas_total'),
     path('usuarios-total/', UsuariosTotalesAPIView.as_view(), name='usuarios_total'),
     path('cursos-total/', CursosTotalesAPIView.as_view(), name='cursos_total'),
@@ -88,6 +110,7 @@ urlpatterns = [
     path('actualizar-contrato/', ActualizarContratosAPIView.as_view(), name='actualizar_contrato'),
     path('obtener-contrato/', ObtenerContratosAPIView.as_view(), name='obtener_contrato'),
     path('eliminar-contrato/', EliminarContratosAPIView.as_view(), name='eliminar_contrato'),
+    path('tareas-eliminacion/<int:pk>/', TareaEliminacionAPIView.as_view(), name='tarea_eliminacion'),
     path('obtener-contrato-por-instructor/', ContratosPorInstructorAPIView.as_view(), name='obtener_contrato_por_instructor'),
     path('metricas-general/', GeneralMetricsAPIView.as_view(), name='metricas_general'),
     path('metricas-filtro/', FilteredMetricsAPIView.as_view(), name='metricas_filtro'),
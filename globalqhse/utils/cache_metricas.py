@@ -0,0 +1,221 @@
+import hashlib
+import threading
+import time
+from functools import wraps
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+from rest_framework.response import Response
+
+
+class _Invalidacion:
+    """
+    Invalidación pendiente de un bloque atómico: acumula los modelos modificados y los invalida
+    una sola vez al confirmar la transacción.
+    """
+
+    def __init__(self, bloque, savepoint):
+        self.bloque = bloque
+        self.savepoint = savepoint
+        self.modelos = set()
+        self.ejecutada = False
+
+    def __call__(self):
+        self.ejecutada = True
+        CacheMetricas._incrementar(self.modelos)
+
+
+class CacheMetricas:
+    """
+    Caché de las respuestas de los endpoints de métricas, por endpoint y parámetros normalizados.
+
+    Cada modelo del que dependen las métricas tiene un contador de versión en la caché
+    (`METRICAS_CACHE`); la clave de una respuesta incluye los contadores de los modelos de los
+    que depende su endpoint, así que incrementar un contador (señales `post_save`/`post_delete` y
+    escrituras en bloque) deja obsoletas solo las respuestas afectadas. Cuando una respuesta no está
+    cacheada la calcula un único proceso; los demás esperan hasta `METRICAS_CACHE_ESPERA` segundos
+    a que aparezca en la caché. Los aciertos y fallos se cuentan por endpoint.
+    """
+    PREFIJO = 'metricas'
+    INTERVALO_ESPERA = 0.05
+    _endpoints = set()
+    _lock = threading.Lock()
+    # Invalidaciones pendientes del hilo, por conexión, en el orden de sus bloques atómicos.
+    _pendientes = threading.local()
+
+    @staticmethod
+    def _cache():
+        return caches[getattr(settings, 'METRICAS_CACHE', 'default')]
+
+    @classmethod
+    def _clave_version(cls, modelo):
+        return f'{cls.PREFIJO}:version:{modelo}'
+
+    @classmethod
+    def _clave_contador(cls, endpoint, tipo):
+        return f'{cls.PREFIJO}:{tipo}:{endpoint}'
+
+    @classmethod
+    def _sumar(cls, clave):
+        cache = cls._cache()
+        try:
+            cache.incr(clave)
+        except ValueError:
+            if not cache.add(clave, 1, timeout=None):
+                cache.incr(clave)
+
+    @classmethod
+    def _incrementar(cls, modelos):
+        cache = cls._cache()
+        for modelo in modelos:
+            try:
+                cache.incr(cls._clave_version(modelo))
+            except ValueError:
+                # Contador inexistente o desalojado: se reinicia con un valor que no se haya usado.
+                cache.add(cls._clave_version(modelo), time.time_ns(), timeout=None)
+
+    @classmethod
+    def invalidar(cls, *modelos):
+        """
+        Deja obsoletas las respuestas que dependen de los modelos indicados. Dentro de un bloque
+        atómico se invalida al primer cambio de cada modelo y otra vez al confirmar la transacción,
+        para que una lectura concurrente no vuelva a cachear los datos anteriores. La invalidación
+        pendiente de cada bloque se guarda por hilo y se descarta cuando el bloque se cierra.
+        """
+        conexion = transaction.get_connection()
+        pendientes = cls._pendientes.__dict__.setdefault(conexion.alias, [])
+        if not conexion.in_atomic_block:
+            pendientes.clear()
+            cls._incrementar(modelos)
+            return
+        bloque = conexion.atomic_blocks[-1] if conexion.atomic_blocks else None
+        savepoint = conexion.savepoint_ids[-1] if conexion.savepoint_ids else None
+        # Se descartan las ya ejecutadas y las de bloques que se cerraron.
+        pendientes[:] = [
+            pendiente for pendiente in pendientes
+            if not pendiente.ejecutada and any(pendiente.bloque is abierto for abierto in conexion.atomic_blocks)
+        ]
+        pendiente = next(
+            (pendiente for pendiente in pendientes if pendiente.bloque is bloque and pendiente.savepoint == savepoint),
+            None,
+        )
+        if pendiente is None:
+            pendiente = _Invalidacion(bloque, savepoint)
+            pendientes.append(pendiente)
+            transaction.on_commit(pendiente)
+        nuevos = set(modelos) - pendiente.modelos
+        if nuevos:
+            pendiente.modelos |= nuevos
+            cls._incrementar(nuevos)
+
+    @classmethod
+    def _versiones(cls, dependencias):
+        cache = cls._cache()
+        claves = [cls._clave_version(modelo) for modelo in dependencias]
+        versiones = cache.get_many(claves)
+        for clave in claves:
+            if clave not in versiones:
+                cache.add(clave, time.time_ns(), timeout=None)
+                versiones[clave] = cache.get(clave)
+        return [versiones[clave] for clave in claves]
+
+    @classmethod
+    def _clave(cls, endpoint, parametros, dependencias):
+        normalizados = sorted(
+            (nombre, sorted(valor for valor in valores if valor != ''))
+            for nombre, valores in parametros.lists()
+            if any(valor != '' for valor in valores)
+        )
+        # La fecha forma parte de la clave porque algunas cifras (activos) dependen del día.
+        firma = repr((normalizados, timezone.localdate().isoformat(), cls._versiones(dependencias)))
+        return f'{cls.PREFIJO}:{endpoint}:{hashlib.sha1(firma.encode()).hexdigest()}'
+
+    @classmethod
+    def obtener(cls, endpoint, parametros, dependencias, calcular):
+        """
+        Devuelve `(valor, acierto)`. `calcular()` se ejecuta solo si el valor no está cacheado y
+        ningún otro proceso lo está calculando; si devuelve None el resultado no se cachea.
+        """
+        ttl = getattr(settings, 'METRICAS_CACHE_TTL', 300)
+        if ttl <= 0:
+            return calcular(), False
+        cache = cls._cache()
+        clave = cls._clave(endpoint, parametros, dependencias)
+        valor = cache.get(clave)
+        if valor is not None:
+            cls._sumar(cls._clave_contador(endpoint, 'aciertos'))
+            return valor, True
+
+        espera = getattr(settings, 'METRICAS_CACHE_ESPERA', 5)
+        calculando = f'{clave}:calculando'
+        if not cache.add(calculando, 1, timeout=espera):
+            limite = time.monotonic() + espera
+            while time.monotonic() < limite:
+                time.sleep(cls.INTERVALO_ESPERA)
+                valor = cache.get(clave)
+                if valor is not None:
+                    cls._sumar(cls._clave_contador(endpoint, 'aciertos'))
+                    return valor, True
+        cls._sumar(cls._clave_contador(endpoint, 'fallos'))
+        try:
+            valor = calcular()
+            if valor is not None:
+                cache.set(clave, valor, timeout=ttl)
+        finally:
+            cache.delete(calculando)
+        return valor, False
+
+    @classmethod
+    def estadisticas(cls):
+        """
+        Devuelve `{endpoint: {'aciertos', 'fallos', 'tasa_aciertos'}}` de los endpoints cacheados.
+        """
+        cache = cls._cache()
+        with cls._lock:
+            endpoints = sorted(cls._endpoints)
+        contadores = cache.get_many([
+            cls._clave_contador(endpoint, tipo) for endpoint in endpoints for tipo in ('aciertos', 'fallos')
+        ])
+        resultado = {}
+        for endpoint in endpoints:
+            aciertos = contadores.get(cls._clave_contador(endpoint, 'aciertos'), 0)
+            fallos = contadores.get(cls._clave_contador(endpoint, 'fallos'), 0)
+            total = aciertos + fallos
+            resultado[endpoint] = {
+                'aciertos': aciertos,
+                'fallos': fallos,
+                'tasa_aciertos': round(aciertos / total * 100, 2) if total else 0,
+            }
+        return resultado
+
+    @classmethod
+    def registrar(cls, endpoint):
+        with cls._lock:
+            cls._endpoints.add(endpoint)
+
+
+def cachear_metricas(endpoint, dependencias):
+    """
+    Decorador del método `get` de un endpoint de métricas: cachea sus respuestas 200 con
+    `CacheMetricas`. La cabecera `X-Cache` indica si la respuesta salió de la caché (HIT) o no (MISS).
+    """
+    CacheMetricas.registrar(endpoint)
+
+    def decorador(metodo):
+        @wraps(metodo)
+        def envoltura(self, request, *args, **kwargs):
+            calculada = {}
+
+            def calcular():
+                calculada['response'] = metodo(self, request, *args, **kwargs)
+                if calculada['response'].status_code == 200:
+                    return calculada['response'].data
+                return None
+
+            data, acierto = CacheMetricas.obtener(endpoint, request.query_params, dependencias, calcular)
+            response = calculada.get('response') or Response(data)
+            response['X-Cache'] = 'HIT' if acierto else 'MISS'
+            return response
+        return envoltura
+    return decorador
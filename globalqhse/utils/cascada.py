@@ -0,0 +1,257 @@
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import DateTimeField, Exists, F, OuterRef, Subquery, Value
+from django.utils import timezone
+from ..models import (
+    Estudiante, EstudianteModulo, EstudianteModuloArchivado, EstudiantePrueba, EstudiantePruebaArchivado,
+    EstudianteSubcurso, Progreso, ProgresoArchivado, TareaEliminacion,
+)
+from .cache_metricas import CacheMetricas
+from .estructura import EstructuraCurso
+from .inscripcion import InscripcionService
+from .metricas_diarias import MetricasDiarias
+from .progreso import ProgresoService
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 1000
+ESTUDIANTES_POR_LOTE = 100
+
+# Tabla de archivo de cada tabla viva, campos que se conservan y filas que se archivan.
+ARCHIVO = {
+    Progreso: (
+        ProgresoArchivado,
+        ['estudiante_id', 'curso_id', 'simulacionCompletada', 'fechaInicioCurso', 'fechaFinCurso'],
+        {},
+    ),
+    EstudiantePrueba: (
+        EstudiantePruebaArchivado,
+        ['estudiante_id', 'prueba_id', 'estaAprobado', 'calificacion', 'intento', 'fechaPrueba'],
+        {},
+    ),
+    EstudianteModulo: (EstudianteModuloArchivado, ['estudiante_id', 'modulo_id'], {'completado': True}),
+}
+
+
+def _insertar_desde(destino, consulta, campos, fecha):
+    """
+    Copia las filas de `consulta` a la tabla de `destino` con un único INSERT ... SELECT.
+    """
+    seleccion = consulta.order_by().annotate(
+        fecha_archivo=Value(fecha, output_field=DateTimeField())
+    ).values_list(*campos, 'fecha_archivo')
+    sql, params = seleccion.query.sql_with_params()
+    q = connection.ops.quote_name
+    columnas = ', '.join(q(destino._meta.get_field(campo).column) for campo in [*campos, 'fechaArchivo'])
+    with connection.cursor() as cursor:
+        cursor.execute(f"INSERT INTO {q(destino._meta.db_table)} ({columnas}) {sql}", params)
+
+
+class CascadaInscripciones:
+    """
+    Elimina, archiva o restaura los registros de inscripción (EstudianteModulo, EstudianteSubcurso,
+    EstudiantePrueba y Progreso) de un código de organización en uno o más cursos.
+
+    Los registros se procesan por rangos de clave primaria en lotes de `lote` filas, cada uno en su
+    propia transacción, para que los bloqueos duren poco. Al archivar, cada lote se copia antes a
+    las tablas de archivo con INSERT ... SELECT; al restaurar, las filas vivas se recrean con
+    `InscripcionService` y se les devuelve el estado archivado con UPDATE en bloque. El avance se
+    guarda en `TareaEliminacion`; con `asincrono=True` la tarea se ejecuta en los hilos de
+    `CASCADA_WORKERS`, y una tarea que quedó a medias se reanuda con `reanudar_eliminaciones`.
+    """
+    _executor = None
+    _lock = threading.Lock()
+
+    @staticmethod
+    def operacion_desactivacion():
+        """
+        Operación que se aplica a las inscripciones al desactivar un contrato ('archivar' o 'eliminar').
+        """
+        return getattr(settings, 'CONTRATOS_DESACTIVACION', 'archivar')
+
+    @staticmethod
+    def crear_tarea(codigo_organizacion, curso_ids, operacion='eliminar', solicitante=None):
+        return TareaEliminacion.objects.create(
+            codigoOrganizacion=codigo_organizacion,
+            cursos=sorted({int(curso_id) for curso_id in curso_ids}),
+            operacion=operacion,
+            solicitante=solicitante,
+        )
+
+    @classmethod
+    def iniciar(cls, tarea, asincrono=False):
+        """
+        Ejecuta la tarea en la petición actual o la envía a los hilos en segundo plano.
+        Debe llamarse fuera de la transacción que creó la tarea.
+        """
+        workers = getattr(settings, 'CASCADA_WORKERS', 1)
+        if not asincrono or workers <= 0:
+            cls.ejecutar(tarea.id)
+            tarea.refresh_from_db()
+            return tarea
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='cascada')
+        cls._executor.submit(cls._ejecutar_en_hilo, tarea.id)
+        return tarea
+
+    @classmethod
+    def _ejecutar_en_hilo(cls, tarea_id):
+        try:
+            cls.ejecutar(tarea_id)
+        finally:
+            close_old_connections()
+
+    @staticmethod
+    def _ids_estructura(tarea):
+        estructuras = EstructuraCurso.obtener_varios(tarea.cursos).values()
+        return {
+            'modulo_id__in': [modulo_id for estructura in estructuras for modulo_id in estructura['modulos']],
+            'subcurso_id__in': [subcurso_id for estructura in estructuras for subcurso_id in estructura['subcursos']],
+            'prueba_id__in': [prueba_id for estructura in estructuras for prueba_id in estructura['pruebas']],
+            'curso_id__in': tarea.cursos,
+        }
+
+    @classmethod
+    def _consultas(cls, tarea):
+        ids = cls._ids_estructura(tarea)
+        filtro = {'estudiante__codigoOrganizacion': tarea.codigoOrganizacion}
+        return [
+            EstudianteModulo.objects.filter(modulo_id__in=ids['modulo_id__in'], **filtro),
+            EstudianteSubcurso.objects.filter(subcurso_id__in=ids['subcurso_id__in'], **filtro),
+            EstudiantePrueba.objects.filter(prueba_id__in=ids['prueba_id__in'], **filtro),
+            Progreso.objects.filter(curso_id__in=ids['curso_id__in'], **filtro),
+        ]
+
+    @classmethod
+    def _consultas_archivo(cls, tarea):
+        ids = cls._ids_estructura(tarea)
+        filtro = {'estudiante__codigoOrganizacion': tarea.codigoOrganizacion}
+        return [
+            EstudianteModuloArchivado.objects.filter(modulo_id__in=ids['modulo_id__in'], **filtro),
+            EstudiantePruebaArchivado.objects.filter(prueba_id__in=ids['prueba_id__in'], **filtro),
+            ProgresoArchivado.objects.filter(curso_id__in=ids['curso_id__in'], **filtro),
+        ]
+
+    @classmethod
+    def reanudar(cls, tarea_ids=None, lote=TAMANO_LOTE):
+        """
+        Vuelve a ejecutar las tareas pendientes o en proceso que dejó un proceso interrumpido (o las
+        indicadas). Cada lote borra o archiva lo que aún queda, así que repetirlo es seguro; no debe
+        llamarse mientras otro proceso ejecuta las mismas tareas. Devuelve las tareas reanudadas.
+        """
+        tareas = TareaEliminacion.objects.filter(estado__in=['pendiente', 'en_proceso'])
+        if tarea_ids:
+            tareas = tareas.filter(id__in=tarea_ids)
+        tarea_ids = list(tareas.order_by('id').values_list('id', flat=True))
+        for tarea_id in tarea_ids:
+            cls.ejecutar(tarea_id, lote)
+        return tarea_ids
+
+    @classmethod
+    def ejecutar(cls, tarea_id, lote=TAMANO_LOTE):
+        """
+        Ejecuta una tarea registrando el avance después de cada lote.
+        """
+        tarea = TareaEliminacion.objects.get(id=tarea_id)
+        tareas = TareaEliminacion.objects.filter(id=tarea_id)
+        try:
+            if tarea.operacion == 'restaurar':
+                cls._restaurar(tarea, tareas)
+            else:
+                cls._eliminar(tarea, tareas, lote, archivar=tarea.operacion == 'archivar')
+            tareas.update(estado='completada', fechaFin=timezone.now())
+        except Exception as e:
+            logger.exception("Error en la tarea de eliminación %s", tarea_id)
+            tareas.update(estado='fallida', error=str(e), fechaFin=timezone.now())
+        MetricasDiarias.marcar([tarea.codigoOrganizacion])
+        CacheMetricas.invalidar('Progreso', 'EstudiantePrueba')
+
+    @classmethod
+    def _eliminar(cls, tarea, tareas, lote, archivar):
+        consultas = cls._consultas(tarea)
+        if not archivar:
+            consultas += cls._consultas_archivo(tarea)
+
+        # Al reanudar una tarea interrumpida, lo ya procesado se suma a lo que falta.
+        tareas.update(estado='en_proceso', total=F('procesados') + sum(consulta.count() for consulta in consultas))
+        ahora = timezone.now()
+        for consulta in consultas:
+            ultimo = 0
+            while True:
+                ids = list(consulta.filter(id__gt=ultimo).order_by('id').values_list('id', flat=True)[:lote])
+                if not ids:
+                    break
+                with transaction.atomic():
+                    filas = consulta.model.objects.filter(id__in=ids)
+                    if archivar and consulta.model in ARCHIVO:
+                        destino, campos, condicion = ARCHIVO[consulta.model]
+                        # Solo queda obsoleto el archivo de las inscripciones que este lote vuelve a archivar.
+                        destino.objects.filter(Exists(filas.filter(
+                            estudiante_id=OuterRef('estudiante_id'), **{campos[1]: OuterRef(campos[1])}
+                        ))).delete()
+                        _insertar_desde(destino, filas.filter(**condicion), campos, ahora)
+                    # Sin cascadas ni receptores, delete() es un único DELETE por lote; si el modelo los
+                    # tiene, Django los respeta. La caché y las métricas se marcan una vez por lote.
+                    filas.delete()
+                    tareas.update(procesados=F('procesados') + len(ids))
+                    CacheMetricas.invalidar(consulta.model.__name__)
+                    MetricasDiarias.marcar([tarea.codigoOrganizacion])
+                ultimo = ids[-1]
+
+    @classmethod
+    def _restaurar(cls, tarea, tareas):
+        tareas.update(
+            estado='en_proceso',
+            total=F('procesados') + sum(consulta.count() for consulta in cls._consultas_archivo(tarea)),
+        )
+        estructura = EstructuraCurso.obtener_varios(tarea.cursos)
+        subcurso_ids = [subcurso_id for partes in estructura.values() for subcurso_id in partes['subcursos']]
+        estudiante_ids = list(
+            Estudiante.objects.filter(codigoOrganizacion=tarea.codigoOrganizacion).order_by('id').values_list('id', flat=True)
+        )
+        for inicio in range(0, len(estudiante_ids), ESTUDIANTES_POR_LOTE):
+            bloque = estudiante_ids[inicio:inicio + ESTUDIANTES_POR_LOTE]
+            with transaction.atomic():
+                InscripcionService.inscribir(bloque, tarea.cursos, estructura=estructura)
+                restaurados = cls._restaurar_bloque(bloque, tarea.cursos)
+                ProgresoService.reconciliar_subcursos(bloque, subcurso_ids)
+                ProgresoService.reconciliar_progresos(bloque, tarea.cursos)
+                tareas.update(procesados=F('procesados') + restaurados)
+
+    @staticmethod
+    def _restaurar_bloque(estudiante_ids, curso_ids):
+        """
+        Devuelve a las filas vivas el estado archivado de los estudiantes indicados y borra su archivo.
+        """
+        modulos = EstudianteModuloArchivado.objects.filter(
+            estudiante_id__in=estudiante_ids, modulo__subcurso__curso_id__in=curso_ids
+        )
+        EstudianteModulo.objects.filter(
+            Exists(modulos.filter(estudiante_id=OuterRef('estudiante_id'), modulo_id=OuterRef('modulo_id'))),
+            estudiante_id__in=estudiante_ids,
+        ).update(completado=True)
+
+        pruebas = EstudiantePruebaArchivado.objects.filter(
+            estudiante_id__in=estudiante_ids, prueba__curso_id__in=curso_ids
+        )
+        prueba = pruebas.filter(estudiante_id=OuterRef('estudiante_id'), prueba_id=OuterRef('prueba_id'))
+        EstudiantePrueba.objects.filter(Exists(prueba), estudiante_id__in=estudiante_ids).update(**{
+            campo: Subquery(prueba.values(campo)[:1])
+            for campo in ('estaAprobado', 'calificacion', 'intento', 'fechaPrueba')
+        })
+
+        progresos = ProgresoArchivado.objects.filter(estudiante_id__in=estudiante_ids, curso_id__in=curso_ids)
+        progreso = progresos.filter(estudiante_id=OuterRef('estudiante_id'), curso_id=OuterRef('curso_id'))
+        Progreso.objects.filter(Exists(progreso), estudiante_id__in=estudiante_ids).update(**{
+            campo: Subquery(progreso.values(campo)[:1])
+            for campo in ('simulacionCompletada', 'fechaInicioCurso', 'fechaFinCurso')
+        })
+
+        restaurados = 0
+        for archivo in (modulos, pruebas, progresos):
+            restaurados += archivo.delete()[0]
+        return restaurados
@@ -0,0 +1,142 @@
+import threading
+import zlib
+import pytz
+from django.utils.timezone import now
+from reportlab.lib.colors import HexColor
+from reportlab.lib.pagesizes import landscape, letter
+from reportlab.pdfbase.pdfmetrics import stringWidth
+
+ANCHO, ALTO = landscape(letter)
+FUENTES = {'Helvetica': 'F1', 'Helvetica-Bold': 'F2'}
+
+
+def fecha_emision():
+    """
+    Texto de la fecha de emisión de hoy en la hora de Ecuador.
+    """
+    return now().astimezone(pytz.timezone('America/Guayaquil')).strftime('%d de %B de %Y')
+
+
+def _numero(valor):
+    return f"{valor:.4f}".rstrip('0').rstrip('.')
+
+
+def _color(hexadecimal):
+    color = HexColor(hexadecimal)
+    return f"{_numero(color.red)} {_numero(color.green)} {_numero(color.blue)} rg"
+
+
+def _texto_pdf(texto):
+    """
+    Codifica un texto como cadena literal de PDF con la codificación WinAnsi de las fuentes estándar.
+    """
+    datos = texto.encode('cp1252', errors='replace')
+    return b'(' + datos.replace(b'\\', b'\\\\').replace(b'(', b'\\(').replace(b')', b'\\)') + b')'
+
+
+def _texto_centrado(texto, fuente, tamano, color, y):
+    x = ANCHO / 2 - stringWidth(texto, fuente, tamano) / 2
+    return (
+        f"{_color(color)} BT /{FUENTES[fuente]} {tamano} Tf {_numero(x)} {_numero(y)} Td ".encode('ascii')
+        + _texto_pdf(texto) + b" Tj ET\n"
+    )
+
+
+def _onda(color, base, extremo, control_1, control_2, final):
+    """
+    Onda decorativa cerrada contra el borde `base` (0 para la inferior, ALTO para la superior).
+    """
+    return (
+        f"{_color(color)} 0 {_numero(base)} m "
+        f"{_numero(ANCHO * 0.3)} {_numero(control_1)} {_numero(ANCHO * 0.7)} {_numero(control_2)} "
+        f"{_numero(ANCHO)} {_numero(final)} c {_numero(ANCHO)} {_numero(extremo)} l 0 {_numero(extremo)} l h f\n"
+    ).encode('ascii')
+
+
+class PlantillaCertificado:
+    """
+    Genera el PDF de los certificados a partir de una plantilla prerenderizada.
+
+    El fondo, las cuatro ondas y los textos fijos se escriben una sola vez como Form XObject
+    comprimido, y el encabezado del PDF (catálogo, página, fuentes y el propio XObject) se
+    guarda como bytes. Por certificado solo se escribe el contenido de la página: el dibujo del
+    XObject y los textos variables (nombre, curso, fecha y código de verificación), con su tabla xref.
+    """
+    _instancia = None
+    _lock = threading.Lock()
+
+    def __init__(self):
+        fondo = zlib.compress(self._contenido_fijo())
+        fuentes = b' '.join(f"/{alias} {numero} 0 R".encode('ascii') for alias, numero in (('F1', 4), ('F2', 5)))
+        fuentes = b"/Font << " + fuentes + b" >>"
+        objetos = [
+            b"<< /Type /Catalog /Pages 2 0 R >>",
+            b"<< /Type /Pages /Kids [3 0 R] /Count 1 >>",
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 {_numero(ANCHO)} {_numero(ALTO)}] ".encode('ascii')
+            + b"/Resources << " + fuentes + b" /XObject << /Fondo 6 0 R >> >> /Contents 7 0 R >>",
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica /Encoding /WinAnsiEncoding >>",
+            b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold /Encoding /WinAnsiEncoding >>",
+            f"<< /Type /XObject /Subtype /Form /BBox [0 0 {_numero(ANCHO)} {_numero(ALTO)}] ".encode('ascii')
+            + b"/Resources << " + fuentes + b" >> "
+            + f"/Filter /FlateDecode /Length {len(fondo)} >>\nstream\n".encode('ascii') + fondo + b"\nendstream",
+        ]
+        encabezado = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        self._desplazamientos = []
+        for numero, objeto in enumerate(objetos, start=1):
+            self._desplazamientos.append(len(encabezado))
+            encabezado += f"{numero} 0 obj\n".encode('ascii') + objeto + b"\nendobj\n"
+        self._encabezado = bytes(encabezado)
+
+    @classmethod
+    def obtener(cls):
+        """
+        Devuelve la plantilla del proceso, construyéndola en el primer uso.
+        """
+        if cls._instancia is None:
+            with cls._lock:
+                if cls._instancia is None:
+                    cls._instancia = cls()
+        return cls._instancia
+
+    @staticmethod
+    def _contenido_fijo():
+        return b''.join([
+            f"{_color('#FFFFFF')} 0 0 {_numero(ANCHO)} {_numero(ALTO)} re f\n".encode('ascii'),
+            _onda('#2F4798', ALTO, ALTO, ALTO - 100, ALTO - 50, ALTO - 80),
+            _onda('#1A2E6F', ALTO, ALTO, ALTO - 50, ALTO - 80, ALTO - 60),
+            _texto_centrado("CERTIFICADO DE RECONOCIMIENTO", 'Helvetica-Bold', 36, '#C9A66B', ALTO - 180),
+            _onda('#2F4798', 0, 0, 100, 50, 80),
+            _onda('#1A2E6F', 0, 0, 50, 80, 60),
+            _texto_centrado("Otorgado a", 'Helvetica', 16, '#333333', ALTO - 250),
+            _texto_centrado(
+                "Por haber completado satisfactoriamente el siguiente curso:", 'Helvetica', 16, '#333333', ALTO - 350
+            ),
+            _texto_centrado("Firma Autorizada - Global QHSE", 'Helvetica-Bold', 14, '#333333', ALTO - 520),
+        ])
+
+    def renderizar(self, nombre, curso, fecha, codigo=None):
+        """
+        Devuelve los bytes del PDF de un certificado. `fecha` es el texto de la fecha de emisión y
+        `codigo`, si se indica, el código de verificación impreso bajo la fecha.
+        """
+        partes = [
+            b"q /Fondo Do Q\n",
+            _texto_centrado(nombre, 'Helvetica-Bold', 28, '#4444AA', ALTO - 300),
+            _texto_centrado(curso, 'Helvetica-Bold', 20, '#C9A66B', ALTO - 400),
+            _texto_centrado(f"Fecha de emisión: {fecha}", 'Helvetica', 14, '#666666', ALTO - 450),
+        ]
+        if codigo:
+            partes.append(_texto_centrado(f"Código de verificación: {codigo}", 'Helvetica', 10, '#666666', ALTO - 475))
+        contenido = b''.join(partes)
+        cuerpo = (
+            f"7 0 obj\n<< /Length {len(contenido)} >>\nstream\n".encode('ascii')
+            + contenido + b"\nendstream\nendobj\n"
+        )
+        xref = len(self._encabezado) + len(cuerpo)
+        desplazamientos = (*self._desplazamientos, len(self._encabezado))
+        entradas = ''.join(f"{desplazamiento:010d} 00000 n \n" for desplazamiento in desplazamientos)
+        cola = (
+            f"xref\n0 8\n0000000000 65535 f \n{entradas}"
+            f"trailer\n<< /Size 8 /Root 1 0 R >>\nstartxref\n{xref}\n%%EOF\n"
+        ).encode('ascii')
+        return self._encabezado + cuerpo + cola
@@ -0,0 +1,130 @@
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.db import close_old_connections, transaction
+from ..models import Certificado
+from .cache_metricas import CacheMetricas
+from .metricas_diarias import MetricasDiarias
+
+logger = logging.getLogger(__name__)
+
+
+class ColaCertificados:
+    """
+    Generación en segundo plano de los PDF de los certificados.
+
+    `encolar` registra los certificados como 'pendiente' dentro de la transacción actual y, al
+    confirmarla, envía su generación a los hilos locales (`CERTIFICADO_WORKERS`; con 0 se genera
+    en la misma petición). Los fallos se reintentan hasta `CERTIFICADO_REINTENTOS` veces con una
+    espera creciente; después el certificado queda 'fallido' con el error registrado. El comando
+    `procesar_certificados_pendientes` retoma los pendientes que un proceso interrumpido dejó sin generar.
+    """
+    _executor = None
+    _lock = threading.Lock()
+
+    @classmethod
+    def encolar(cls, pares):
+        """
+        Registra como pendientes los certificados `(estudiante_id, curso_id)` que aún no existen.
+        """
+        pares = set(pares)
+        if not pares:
+            return
+        Certificado.objects.bulk_create(
+            [Certificado(estudiante_id=estudiante_id, curso_id=curso_id) for estudiante_id, curso_id in pares],
+            ignore_conflicts=True,
+        )
+        CacheMetricas.invalidar('Certificado')
+        MetricasDiarias.marcar_estudiantes(estudiante_id for estudiante_id, _ in pares)
+        transaction.on_commit(lambda: cls._programar(pares))
+
+    @staticmethod
+    def _pendientes(pares):
+        candidatos = Certificado.objects.filter(
+            estado='pendiente',
+            estudiante_id__in={estudiante_id for estudiante_id, _ in pares},
+            curso_id__in={curso_id for _, curso_id in pares},
+        ).values_list('id', 'estudiante_id', 'curso_id')
+        return [
+            certificado_id for certificado_id, estudiante_id, curso_id in candidatos
+            if (estudiante_id, curso_id) in pares
+        ]
+
+    @classmethod
+    def _programar(cls, pares):
+        certificado_ids = cls._pendientes(pares)
+        workers = getattr(settings, 'CERTIFICADO_WORKERS', 2)
+        if workers <= 0:
+            for certificado_id in certificado_ids:
+                cls.generar(certificado_id)
+            return
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='certificados')
+        for certificado_id in certificado_ids:
+            cls._executor.submit(cls._generar_en_hilo, certificado_id)
+
+    @classmethod
+    def _generar_en_hilo(cls, certificado_id):
+        try:
+            cls.generar(certificado_id)
+        except Exception:
+            logger.exception("Error al generar el certificado %s", certificado_id)
+        finally:
+            close_old_connections()
+
+    @staticmethod
+    def generar(certificado_id):
+        """
+        Genera el PDF de un certificado pendiente, reintentando los fallos. Devuelve el estado final,
+        o None si el certificado no está pendiente o lo está generando otro proceso.
+        """
+        reintentos = getattr(settings, 'CERTIFICADO_REINTENTOS', 3)
+        espera = getattr(settings, 'CERTIFICADO_ESPERA_REINTENTO', 2)
+        while True:
+            with transaction.atomic():
+                certificado = (
+                    Certificado.objects.select_for_update(skip_locked=True, of=('self',))
+                    .select_related('estudiante', 'curso')
+                    .filter(id=certificado_id, estado='pendiente')
+                    .first()
+                )
+                if certificado is None:
+                    return None
+                try:
+                    certificado.generar_pdf()
+                except Exception as e:
+                    logger.warning("Fallo al generar el certificado %s: %s", certificado_id, e)
+                    certificado.intentos += 1
+                    certificado.error = str(e)
+                    # Los datos inválidos no se corrigen reintentando.
+                    definitivo = isinstance(e, ValidationError) or certificado.intentos >= reintentos
+                    certificado.estado = 'fallido' if definitivo else 'pendiente'
+                    certificado.save(update_fields=['intentos', 'error', 'estado'])
+                else:
+                    certificado.estado = 'listo'
+                    certificado.error = None
+                    certificado.save(update_fields=['archivoPdf', 'hashPdf', 'codigoVerificacion', 'estado', 'error'])
+                    return certificado.estado
+            if certificado.estado == 'fallido':
+                return certificado.estado
+            time.sleep(espera * certificado.intentos)
+
+    @classmethod
+    def drenar(cls, reintentar_fallidos=False):
+        """
+        Genera todos los certificados pendientes (y, opcionalmente, vuelve a intentar los fallidos).
+        Devuelve `{estado: cantidad}` de los certificados procesados.
+        """
+        if reintentar_fallidos:
+            Certificado.objects.filter(estado='fallido').update(estado='pendiente', intentos=0)
+        resumen = {'listo': 0, 'fallido': 0}
+        pendientes = list(Certificado.objects.filter(estado='pendiente').order_by('id').values_list('id', flat=True))
+        for certificado_id in pendientes:
+            estado = cls.generar(certificado_id)
+            if estado is not None:
+                resumen[estado] += 1
+        return resumen
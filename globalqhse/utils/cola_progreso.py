@@ -0,0 +1,113 @@
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from ..models import ProgresoPendiente
+from .progreso import ProgresoService
+
+logger = logging.getLogger(__name__)
+
+
+class ColaProgreso:
+    """
+    Cola de recálculos diferidos del progreso por (estudiante, curso).
+
+    Las solicitudes se registran al confirmar la transacción y se deduplican con la
+    restricción única de `ProgresoPendiente`. Las drenan los hilos locales o el comando
+    `procesar_progresos_pendientes`; las lecturas fuerzan el recálculo de su clave con `vaciar`.
+    """
+    _executor = None
+    _lock = threading.Lock()
+    _drenado_programado = False
+
+    @staticmethod
+    def modo_diferido():
+        return getattr(settings, 'PROGRESO_MODO', 'sync') == 'deferred'
+
+    @classmethod
+    def encolar(cls, claves):
+        """
+        Registra las claves `(estudiante_id, curso_id)` cuando la transacción actual se confirme.
+        """
+        claves = set(claves)
+        if claves:
+            transaction.on_commit(lambda: cls._registrar(claves))
+
+    @classmethod
+    def _registrar(cls, claves):
+        ProgresoPendiente.objects.bulk_create(
+            [ProgresoPendiente(estudiante_id=estudiante_id, curso_id=curso_id) for estudiante_id, curso_id in claves],
+            ignore_conflicts=True,
+        )
+        cls._programar_drenado()
+
+    @classmethod
+    def _programar_drenado(cls):
+        workers = getattr(settings, 'PROGRESO_WORKERS', 0)
+        if workers <= 0:
+            return
+        with cls._lock:
+            if cls._drenado_programado:
+                return
+            cls._drenado_programado = True
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='progreso')
+        cls._executor.submit(cls._drenar_en_hilo)
+
+    @classmethod
+    def _drenar_en_hilo(cls):
+        with cls._lock:
+            cls._drenado_programado = False
+        try:
+            cls.drenar()
+        except Exception:
+            logger.exception("Error al procesar los progresos pendientes")
+        finally:
+            close_old_connections()
+
+    @classmethod
+    def _procesar(cls, pendientes):
+        estudiantes_por_curso = defaultdict(set)
+        for estudiante_id, curso_id in pendientes:
+            estudiantes_por_curso[curso_id].add(estudiante_id)
+        for curso_id, estudiante_ids in estudiantes_por_curso.items():
+            ProgresoService.reconciliar_progresos(estudiante_ids, curso_id)
+
+    @classmethod
+    def drenar(cls, lote=500):
+        """
+        Procesa todas las solicitudes pendientes en lotes. Devuelve cuántas se procesaron.
+        """
+        procesadas = 0
+        while True:
+            with transaction.atomic():
+                pendientes = list(
+                    ProgresoPendiente.objects.select_for_update(skip_locked=True)
+                    .order_by('id')
+                    .values_list('id', 'estudiante_id', 'curso_id')[:lote]
+                )
+                if not pendientes:
+                    return procesadas
+                cls._procesar([(estudiante_id, curso_id) for _, estudiante_id, curso_id in pendientes])
+                ProgresoPendiente.objects.filter(id__in=[pendiente_id for pendiente_id, _, _ in pendientes]).delete()
+            procesadas += len(pendientes)
+
+    @classmethod
+    def vaciar(cls, estudiante_id, curso_id=None):
+        """
+        Recalcula de inmediato las solicitudes pendientes de un estudiante (opcionalmente de un curso)
+        para que la lectura posterior devuelva datos actualizados.
+        """
+        if not cls.modo_diferido():
+            return
+        with transaction.atomic():
+            pendientes = ProgresoPendiente.objects.select_for_update().filter(estudiante_id=estudiante_id)
+            if curso_id is not None:
+                pendientes = pendientes.filter(curso_id=curso_id)
+            claves = list(pendientes.values_list('id', 'estudiante_id', 'curso_id'))
+            if not claves:
+                return
+            cls._procesar([(estudiante, curso) for _, estudiante, curso in claves])
+            ProgresoPendiente.objects.filter(id__in=[pendiente_id for pendiente_id, _, _ in claves]).delete()
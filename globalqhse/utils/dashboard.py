@@ -0,0 +1,126 @@
+import hashlib
+import json
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Prefetch
+from ..models import Certificado, EstudianteModulo, EstudiantePrueba, EstudianteSubcurso, Modulo, Progreso, Subcurso
+from .cola_progreso import ColaProgreso
+
+
+class DashboardEstudiante:
+    """
+    Árbol completo de los cursos de un estudiante para el dashboard: curso → subcursos → módulos,
+    con el avance de cada nivel, el estado de la prueba y la disponibilidad del certificado.
+
+    Se arma con un número fijo de consultas sin importar cuántos cursos, subcursos o módulos tenga:
+    los progresos con sus cursos, los subcursos y los módulos (prefetch) y una consulta por cada
+    tabla de estado del estudiante (subcursos, módulos completados, pruebas y certificados).
+    """
+
+    def __init__(self, estudiante_id, request=None):
+        self.estudiante_id = estudiante_id
+        self.request = request
+
+    def _url(self, archivo):
+        if not archivo:
+            return None
+        return self.request.build_absolute_uri(archivo.url) if self.request else archivo.url
+
+    def construir(self):
+        """
+        Devuelve la lista de cursos del estudiante ordenada por id de curso.
+        """
+        ColaProgreso.vaciar(self.estudiante_id)
+        progresos = (
+            Progreso.objects.filter(estudiante_id=self.estudiante_id)
+            .select_related('curso')
+            .prefetch_related(Prefetch(
+                'curso__subcursos',
+                queryset=Subcurso.objects.order_by('id').prefetch_related(
+                    Prefetch('modulos', queryset=Modulo.objects.order_by('id'))
+                ),
+            ))
+            .order_by('curso_id')
+        )
+        subcursos = {
+            subcurso_id: (porcentaje, completado)
+            for subcurso_id, porcentaje, completado in EstudianteSubcurso.objects.filter(
+                estudiante_id=self.estudiante_id
+            ).values_list('subcurso_id', 'porcentajeCompletado', 'completado')
+        }
+        modulos_completados = set(
+            EstudianteModulo.objects.filter(estudiante_id=self.estudiante_id, completado=True)
+            .values_list('modulo_id', flat=True)
+        )
+        pruebas = {
+            prueba['prueba__curso_id']: prueba
+            for prueba in EstudiantePrueba.objects.filter(estudiante_id=self.estudiante_id).values(
+                'prueba_id', 'prueba__curso_id', 'prueba__duracion', 'estaAprobado', 'calificacion', 'intento', 'fechaPrueba'
+            )
+        }
+        certificados = {
+            certificado['curso_id']: certificado
+            for certificado in Certificado.objects.filter(estudiante_id=self.estudiante_id).values(
+                'curso_id', 'estado', 'fechaEmision', 'codigoVerificacion'
+            )
+        }
+
+        cursos = []
+        for progreso in progresos:
+            curso = progreso.curso
+            prueba = pruebas.get(curso.id)
+            certificado = certificados.get(curso.id)
+            cursos.append({
+                "curso_id": curso.id,
+                "titulo": curso.titulo,
+                "descripcion": curso.descripcion,
+                "imagen": self._url(curso.imagen),
+                "simulacion": curso.simulacion,
+                "porcentajeCompletado": progreso.porcentajeCompletado,
+                "completado": progreso.completado,
+                "contenidoCompletado": progreso.contenidoCompletado,
+                "simulacionCompletada": progreso.simulacionCompletada,
+                "fechaInicioCurso": progreso.fechaInicioCurso,
+                "fechaFinCurso": progreso.fechaFinCurso,
+                "subcursos": [
+                    {
+                        "id": subcurso.id,
+                        "nombre": subcurso.nombre,
+                        "porcentajeCompletado": subcursos.get(subcurso.id, (0.0, False))[0],
+                        "completado": subcursos.get(subcurso.id, (0.0, False))[1],
+                        "modulos": [
+                            {
+                                "id": modulo.id,
+                                "nombre": modulo.nombre,
+                                "enlace": modulo.enlace,
+                                "archivo": self._url(modulo.archivo),
+                                "completado": modulo.id in modulos_completados,
+                            }
+                            for modulo in subcurso.modulos.all()
+                        ],
+                    }
+                    for subcurso in curso.subcursos.all()
+                ],
+                "prueba": {
+                    "id": prueba['prueba_id'],
+                    "duracion": prueba['prueba__duracion'],
+                    "estaAprobado": prueba['estaAprobado'],
+                    "calificacion": prueba['calificacion'],
+                    "intento": prueba['intento'],
+                    "fechaPrueba": prueba['fechaPrueba'],
+                } if prueba else None,
+                "certificado": {
+                    "disponible": certificado['estado'] == 'listo',
+                    "estado": certificado['estado'],
+                    "fechaEmision": certificado['fechaEmision'],
+                    "codigoVerificacion": certificado['codigoVerificacion'],
+                } if certificado else None,
+            })
+        return cursos
+
+    @staticmethod
+    def etag(datos):
+        """
+        ETag débil del contenido: cambia solo si cambia algún valor del dashboard.
+        """
+        contenido = json.dumps(datos, cls=DjangoJSONEncoder, sort_keys=True, separators=(',', ':'))
+        return f'W/"{hashlib.sha1(contenido.encode()).hexdigest()}"'
@@ -0,0 +1,103 @@
+import os
+import re
+from urllib.parse import quote
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+TAMANO_BLOQUE = 64 * 1024
+RANGO = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+def _leer_rango(ruta, inicio, longitud, tamano_bloque=TAMANO_BLOQUE):
+    with open(ruta, 'rb') as archivo:
+        archivo.seek(inicio)
+        while longitud > 0:
+            bloque = archivo.read(min(tamano_bloque, longitud))
+            if not bloque:
+                return
+            longitud -= len(bloque)
+            yield bloque
+
+
+def _rango_solicitado(request, tamano, etag, modificado):
+    """
+    Devuelve `(inicio, fin)` del rango pedido, None si se debe enviar el archivo completo, o
+    False si el rango no se puede satisfacer. Solo se atienden rangos únicos; las peticiones con
+    varios rangos reciben el archivo completo.
+    """
+    cabecera = request.META.get('HTTP_RANGE')
+    if not cabecera:
+        return None
+    si_rango = request.META.get('HTTP_IF_RANGE')
+    if si_rango:
+        fecha = parse_http_date_safe(si_rango)
+        if si_rango != etag and (fecha is None or int(modificado) > fecha):
+            return None
+    coincidencia = RANGO.match(cabecera.strip())
+    if not coincidencia or coincidencia.groups() == ('', ''):
+        return None
+    desde, hasta = coincidencia.groups()
+    if desde == '':
+        inicio, fin = max(tamano - int(hasta), 0), tamano - 1
+    else:
+        inicio, fin = int(desde), min(int(hasta), tamano - 1) if hasta else tamano - 1
+    if tamano == 0 or inicio >= tamano or inicio > fin:
+        return False
+    return inicio, fin
+
+
+def servir_archivo(request, archivo, content_type='application/octet-stream', nombre=None):
+    """
+    Respuesta de descarga de un `FieldFile` del almacenamiento local con ETag y Last-Modified
+    (`If-None-Match`/`If-Modified-Since` devuelven 304) y soporte de rangos de bytes.
+
+    Con `DESCARGAS_MODO = 'x-accel'` o `'x-sendfile'` el contenido lo envía el proxy
+    (cabeceras `X-Accel-Redirect` con el prefijo `DESCARGAS_X_ACCEL_PREFIJO` y el nombre codificado
+    como URI, o `X-Sendfile`),
+    y la respuesta de Django no lleva cuerpo.
+    """
+    ruta = archivo.path
+    estado = os.stat(ruta)
+    etag = quote_etag(f"{estado.st_mtime_ns:x}-{estado.st_size:x}")
+    nombre = nombre or os.path.basename(archivo.name)
+
+    condicional = get_conditional_response(request, etag=etag, last_modified=int(estado.st_mtime))
+    if condicional is not None:
+        if condicional.status_code == 304:
+            condicional['ETag'] = etag
+            condicional['Last-Modified'] = http_date(estado.st_mtime)
+        return condicional
+
+    modo = getattr(settings, 'DESCARGAS_MODO', 'django')
+    if modo in ('x-accel', 'x-sendfile'):
+        response = HttpResponse(content_type=content_type)
+        if modo == 'x-accel':
+            # La URI interna va codificada: nginx la decodifica antes de buscar el archivo.
+            response['X-Accel-Redirect'] = getattr(settings, 'DESCARGAS_X_ACCEL_PREFIJO', '/protected/') + quote(archivo.name)
+        else:
+            response['X-Sendfile'] = ruta
+        response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+    else:
+        rango = _rango_solicitado(request, estado.st_size, etag, estado.st_mtime)
+        if rango is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f"bytes */{estado.st_size}"
+            return response
+        if rango is None:
+            response = FileResponse(open(ruta, 'rb'), content_type=content_type, as_attachment=True, filename=nombre)
+        else:
+            inicio, fin = rango
+            response = StreamingHttpResponse(
+                _leer_rango(ruta, inicio, fin - inicio + 1), status=206, content_type=content_type
+            )
+            response['Content-Range'] = f"bytes {inicio}-{fin}/{estado.st_size}"
+            response['Content-Length'] = str(fin - inicio + 1)
+            response['Content-Disposition'] = f'attachment; filename="{nombre}"'
+        response['Accept-Ranges'] = 'bytes'
+
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(estado.st_mtime)
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
@@ -0,0 +1,154 @@
+import hashlib
+import time
+from concurrent.futures import ProcessPoolExecutor
+from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+from ..models import Certificado, Progreso, generar_codigo_verificacion
+from .cache_metricas import CacheMetricas
+from .certificado import PlantillaCertificado, fecha_emision
+from .metricas_diarias import MetricasDiarias
+
+TAMANO_LOTE = 500
+
+
+def _inicializar_proceso():
+    import django
+    django.setup()
+
+
+def _renderizar(datos):
+    nombre, curso, fecha, codigo = datos
+    return PlantillaCertificado.obtener().renderizar(nombre, curso, fecha, codigo)
+
+
+class EmisionMasivaCertificados:
+    """
+    Emite los certificados de todos los estudiantes de un código de organización que completaron
+    sus cursos y aún no tienen el certificado listo.
+
+    Los pares (estudiante, curso) se obtienen con una sola consulta y se procesan en lotes de
+    `lote`: los PDF se generan en el proceso actual o, con `procesos` > 1, en un pool de procesos
+    (solo desde el comando `emitir_certificados_organizacion`, nunca dentro de una petición web),
+    se escriben en el almacenamiento y los `Certificado` se crean o actualizan con una sentencia
+    por lote. Cada lote es una transacción, así que una emisión interrumpida se retoma volviendo a
+    ejecutarla: los certificados ya listos no se vuelven a generar. Si la transacción falla se
+    borran los PDF escritos, y al confirmarla se borran los archivos de los certificados reemplazados.
+    """
+
+    def __init__(self, codigo_organizacion, curso_ids=None, lote=TAMANO_LOTE, procesos=1):
+        self.codigo_organizacion = codigo_organizacion
+        self.curso_ids = list(curso_ids) if curso_ids else None
+        self.lote = lote
+        self.procesos = procesos
+
+    def elegibles(self):
+        """
+        Devuelve `(estudiante_id, curso_id, nombre, apellido, titulo)` de los progresos completados
+        sin certificado listo.
+        """
+        progresos = Progreso.objects.filter(
+            estudiante__codigoOrganizacion=self.codigo_organizacion, completado=True
+        ).filter(
+            ~Exists(Certificado.objects.filter(
+                estudiante_id=OuterRef('estudiante_id'), curso_id=OuterRef('curso_id'), estado='listo'
+            ))
+        )
+        if self.curso_ids is not None:
+            progresos = progresos.filter(curso_id__in=self.curso_ids)
+        return list(progresos.order_by('curso_id', 'estudiante_id').values_list(
+            'estudiante_id', 'curso_id', 'estudiante__first_name', 'estudiante__last_name', 'curso__titulo'
+        ))
+
+    def emitir(self):
+        """
+        Emite los certificados y devuelve un resumen con los emitidos, los errores y el rendimiento.
+        """
+        inicio = time.perf_counter()
+        elegibles = self.elegibles()
+        resumen = {'elegibles': len(elegibles), 'emitidos': 0, 'errores': []}
+        validos = []
+        for estudiante_id, curso_id, nombre, apellido, titulo in elegibles:
+            if not nombre or not apellido or not titulo:
+                resumen['errores'].append({
+                    'estudiante_id': estudiante_id, 'curso_id': curso_id,
+                    'error': "Los datos del estudiante o del curso son incompletos.",
+                })
+                continue
+            validos.append((estudiante_id, curso_id, f"{nombre} {apellido}", titulo))
+
+        fecha = fecha_emision()
+        hoy = timezone.localdate()
+        executor = None
+        if self.procesos > 1 and len(validos) > self.lote:
+            executor = ProcessPoolExecutor(max_workers=self.procesos, initializer=_inicializar_proceso)
+        try:
+            for posicion in range(0, len(validos), self.lote):
+                resumen['emitidos'] += self._emitir_lote(validos[posicion:posicion + self.lote], fecha, hoy, executor)
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        duracion = time.perf_counter() - inicio
+        resumen['segundos'] = round(duracion, 3)
+        resumen['certificados_por_segundo'] = round(resumen['emitidos'] / duracion, 1) if duracion else 0.0
+        return resumen
+
+    def _emitir_lote(self, lote, fecha, hoy, executor):
+        codigos = [generar_codigo_verificacion() for _ in lote]
+        datos = [(nombre, titulo, fecha, codigo) for (_, _, nombre, titulo), codigo in zip(lote, codigos)]
+        if executor is None:
+            pdfs = map(_renderizar, datos)
+        else:
+            pdfs = executor.map(_renderizar, datos, chunksize=max(1, len(datos) // (self.procesos * 4)))
+
+        campo = Certificado._meta.get_field('archivoPdf')
+        certificados = []
+        guardados = []
+        try:
+            for (estudiante_id, curso_id, _, _), codigo, pdf in zip(lote, codigos, pdfs):
+                # Si el nombre ya existe, el almacenamiento guarda el PDF con otro nombre y se usa ese.
+                nombre = campo.storage.save(
+                    campo.generate_filename(None, f"certificado_{curso_id}_{estudiante_id}.pdf"), ContentFile(pdf)
+                )
+                guardados.append(nombre)
+                certificados.append(Certificado(
+                    estudiante_id=estudiante_id,
+                    curso_id=curso_id,
+                    archivoPdf=nombre,
+                    codigoVerificacion=codigo,
+                    hashPdf=hashlib.sha256(pdf).hexdigest(),
+                    fechaEmision=hoy,
+                    estado='listo',
+                    intentos=0,
+                    error=None,
+                ))
+            with transaction.atomic():
+                pares = {(certificado.estudiante_id, certificado.curso_id) for certificado in certificados}
+                reemplazados = [
+                    archivo for estudiante_id, curso_id, archivo in Certificado.objects.filter(
+                        estudiante_id__in={estudiante_id for estudiante_id, _ in pares},
+                        curso_id__in={curso_id for _, curso_id in pares},
+                    ).exclude(archivoPdf='').values_list('estudiante_id', 'curso_id', 'archivoPdf')
+                    if (estudiante_id, curso_id) in pares and archivo not in guardados
+                ]
+                Certificado.objects.bulk_create(
+                    certificados,
+                    update_conflicts=True,
+                    unique_fields=['estudiante', 'curso'],
+                    update_fields=['archivoPdf', 'codigoVerificacion', 'hashPdf', 'fechaEmision', 'estado', 'intentos', 'error'],
+                )
+                CacheMetricas.invalidar('Certificado')
+                MetricasDiarias.marcar([self.codigo_organizacion])
+        except Exception:
+            for nombre in guardados:
+                campo.storage.delete(nombre)
+            raise
+        transaction.on_commit(lambda: self._borrar_archivos(campo.storage, reemplazados))
+        return len(certificados)
+
+    @staticmethod
+    def _borrar_archivos(storage, nombres):
+        for nombre in nombres:
+            storage.delete(nombre)
@@ -0,0 +1,149 @@
+import threading
+import uuid
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from ..models import Curso, Modulo, Prueba, Subcurso
+
+
+class EstructuraCurso:
+    """
+    Estructura de solo lectura de los cursos (pruebas, subcursos con su cantidad de módulos
+    y módulos) cacheada en dos niveles: una copia en memoria del proceso y una copia en la
+    caché compartida (`ESTRUCTURA_CURSO_CACHE`).
+
+    Cada curso tiene una versión en la caché compartida; invalidar un curso borra su versión,
+    de modo que todos los procesos descartan su copia local en la siguiente lectura. Para
+    despliegues con varios procesos la caché configurada debe ser compartida (Redis, Memcached).
+
+    Cada estructura es un dict con las claves:
+        'simulacion': bool
+        'pruebas': tupla de ids
+        'subcursos': {subcurso_id: cantidad de módulos}
+        'modulos': tupla de ids
+        'modulos_por_subcurso': {subcurso_id: tupla de ids}
+    Las estructuras devueltas se comparten entre llamadas y no deben modificarse.
+    """
+    PREFIJO = 'estructura_curso'
+    _local = {}
+    _lock = threading.Lock()
+
+    @staticmethod
+    def _cache():
+        return caches[getattr(settings, 'ESTRUCTURA_CURSO_CACHE', 'default')]
+
+    @classmethod
+    def _clave_version(cls, curso_id):
+        return f'{cls.PREFIJO}:version:{curso_id}'
+
+    @classmethod
+    def _clave(cls, curso_id, version):
+        return f'{cls.PREFIJO}:{curso_id}:{version}'
+
+    @classmethod
+    def obtener(cls, curso_id):
+        """
+        Devuelve la estructura de un curso, o None si el curso no existe.
+        """
+        return cls.obtener_varios([curso_id]).get(int(curso_id))
+
+    @classmethod
+    def obtener_varios(cls, curso_ids):
+        """
+        Devuelve `{curso_id: estructura}` para los cursos indicados que existan. Una lectura con
+        todo cacheado cuesta una consulta a la caché compartida y ninguna a la base de datos.
+        """
+        curso_ids = {int(curso_id) for curso_id in curso_ids}
+        if not curso_ids:
+            return {}
+        cache = cls._cache()
+        versiones_cache = cache.get_many([cls._clave_version(curso_id) for curso_id in curso_ids])
+        versiones = {curso_id: versiones_cache.get(cls._clave_version(curso_id)) for curso_id in curso_ids}
+
+        resultado = {}
+        with cls._lock:
+            for curso_id, version in versiones.items():
+                local = cls._local.get(curso_id)
+                if version is not None and local is not None and local[0] == version:
+                    resultado[curso_id] = local[1]
+
+        faltantes = {curso_id: versiones[curso_id] for curso_id in curso_ids - resultado.keys() if versiones[curso_id]}
+        if faltantes:
+            compartidas = cache.get_many([cls._clave(curso_id, version) for curso_id, version in faltantes.items()])
+            for curso_id, version in faltantes.items():
+                estructura = compartidas.get(cls._clave(curso_id, version))
+                if estructura is not None:
+                    resultado[curso_id] = estructura
+                    cls._guardar_local(curso_id, version, estructura)
+
+        pendientes = curso_ids - resultado.keys()
+        if pendientes:
+            for curso_id, estructura in cls.construir(pendientes).items():
+                version = versiones.get(curso_id)
+                if version is None:
+                    cache.add(cls._clave_version(curso_id), uuid.uuid4().hex, timeout=None)
+                    version = cache.get(cls._clave_version(curso_id))
+                cache.set(cls._clave(curso_id, version), estructura, timeout=getattr(settings, 'ESTRUCTURA_CURSO_TTL', 3600))
+                cls._guardar_local(curso_id, version, estructura)
+                resultado[curso_id] = estructura
+        return resultado
+
+    @classmethod
+    def _guardar_local(cls, curso_id, version, estructura):
+        with cls._lock:
+            cls._local[curso_id] = (version, estructura)
+
+    @staticmethod
+    def construir(curso_ids):
+        """
+        Lee desde la base de datos la estructura de los cursos indicados (cuatro consultas en total).
+        """
+        curso_ids = list(curso_ids)
+        estructuras = {
+            curso_id: {
+                'simulacion': bool(simulacion),
+                'pruebas': [],
+                'subcursos': {},
+                'modulos': [],
+                'modulos_por_subcurso': {},
+            }
+            for curso_id, simulacion in Curso.objects.filter(id__in=curso_ids).values_list('id', 'simulacion')
+        }
+        for prueba_id, curso_id in Prueba.objects.filter(curso_id__in=curso_ids).order_by('id').values_list('id', 'curso_id'):
+            estructuras[curso_id]['pruebas'].append(prueba_id)
+        for subcurso_id, curso_id in Subcurso.objects.filter(curso_id__in=curso_ids).order_by('id').values_list('id', 'curso_id'):
+            estructuras[curso_id]['modulos_por_subcurso'][subcurso_id] = []
+        modulos = Modulo.objects.filter(subcurso__curso_id__in=curso_ids).order_by('id').values_list(
+            'id', 'subcurso_id', 'subcurso__curso_id'
+        )
+        for modulo_id, subcurso_id, curso_id in modulos:
+            estructuras[curso_id]['modulos'].append(modulo_id)
+            estructuras[curso_id]['modulos_por_subcurso'][subcurso_id].append(modulo_id)
+
+        for estructura in estructuras.values():
+            estructura['pruebas'] = tuple(estructura['pruebas'])
+            estructura['modulos'] = tuple(estructura['modulos'])
+            estructura['modulos_por_subcurso'] = {
+                subcurso_id: tuple(modulos) for subcurso_id, modulos in estructura['modulos_por_subcurso'].items()
+            }
+            estructura['subcursos'] = {
+                subcurso_id: len(modulos) for subcurso_id, modulos in estructura['modulos_por_subcurso'].items()
+            }
+        return estructuras
+
+    @classmethod
+    def invalidar(cls, curso_id):
+        """
+        Descarta la estructura cacheada de un curso. Se repite al confirmar la transacción para que
+        una lectura concurrente no vuelva a cachear la estructura anterior al cambio.
+        """
+        if curso_id is None:
+            return
+        cls._invalidar(curso_id)
+        transaction.on_commit(lambda: cls._invalidar(curso_id))
+
+    @classmethod
+    def _invalidar(cls, curso_id):
+        cls._cache().delete(cls._clave_version(curso_id))
+        with cls._lock:
+            cls._local.pop(int(curso_id), None)
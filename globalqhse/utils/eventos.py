@@ -0,0 +1,174 @@
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import TruncWeek
+from django.utils import timezone
+from ..models import Contrato, Estudiante, EventoAvance, PrimerAvance
+from .cache_metricas import CacheMetricas
+
+
+class EventosAvance:
+    """
+    Registro de eventos de avance y series de tendencias.
+
+    Los eventos se insertan en bloque en la misma transacción que el cambio que los origina y
+    nunca se modifican; `compactar()` mantiene acotada la tabla resumiendo por día los eventos
+    de más de `EVENTOS_RETENCION_DIAS`, por semana los de más de `EVENTOS_RESUMEN_SEMANAL_DIAS`
+    y eliminando los de más de `EVENTOS_RETENCION_MAXIMA_DIAS` (0: se conservan). Las marcas de
+    `PrimerAvance` con las que se evita contar dos veces un avance no se compactan.
+    """
+    TIPOS = {
+        'modulo': EventoAvance.MODULO,
+        'prueba': EventoAvance.PRUEBA,
+        'simulacion': EventoAvance.SIMULACION,
+        'curso': EventoAvance.CURSO,
+    }
+    INTERVALOS = ('dia', 'semana')
+    DIAS_POR_DEFECTO = 30
+    DIAS_MAXIMOS = 731
+
+    @classmethod
+    def registrar(cls, tipo, filas, fecha=None):
+        """
+        Inserta un evento por cada `(estudiante_id, curso_id, objeto)` sin `PrimerAvance` del mismo
+        tipo y crea esa marca: solo cuenta la primera vez que el estudiante completa o aprueba el
+        objeto, aunque lo desmarque y lo vuelva a completar, repita la prueba o sus eventos ya se
+        hayan compactado. La empresa de cada estudiante se resuelve con una sola consulta a partir
+        de su código de organización. Devuelve el número de eventos insertados.
+        """
+        filas = set(filas)
+        if filas:
+            filas -= {
+                (estudiante_id, curso_id, objeto or None)
+                for estudiante_id, curso_id, objeto in PrimerAvance.objects.filter(
+                    tipo=tipo, estudiante_id__in={estudiante_id for estudiante_id, _, _ in filas}
+                ).values_list('estudiante_id', 'curso_id', 'objeto')
+            }
+        if not filas:
+            return 0
+        PrimerAvance.objects.bulk_create([
+            PrimerAvance(tipo=tipo, estudiante_id=estudiante_id, curso_id=curso_id, objeto=objeto or 0)
+            for estudiante_id, curso_id, objeto in filas
+        ], ignore_conflicts=True)
+        empresa = Contrato.objects.filter(
+            codigoOrganizacion=OuterRef('codigoOrganizacion')
+        ).values('instructor__empresa_id')[:1]
+        empresas = dict(
+            Estudiante.objects.filter(id__in={estudiante_id for estudiante_id, _, _ in filas})
+            .annotate(empresa_evento=Subquery(empresa))
+            .values_list('id', 'empresa_evento')
+        )
+        fecha = fecha or timezone.localdate()
+        EventoAvance.objects.bulk_create([
+            EventoAvance(
+                tipo=tipo,
+                curso_id=curso_id,
+                empresa_id=empresas.get(estudiante_id),
+                estudiante_id=estudiante_id,
+                objeto=objeto,
+                fecha=fecha,
+            )
+            for estudiante_id, curso_id, objeto in filas
+        ])
+        CacheMetricas.invalidar('EventoAvance')
+        return len(filas)
+
+    @classmethod
+    def tendencias(cls, tipo, desde=None, hasta=None, intervalo='dia', curso_id=None, empresa_id=None, objeto=None):
+        """
+        Devuelve `[{'fecha', 'cantidad'}]` con un elemento por día o por semana (lunes) entre
+        `desde` y `hasta`, incluidos los periodos sin eventos. Se obtiene con un único recorrido
+        del índice (curso o empresa, tipo, fecha).
+        """
+        if tipo not in cls.TIPOS:
+            raise ValueError(f"Tipo inválido. Opciones: {', '.join(cls.TIPOS)}.")
+        if intervalo not in cls.INTERVALOS:
+            raise ValueError(f"Intervalo inválido. Opciones: {', '.join(cls.INTERVALOS)}.")
+        hasta = hasta or timezone.localdate()
+        desde = desde or hasta - timedelta(days=cls.DIAS_POR_DEFECTO - 1)
+        if desde > hasta:
+            raise ValueError("La fecha inicial no puede ser posterior a la final.")
+        if (hasta - desde).days >= cls.DIAS_MAXIMOS:
+            raise ValueError(f"El rango no puede superar {cls.DIAS_MAXIMOS} días.")
+
+        semanal = intervalo == 'semana'
+        if semanal:
+            desde -= timedelta(days=desde.weekday())
+
+        eventos = EventoAvance.objects.filter(tipo=cls.TIPOS[tipo], fecha__gte=desde, fecha__lte=hasta)
+        if curso_id:
+            eventos = eventos.filter(curso_id=curso_id)
+        if empresa_id:
+            eventos = eventos.filter(empresa_id=empresa_id)
+        if objeto:
+            eventos = eventos.filter(objeto=objeto)
+        periodo = TruncWeek('fecha') if semanal else F('fecha')
+        totales = dict(
+            eventos.order_by().values(periodo=periodo).annotate(total=Sum('cantidad')).values_list('periodo', 'total')
+        )
+
+        paso = timedelta(days=7 if semanal else 1)
+        serie = []
+        fecha = desde
+        while fecha <= hasta:
+            serie.append({'fecha': fecha, 'cantidad': totales.get(fecha, 0)})
+            fecha += paso
+        return serie
+
+    @staticmethod
+    def _resumir(eventos, periodo):
+        """
+        Sustituye los eventos por una fila por (tipo, curso, empresa, objeto, periodo) sin estudiante.
+        Devuelve el número de filas eliminadas y creadas.
+        """
+        with transaction.atomic():
+            grupos = list(
+                eventos.order_by().values('tipo', 'curso_id', 'empresa_id', 'objeto', periodo=periodo)
+                .annotate(total=Sum('cantidad'))
+            )
+            if not grupos:
+                return 0, 0
+            eliminados, _ = eventos.delete()
+            EventoAvance.objects.bulk_create([
+                EventoAvance(
+                    tipo=grupo['tipo'],
+                    curso_id=grupo['curso_id'],
+                    empresa_id=grupo['empresa_id'],
+                    objeto=grupo['objeto'],
+                    fecha=grupo['periodo'],
+                    cantidad=grupo['total'],
+                )
+                for grupo in grupos
+            ], batch_size=1000)
+        return eliminados, len(grupos)
+
+    @classmethod
+    def compactar(cls, hoy=None):
+        """
+        Aplica la retención y el resumen por día y por semana. Devuelve el número de filas eliminadas
+        y creadas en cada paso.
+        """
+        hoy = hoy or timezone.localdate()
+        retencion = getattr(settings, 'EVENTOS_RETENCION_DIAS', 90)
+        semanal = getattr(settings, 'EVENTOS_RESUMEN_SEMANAL_DIAS', 365)
+        maxima = getattr(settings, 'EVENTOS_RETENCION_MAXIMA_DIAS', 730)
+        resumen = {'eliminados': 0, 'diarios': (0, 0), 'semanales': (0, 0)}
+
+        if maxima:
+            resumen['eliminados'], _ = EventoAvance.objects.filter(fecha__lt=hoy - timedelta(days=maxima)).delete()
+        limite_semanal = hoy - timedelta(days=semanal)
+        resumen['diarios'] = cls._resumir(
+            EventoAvance.objects.filter(
+                estudiante__isnull=False, fecha__lt=hoy - timedelta(days=retencion), fecha__gte=limite_semanal
+            ),
+            F('fecha'),
+        )
+        # Las filas ya resumidas por semana están sin estudiante y fechadas en lunes.
+        resumen['semanales'] = cls._resumir(
+            EventoAvance.objects.filter(fecha__lt=limite_semanal).exclude(estudiante__isnull=True, fecha__week_day=2),
+            TruncWeek('fecha'),
+        )
+        if any(resumen['diarios']) or any(resumen['semanales']) or resumen['eliminados']:
+            CacheMetricas.invalidar('EventoAvance')
+        return resumen
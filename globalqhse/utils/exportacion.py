@@ -0,0 +1,274 @@
+import csv
+import logging
+import re
+import zipfile
+from xml.sax.saxutils import escape
+from django.db.models import F, FilteredRelation, Q
+from django.utils.text import get_valid_filename
+from ..models import Certificado, Progreso
+
+logger = logging.getLogger(__name__)
+
+TAMANO_BLOQUE = 64 * 1024
+# Caracteres con los que un texto exportado se interpretaría como fórmula (inyección CSV).
+_INICIOS_FORMULA = ('=', '+', '-', '@', '\t', '\r')
+
+
+class _Salida:
+    """
+    Destino de escritura sin `seek` ni `tell` para `ZipFile`: acumula lo escrito hasta que el
+    generador lo entrega, de modo que `ZipFile` escribe en modo streaming (descriptores de datos).
+    """
+
+    def __init__(self):
+        self._partes = []
+
+    def write(self, datos):
+        self._partes.append(bytes(datos))
+        return len(datos)
+
+    def flush(self):
+        pass
+
+    def vaciar(self):
+        datos = b''.join(self._partes)
+        self._partes = []
+        return datos
+
+
+class ExportacionCertificados:
+    """
+    Exportación en ZIP de los certificados listos de un código de organización y/o un curso.
+
+    El índice se obtiene con una sola consulta y el ZIP se genera al vuelo: cada PDF se copia en
+    bloques de `TAMANO_BLOQUE` como entrada sin recompresión (ZIP_STORED), y los bytes se entregan
+    a medida que se escriben, así que la memoria usada no depende del número de certificados.
+    """
+
+    def __init__(self, codigo_organizacion=None, curso_id=None, codigos=None):
+        self.codigo_organizacion = codigo_organizacion
+        self.curso_id = curso_id
+        # Si se indica, solo se exportan estudiantes de estos códigos (los contratos de un instructor).
+        self.codigos = codigos
+
+    def indice(self):
+        """
+        Devuelve `(archivo, nombre_en_zip)` de cada certificado a exportar.
+        """
+        certificados = Certificado.objects.filter(estado='listo').exclude(archivoPdf='').exclude(archivoPdf__isnull=True)
+        if self.codigo_organizacion:
+            certificados = certificados.filter(estudiante__codigoOrganizacion=self.codigo_organizacion)
+        if self.codigos is not None:
+            certificados = certificados.filter(estudiante__codigoOrganizacion__in=self.codigos)
+        if self.curso_id:
+            certificados = certificados.filter(curso_id=self.curso_id)
+        filas = certificados.order_by('curso__titulo', 'estudiante__last_name', 'estudiante__first_name').values_list(
+            'archivoPdf', 'estudiante_id', 'estudiante__first_name', 'estudiante__last_name', 'curso_id', 'curso__titulo',
+        )
+        campo = Certificado._meta.get_field('archivoPdf')
+        for archivo, estudiante_id, nombre, apellido, curso_id, titulo in filas.iterator():
+            carpeta = get_valid_filename(f"{curso_id}_{titulo}")
+            pdf = get_valid_filename(f"{apellido}_{nombre}_{estudiante_id}")
+            yield campo.storage.path(archivo), f"{carpeta}/{pdf}.pdf"
+
+    def generar(self):
+        """
+        Genera los bytes del ZIP. Los certificados cuyo archivo ya no existe se omiten.
+        """
+        salida = _Salida()
+        with zipfile.ZipFile(salida, mode='w', compression=zipfile.ZIP_STORED) as zip_:
+            for ruta, nombre in self.indice():
+                try:
+                    origen = open(ruta, 'rb')
+                except FileNotFoundError:
+                    logger.warning("Certificado sin archivo en el almacenamiento: %s", ruta)
+                    continue
+                with origen, zip_.open(zipfile.ZipInfo.from_file(ruta, arcname=nombre), mode='w') as destino:
+                    while bloque := origen.read(TAMANO_BLOQUE):
+                        destino.write(bloque)
+                        yield salida.vaciar()
+        yield salida.vaciar()
+
+
+class _Linea:
+    """
+    Destino de `csv.writer` que devuelve la línea escrita en lugar de guardarla.
+    """
+
+    def write(self, linea):
+        return linea
+
+
+_CARACTERES_INVALIDOS_XML = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+_XLSX_ESTATICOS = {
+    '[Content_Types].xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/worksheets/sheet1.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        '</Types>'
+    ),
+    '_rels/.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+        'Target="xl/workbook.xml"/>'
+        '</Relationships>'
+    ),
+    'xl/workbook.xml': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+        'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+        '<sheets><sheet name="Nomina" sheetId="1" r:id="rId1"/></sheets>'
+        '</workbook>'
+    ),
+    'xl/_rels/workbook.xml.rels': (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+        '<Relationship Id="rId1" '
+        'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        'Target="worksheets/sheet1.xml"/>'
+        '</Relationships>'
+    ),
+}
+
+
+def _sin_formula(texto):
+    """
+    Antepone un apóstrofo a los textos que una hoja de cálculo interpretaría como fórmula.
+    """
+    if texto and texto[0] in _INICIOS_FORMULA:
+        return "'" + texto
+    return texto
+
+
+def _celda_xlsx(valor):
+    if valor is None or valor == '':
+        return '<c/>'
+    if isinstance(valor, (int, float)) and not isinstance(valor, bool):
+        return f'<c><v>{valor}</v></c>'
+    texto = escape(_CARACTERES_INVALIDOS_XML.sub('', str(valor)))
+    return f'<c t="inlineStr"><is><t xml:space="preserve">{texto}</t></is></c>'
+
+
+class ExportacionNomina:
+    """
+    Exportación en CSV o XLSX de la nómina de un código de organización y/o un curso: una fila por
+    (estudiante, curso) con el porcentaje de avance, la calificación de la prueba, el estado de la
+    simulación y la fecha del certificado.
+
+    Las filas salen de una sola consulta (el progreso unido a la prueba y al certificado del mismo
+    estudiante) que se recorre con `iterator()` en bloques de `lote`, con un cursor del lado del
+    servidor en PostgreSQL, y el archivo se genera a medida que se descarga, así que la memoria no
+    depende del número de filas. El XLSX se escribe a mano como un ZIP en streaming con celdas de
+    texto en línea, sin estilos ni cadenas compartidas.
+    """
+    FORMATOS = {
+        'csv': 'text/csv; charset=utf-8',
+        'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+    }
+    COLUMNAS = (
+        'estudiante_id', 'email', 'nombre', 'apellido', 'codigo_organizacion', 'curso_id', 'curso',
+        'porcentaje_completado', 'completado', 'calificacion', 'prueba_aprobada', 'simulacion', 'fecha_certificado',
+    )
+    TAMANO_LOTE = 2000
+
+    def __init__(self, codigo_organizacion=None, curso_id=None, lote=TAMANO_LOTE, codigos=None):
+        self.codigo_organizacion = codigo_organizacion
+        self.curso_id = curso_id
+        self.lote = lote
+        # Si se indica, solo se exportan estudiantes de estos códigos (los contratos de un instructor).
+        self.codigos = codigos
+
+    def consulta(self):
+        progresos = Progreso.objects.all()
+        if self.codigo_organizacion:
+            progresos = progresos.filter(estudiante__codigoOrganizacion=self.codigo_organizacion)
+        if self.codigos is not None:
+            progresos = progresos.filter(estudiante__codigoOrganizacion__in=self.codigos)
+        if self.curso_id:
+            progresos = progresos.filter(curso_id=self.curso_id)
+        return progresos.annotate(
+            prueba_estudiante=FilteredRelation(
+                'curso__prueba__progresos', condition=Q(curso__prueba__progresos__estudiante=F('estudiante'))
+            ),
+            certificado_listo=FilteredRelation(
+                'curso__certificados',
+                condition=Q(curso__certificados__estudiante=F('estudiante'), curso__certificados__estado='listo'),
+            ),
+        ).order_by('curso_id', 'estudiante__last_name', 'estudiante__first_name', 'estudiante_id').values_list(
+            'estudiante_id', 'estudiante__email', 'estudiante__first_name', 'estudiante__last_name',
+            'estudiante__codigoOrganizacion', 'curso_id', 'curso__titulo', 'porcentajeCompletado', 'completado',
+            'prueba_estudiante__calificacion', 'prueba_estudiante__estaAprobado',
+            'curso__simulacion', 'simulacionCompletada', 'certificado_listo__fechaEmision',
+        )
+
+    def filas(self):
+        """
+        Genera las filas de la nómina con los valores ya formateados; los textos que empiezan como
+        una fórmula llevan un apóstrofo delante.
+        """
+        for (estudiante_id, email, nombre, apellido, codigo, curso_id, titulo, porcentaje, completado,
+             calificacion, aprobada, con_simulacion, simulacion, fecha_certificado) in self.consulta().iterator(
+                chunk_size=self.lote):
+            if not con_simulacion:
+                estado_simulacion = 'No aplica'
+            else:
+                estado_simulacion = 'Completada' if simulacion else 'Pendiente'
+            email, nombre, apellido, codigo, titulo = (
+                _sin_formula(texto) for texto in (email, nombre, apellido, codigo, titulo)
+            )
+            yield (
+                estudiante_id, email, nombre, apellido, codigo, curso_id, titulo, round(porcentaje or 0, 2),
+                'Sí' if completado else 'No', calificacion,
+                '' if aprobada is None else ('Sí' if aprobada else 'No'),
+                estado_simulacion, fecha_certificado.isoformat() if fecha_certificado else '',
+            )
+
+    def generar(self, formato='csv'):
+        if formato not in self.FORMATOS:
+            raise ValueError(f"Formato inválido. Opciones: {', '.join(self.FORMATOS)}.")
+        return self.generar_xlsx() if formato == 'xlsx' else self.generar_csv()
+
+    def generar_csv(self):
+        """
+        Genera el CSV línea a línea, con BOM para que Excel lo abra como UTF-8.
+        """
+        escritor = csv.writer(_Linea())
+        yield '\ufeff' + escritor.writerow(self.COLUMNAS)
+        for fila in self.filas():
+            yield escritor.writerow(fila)
+
+    def generar_xlsx(self):
+        """
+        Genera los bytes del XLSX, entregando la hoja en bloques de `TAMANO_BLOQUE`.
+        """
+        salida = _Salida()
+        with zipfile.ZipFile(salida, mode='w', compression=zipfile.ZIP_DEFLATED) as zip_:
+            for nombre, contenido in _XLSX_ESTATICOS.items():
+                zip_.writestr(nombre, contenido)
+            yield salida.vaciar()
+            with zip_.open('xl/worksheets/sheet1.xml', mode='w', force_zip64=True) as hoja:
+                partes = [
+                    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+                    '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>',
+                    '<row>' + ''.join(_celda_xlsx(columna) for columna in self.COLUMNAS) + '</row>',
+                ]
+                tamano = 0
+                for fila in self.filas():
+                    parte = '<row>' + ''.join(_celda_xlsx(valor) for valor in fila) + '</row>'
+                    partes.append(parte)
+                    tamano += len(parte)
+                    if tamano >= TAMANO_BLOQUE:
+                        hoja.write(''.join(partes).encode('utf-8'))
+                        partes, tamano = [], 0
+                        yield salida.vaciar()
+                partes.append('</sheetData></worksheet>')
+                hoja.write(''.join(partes).encode('utf-8'))
+        yield salida.vaciar()
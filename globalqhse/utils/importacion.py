@@ -0,0 +1,194 @@
+import codecs
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from django.contrib.auth.base_user import BaseUserManager
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import DatabaseError, connection, transaction
+from django.utils import timezone
+from rest_framework import serializers
+from ..models import Contrato, Estudiante, Usuario
+from ..serializers import PasswordValidationMixin
+from .cache_metricas import CacheMetricas
+from .inscripcion import InscripcionService
+from .metricas_diarias import MetricasDiarias
+
+CAMPOS = ('email', 'first_name', 'last_name', 'password')
+FORMATOS = ('csv', 'jsonl')
+
+
+def _inicializar_proceso():
+    import django
+    django.setup()
+
+
+def _hashear(passwords, executor):
+    if executor is None:
+        return [make_password(password) for password in passwords]
+    return list(executor.map(make_password, passwords, chunksize=max(1, len(passwords) // 32)))
+
+
+class ImportacionEstudiantes:
+    """
+    Importación masiva de estudiantes de un código de organización desde un archivo CSV o JSONL
+    con las columnas `email`, `first_name`, `last_name` y `password`.
+
+    El archivo se recorre línea a línea y se procesa en lotes de `lote` filas: las contraseñas se
+    hashean en el proceso actual o, con `workers` > 1, en un pool de procesos (solo desde el comando
+    `importar_estudiantes`, nunca dentro de una petición web), los usuarios se insertan con una
+    sentencia por lote y la inscripción en los cursos del contrato la hace `InscripcionService`.
+    Cada lote es una transacción; los errores se informan por número de fila.
+    """
+
+    def __init__(self, codigo_organizacion, lote=1000, workers=1):
+        self.codigo_organizacion = codigo_organizacion
+        self.lote = lote
+        self.workers = workers
+        self.curso_ids = list(
+            Contrato.objects.filter(codigoOrganizacion=codigo_organizacion).values_list('curso_id', flat=True)
+        )
+        if not self.curso_ids:
+            raise ValidationError("El código de organización ingresado no corresponde a ningún contrato válido.")
+
+    @staticmethod
+    def detectar_formato(nombre, formato=None):
+        formato = (formato or os.path.splitext(nombre or '')[1].lstrip('.')).lower()
+        if formato in ('ndjson', 'json'):
+            formato = 'jsonl'
+        if formato not in FORMATOS:
+            raise ValidationError(f"Formato no soportado: '{formato}'. Use 'csv' o 'jsonl'.")
+        return formato
+
+    @staticmethod
+    def leer_filas(archivo, formato):
+        """
+        Genera `(numero_fila, datos, error)` leyendo el archivo binario línea a línea.
+        """
+        lineas = codecs.iterdecode(archivo, 'utf-8-sig')
+        if formato == 'csv':
+            lector = csv.DictReader(lineas)
+            for numero, fila in enumerate(lector, start=2):
+                yield numero, {campo: (fila.get(campo) or '').strip() for campo in CAMPOS}, None
+            return
+
+        for numero, linea in enumerate(lineas, start=1):
+            if not linea.strip():
+                continue
+            try:
+                fila = json.loads(linea)
+                if not isinstance(fila, dict):
+                    raise ValueError
+            except ValueError:
+                yield numero, {}, "Línea JSON inválida."
+                continue
+            yield numero, {campo: str(fila.get(campo) or '').strip() for campo in CAMPOS}, None
+
+    def importar(self, archivo, formato):
+        """
+        Importa el archivo y devuelve un resumen con las filas procesadas, los estudiantes creados
+        y los errores por fila.
+        """
+        resumen = {'procesadas': 0, 'creados': 0, 'errores': []}
+        vistos = set()
+        filas = self.leer_filas(archivo, formato)
+        executor = None
+        if self.workers > 1:
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_inicializar_proceso)
+        try:
+            while True:
+                lote = list(islice(filas, self.lote))
+                if not lote:
+                    break
+                resumen['procesadas'] += len(lote)
+                validas = self._validar(lote, vistos, resumen['errores'])
+                if validas:
+                    resumen['creados'] += self._crear(validas, executor, resumen['errores'])
+        finally:
+            if executor is not None:
+                executor.shutdown()
+        resumen['errores'].sort(key=lambda error: error['fila'])
+        return resumen
+
+    def _validar(self, lote, vistos, errores):
+        validas = []
+        for numero, datos, error in lote:
+            if error is None:
+                error = self._error_fila(datos, vistos)
+            if error:
+                errores.append({'fila': numero, 'email': datos.get('email', ''), 'error': error})
+                continue
+            vistos.add(datos['email'])
+            validas.append((numero, datos))
+
+        existentes = set(
+            Usuario.objects.filter(email__in=[datos['email'] for _, datos in validas]).values_list('email', flat=True)
+        )
+        if not existentes:
+            return validas
+        for numero, datos in validas:
+            if datos['email'] in existentes:
+                errores.append({'fila': numero, 'email': datos['email'], 'error': "Este correo electrónico ya está registrado."})
+        return [(numero, datos) for numero, datos in validas if datos['email'] not in existentes]
+
+    @staticmethod
+    def _error_fila(datos, vistos):
+        faltantes = [campo for campo in CAMPOS if not datos.get(campo)]
+        if faltantes:
+            return f"Campos requeridos vacíos: {', '.join(faltantes)}."
+        datos['email'] = BaseUserManager.normalize_email(datos['email'])
+        try:
+            validate_email(datos['email'])
+        except ValidationError:
+            return "Correo electrónico inválido."
+        if datos['email'] in vistos:
+            return "Correo electrónico duplicado en el archivo."
+        try:
+            PasswordValidationMixin().validate_password(datos['password'])
+        except serializers.ValidationError as e:
+            return str(e.detail[0])
+        return None
+
+    def _crear(self, validas, executor, errores):
+        hashes = _hashear([datos['password'] for _, datos in validas], executor)
+        ahora = timezone.now()
+        usuarios = [
+            Usuario(
+                email=datos['email'], first_name=datos['first_name'], last_name=datos['last_name'],
+                password=password, rol='estudiante', date_joined=ahora,
+            )
+            for (_, datos), password in zip(validas, hashes)
+        ]
+        try:
+            with transaction.atomic():
+                Usuario.objects.bulk_create(usuarios, batch_size=self.lote)
+                ids = list(
+                    Usuario.objects.filter(email__in=[usuario.email for usuario in usuarios]).values_list('id', flat=True)
+                )
+                self._insertar_estudiantes(ids)
+                InscripcionService.inscribir(ids, self.curso_ids)
+        except DatabaseError as e:
+            for numero, datos in validas:
+                errores.append({'fila': numero, 'email': datos['email'], 'error': f"Error al guardar el lote: {e}"})
+            return 0
+        return len(ids)
+
+    def _insertar_estudiantes(self, usuario_ids):
+        """
+        Inserta las filas de la tabla hija de `Estudiante` (herencia multitabla), que
+        `bulk_create` no admite. Como no se emiten señales, marca aquí las métricas del código
+        y la caché de métricas de estudiantes.
+        """
+        meta = Estudiante._meta
+        quote = connection.ops.quote_name
+        sql = (
+            f"INSERT INTO {quote(meta.db_table)} "
+            f"({quote(meta.pk.column)}, {quote(meta.get_field('codigoOrganizacion').column)}) VALUES (%s, %s)"
+        )
+        with connection.cursor() as cursor:
+            cursor.executemany(sql, [(usuario_id, self.codigo_organizacion) for usuario_id in usuario_ids])
+        MetricasDiarias.marcar([self.codigo_organizacion])
+        CacheMetricas.invalidar('Estudiante')
@@ -0,0 +1,212 @@
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+from ..models import EstudianteModulo, EstudiantePrueba, EstudianteSubcurso, Modulo, Progreso, Prueba, Subcurso
+from .cache_metricas import CacheMetricas
+from .estructura import EstructuraCurso
+from .metricas_diarias import MetricasDiarias
+from .progreso import ProgresoService
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 2000
+TAMANO_LOTE_COMPLETADO = 500
+
+
+def _en_lotes(registros, tamano):
+    registros = iter(registros)
+    while True:
+        lote = list(islice(registros, tamano))
+        if not lote:
+            return
+        yield lote
+
+
+class InscripcionService:
+    """
+    Inscribe estudiantes en cursos creando sus registros de Progreso, EstudiantePrueba,
+    EstudianteSubcurso y EstudianteModulo.
+
+    La estructura de los cursos se toma de `EstructuraCurso` (sin consultas si está cacheada)
+    y las filas se generan de forma perezosa y se insertan en lotes con
+    `bulk_create(ignore_conflicts=True)`, por lo que reinscribir a un estudiante no falla
+    ni duplica registros.
+
+    Cuando un curso con estudiantes inscritos gana subcursos, módulos o pruebas,
+    `programar_completado` crea en segundo plano los registros que les faltan.
+    """
+    _executor = None
+    _lock = threading.Lock()
+    _cursos_pendientes = set()
+
+    @classmethod
+    def inscribir(cls, estudiante_ids, curso_ids, batch_size=TAMANO_LOTE, estructura=None):
+        """
+        Inscribe a todos los estudiantes indicados en todos los cursos indicados.
+        Devuelve cuántos registros de cada tipo se enviaron a la base de datos.
+        """
+        estudiante_ids = list(estudiante_ids)
+        if estructura is None:
+            estructura = EstructuraCurso.obtener_varios(curso_ids)
+
+        def progresos():
+            for curso_id, partes in estructura.items():
+                for estudiante_id in estudiante_ids:
+                    yield Progreso(
+                        estudiante_id=estudiante_id,
+                        curso_id=curso_id,
+                        completado=False,
+                        porcentajeCompletado=0,
+                        simulacionCompletada=False,
+                        subcursos_totales=len(partes['subcursos']),
+                    )
+
+        def pruebas():
+            for partes in estructura.values():
+                for prueba_id in partes['pruebas']:
+                    for estudiante_id in estudiante_ids:
+                        yield EstudiantePrueba(estudiante_id=estudiante_id, prueba_id=prueba_id)
+
+        def subcursos():
+            for partes in estructura.values():
+                for subcurso_id, modulos_totales in partes['subcursos'].items():
+                    for estudiante_id in estudiante_ids:
+                        yield EstudianteSubcurso(
+                            estudiante_id=estudiante_id,
+                            subcurso_id=subcurso_id,
+                            completado=False,
+                            porcentajeCompletado=0.0,
+                            modulos_totales=modulos_totales,
+                        )
+
+        def modulos():
+            for partes in estructura.values():
+                for modulo_id in partes['modulos']:
+                    for estudiante_id in estudiante_ids:
+                        yield EstudianteModulo(estudiante_id=estudiante_id, modulo_id=modulo_id, completado=False)
+
+        totales = defaultdict(int)
+        for nombre, modelo, registros in (
+            ('progresos', Progreso, progresos()),
+            ('pruebas', EstudiantePrueba, pruebas()),
+            ('subcursos', EstudianteSubcurso, subcursos()),
+            ('modulos', EstudianteModulo, modulos()),
+        ):
+            for lote in _en_lotes(registros, batch_size):
+                modelo.objects.bulk_create(lote, batch_size=batch_size, ignore_conflicts=True)
+                totales[nombre] += len(lote)
+        if totales:
+            CacheMetricas.invalidar('Progreso', 'EstudiantePrueba')
+        if totales['pruebas']:
+            MetricasDiarias.marcar_estudiantes(estudiante_ids)
+        return dict(totales)
+
+    @classmethod
+    def programar_completado(cls, curso_id):
+        """
+        Programa, al confirmar la transacción, la creación de los registros que les faltan a los
+        estudiantes inscritos en el curso. Las solicitudes repetidas de un mismo curso se agrupan.
+        """
+        transaction.on_commit(lambda: cls._encolar_completado(curso_id))
+
+    @classmethod
+    def _encolar_completado(cls, curso_id):
+        workers = getattr(settings, 'INSCRIPCION_WORKERS', 1)
+        if workers <= 0:
+            cls.completar_inscripciones(curso_id)
+            return
+        with cls._lock:
+            if curso_id in cls._cursos_pendientes:
+                return
+            cls._cursos_pendientes.add(curso_id)
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='inscripcion')
+        cls._executor.submit(cls._completar_en_hilo, curso_id)
+
+    @classmethod
+    def _completar_en_hilo(cls, curso_id):
+        with cls._lock:
+            cls._cursos_pendientes.discard(curso_id)
+        try:
+            cls.completar_inscripciones(curso_id)
+        except Exception:
+            logger.exception("Error al completar las inscripciones del curso %s", curso_id)
+        finally:
+            close_old_connections()
+
+    @classmethod
+    def completar_inscripciones(cls, curso_id, lote=TAMANO_LOTE_COMPLETADO):
+        """
+        Crea con sentencias INSERT ... SELECT los registros de EstudianteSubcurso, EstudianteModulo y
+        EstudiantePrueba que les faltan a los estudiantes inscritos en el curso (los que tienen Progreso),
+        en lotes de `lote` estudiantes, y reconcilia su progreso. Devuelve cuántas filas se insertaron.
+        """
+        estudiante_ids = list(
+            Progreso.objects.filter(curso_id=curso_id).order_by('estudiante_id').values_list('estudiante_id', flat=True)
+        )
+        subcurso_ids = list(Subcurso.objects.filter(curso_id=curso_id).values_list('id', flat=True))
+        insertadas = 0
+        for inicio in range(0, len(estudiante_ids), lote):
+            bloque = estudiante_ids[inicio:inicio + lote]
+            with transaction.atomic():
+                insertadas_bloque = cls._insertar_faltantes(curso_id, bloque[0], bloque[-1])
+                if insertadas_bloque:
+                    ProgresoService.reconciliar_subcursos(bloque, subcurso_ids)
+                    ProgresoService.reconciliar_progresos(bloque, curso_id)
+            insertadas += insertadas_bloque
+        return insertadas
+
+    @staticmethod
+    def _insertar_faltantes(curso_id, desde, hasta):
+        q = connection.ops.quote_name
+        t = {modelo: q(modelo._meta.db_table) for modelo in (Progreso, Subcurso, Modulo, Prueba, EstudianteSubcurso, EstudianteModulo, EstudiantePrueba)}
+
+        def c(modelo, campo):
+            return q(modelo._meta.get_field(campo).column)
+
+        inscritos = (
+            f"FROM {t[Progreso]} p "
+            f"JOIN {t[Subcurso]} s ON s.{c(Subcurso, 'curso')} = p.{c(Progreso, 'curso')} "
+        )
+        filtro = f"WHERE p.{c(Progreso, 'curso')} = %s AND p.{c(Progreso, 'estudiante')} BETWEEN %s AND %s "
+        estudiante = f"p.{c(Progreso, 'estudiante')}"
+        sentencias = [
+            f"INSERT INTO {t[EstudianteSubcurso]} "
+            f"({c(EstudianteSubcurso, 'estudiante')}, {c(EstudianteSubcurso, 'subcurso')}, {c(EstudianteSubcurso, 'completado')}, "
+            f"{c(EstudianteSubcurso, 'porcentajeCompletado')}, {c(EstudianteSubcurso, 'modulos_completados')}, "
+            f"{c(EstudianteSubcurso, 'modulos_totales')}) "
+            f"SELECT {estudiante}, s.{q('id')}, %s, 0, 0, 0 {inscritos}{filtro}"
+            f"AND NOT EXISTS (SELECT 1 FROM {t[EstudianteSubcurso]} x WHERE x.{c(EstudianteSubcurso, 'estudiante')} = {estudiante} "
+            f"AND x.{c(EstudianteSubcurso, 'subcurso')} = s.{q('id')})",
+
+            f"INSERT INTO {t[EstudianteModulo]} "
+            f"({c(EstudianteModulo, 'estudiante')}, {c(EstudianteModulo, 'modulo')}, {c(EstudianteModulo, 'completado')}) "
+            f"SELECT {estudiante}, m.{q('id')}, %s {inscritos}"
+            f"JOIN {t[Modulo]} m ON m.{c(Modulo, 'subcurso')} = s.{q('id')} {filtro}"
+            f"AND NOT EXISTS (SELECT 1 FROM {t[EstudianteModulo]} x WHERE x.{c(EstudianteModulo, 'estudiante')} = {estudiante} "
+            f"AND x.{c(EstudianteModulo, 'modulo')} = m.{q('id')})",
+
+            f"INSERT INTO {t[EstudiantePrueba]} "
+            f"({c(EstudiantePrueba, 'estudiante')}, {c(EstudiantePrueba, 'prueba')}, {c(EstudiantePrueba, 'estaAprobado')}, "
+            f"{c(EstudiantePrueba, 'calificacion')}, {c(EstudiantePrueba, 'intento')}, {c(EstudiantePrueba, 'fechaPrueba')}) "
+            f"SELECT {estudiante}, r.{q('id')}, %s, 0, 0, %s FROM {t[Progreso]} p "
+            f"JOIN {t[Prueba]} r ON r.{c(Prueba, 'curso')} = p.{c(Progreso, 'curso')} {filtro}"
+            f"AND NOT EXISTS (SELECT 1 FROM {t[EstudiantePrueba]} x WHERE x.{c(EstudiantePrueba, 'estudiante')} = {estudiante} "
+            f"AND x.{c(EstudiantePrueba, 'prueba')} = r.{q('id')})",
+        ]
+        parametros = [
+            [False, curso_id, desde, hasta],
+            [False, curso_id, desde, hasta],
+            [False, timezone.localdate(), curso_id, desde, hasta],
+        ]
+        insertadas = 0
+        with connection.cursor() as cursor:
+            for sql, params in zip(sentencias, parametros):
+                cursor.execute(sql, params)
+                insertadas += max(cursor.rowcount, 0)
+        return insertadas
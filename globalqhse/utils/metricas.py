@@ -0,0 +1,258 @@
+from collections import defaultdict
+from contextlib import contextmanager
+from math import floor
+from django.db import connection, connections
+from django.db.models import Aggregate, Avg, Count, Exists, F, FloatField, Func, IntegerField, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+from ..models import Certificado, Contrato, Curso, Empresa, Estudiante, EstudiantePrueba, Progreso, Usuario
+
+
+@contextmanager
+def contar_consultas():
+    """
+    Cuenta las consultas SQL ejecutadas dentro del bloque; el total queda en `contador['consultas']`.
+    """
+    contador = {'consultas': 0}
+
+    def contar(execute, sql, params, many, context):
+        contador['consultas'] += 1
+        return execute(sql, params, many, context)
+
+    with connection.execute_wrapper(contar):
+        yield contador
+
+
+def _porcentaje(parte, total):
+    return round(parte / total * 100, 2) if total else 0
+
+
+class MetricasDashboard:
+    """
+    Todas las cifras del dashboard del administrador, con los mismos filtros (`empresa_id`,
+    `curso_id`) y la misma semántica que los endpoints individuales, calculadas con seis consultas
+    de agregación condicional en lugar de varios COUNT por endpoint.
+
+    Los códigos de organización de una empresa se usan como subconsulta, no se materializan.
+    """
+
+    def __init__(self, empresa_id=None, curso_id=None):
+        self.empresa_id = int(empresa_id) if empresa_id else None
+        self.curso_id = int(curso_id) if curso_id else None
+
+    def _codigos_empresa(self):
+        return Contrato.objects.filter(instructor__empresa_id=self.empresa_id).values('codigoOrganizacion')
+
+    def _filtrar(self, queryset, campo_codigo, campo_curso):
+        if self.empresa_id:
+            queryset = queryset.filter(**{f'{campo_codigo}__in': self._codigos_empresa()})
+        if self.curso_id:
+            queryset = queryset.filter(**{campo_curso: self.curso_id})
+        return queryset
+
+    def empresas(self):
+        """
+        `{empresa_id: (nombre, instructores, estudiantes)}` de todas las empresas.
+        """
+        estudiantes = Estudiante.objects.filter(
+            codigoOrganizacion__in=Contrato.objects.filter(
+                instructor__empresa_id=OuterRef(OuterRef('pk'))
+            ).values('codigoOrganizacion')
+        ).order_by().annotate(total=Func(F('id'), function='COUNT')).values('total')
+        filas = Empresa.objects.annotate(
+            total_instructores=Count('instructores', distinct=True),
+            total_estudiantes=Coalesce(Subquery(estudiantes, output_field=IntegerField()), 0),
+        ).values_list('id', 'nombre', 'total_instructores', 'total_estudiantes')
+        return {fila[0]: fila[1:] for fila in filas}
+
+    def calcular(self):
+        """
+        Devuelve el dict con todas las cifras, o None si la empresa o el curso indicados no existen.
+        """
+        empresas = self.empresas()
+        if self.empresa_id and self.empresa_id not in empresas:
+            return None
+
+        cursos = Curso.objects.aggregate(
+            total=Count('id', distinct=True),
+            de_empresa=Count(
+                'id', distinct=True, filter=Q(instructores_asignados__instructor__empresa_id=self.empresa_id)
+            ),
+            existe=Count('id', distinct=True, filter=Q(id=self.curso_id)),
+        )
+        if self.curso_id and not cursos['existe']:
+            return None
+
+        filtro_empresa = Q()
+        if self.empresa_id:
+            filtro_empresa = Q(estudiante__codigoOrganizacion__in=self._codigos_empresa())
+        usuarios = Usuario.objects.aggregate(
+            instructores=Count('id', filter=Q(instructor__isnull=False)),
+            estudiantes=Count('id', filter=Q(estudiante__isnull=False)),
+            estudiantes_empresa=Count('id', filter=Q(estudiante__isnull=False) & filtro_empresa),
+        )
+
+        progresos = self._filtrar(Progreso.objects.all(), 'estudiante__codigoOrganizacion', 'curso_id')
+        progresos = progresos.aggregate(
+            promedio=Avg('porcentajeCompletado'),
+            simulaciones=Count('id', filter=Q(curso__simulacion=True)),
+            simulaciones_completadas=Count('id', filter=Q(curso__simulacion=True, simulacionCompletada=True)),
+        )
+        pruebas = self._filtrar(EstudiantePrueba.objects.all(), 'estudiante__codigoOrganizacion', 'prueba__curso_id')
+        pruebas = pruebas.aggregate(
+            total=Count('id'),
+            aprobadas=Count('id', filter=Q(estaAprobado=True)),
+        )
+
+        certificados = Certificado.objects.all()
+        if self.empresa_id:
+            certificados = certificados.filter(curso__instructores_asignados__instructor__empresa_id=self.empresa_id)
+        if self.curso_id:
+            certificados = certificados.filter(curso_id=self.curso_id)
+        estudiantes_certificados = certificados.aggregate(total=Count('estudiante_id', distinct=True))['total']
+
+        return {
+            "total_empresas": len(empresas),
+            "total_instructores": empresas[self.empresa_id][1] if self.empresa_id else usuarios['instructores'],
+            "total_estudiantes": usuarios['estudiantes_empresa'],
+            "total_cursos": cursos['de_empresa'] if self.empresa_id else cursos['total'],
+            "progreso_promedio": round(progresos['promedio'] or 0, 2),
+            "simulaciones": {
+                "total_simulaciones": progresos['simulaciones'],
+                "total_simulaciones_completadas": progresos['simulaciones_completadas'],
+                "porcentaje_completadas": _porcentaje(progresos['simulaciones_completadas'], progresos['simulaciones']),
+            },
+            "tasa_certificacion": _porcentaje(estudiantes_certificados, usuarios['estudiantes']),
+            "tasa_aprobacion": _porcentaje(pruebas['aprobadas'], pruebas['total']),
+            "estudiantes_por_empresa": {nombre: estudiantes for nombre, _, estudiantes in empresas.values()},
+            "instructores_por_empresa": {nombre: instructores for nombre, instructores, _ in empresas.values()},
+        }
+
+
+class PercentilCont(Aggregate):
+    """
+    `percentile_cont(fraccion) WITHIN GROUP (ORDER BY expresion)` de PostgreSQL.
+    """
+    function = 'PERCENTILE_CONT'
+    name = 'PercentilCont'
+    template = '%(function)s(%(fraccion)s) WITHIN GROUP (ORDER BY %(expressions)s)'
+    output_field = FloatField()
+
+    def __init__(self, expresion, fraccion, **extra):
+        super().__init__(expresion, fraccion=float(fraccion), **extra)
+
+
+def percentil_cont(frecuencias, fraccion):
+    """
+    Percentil con interpolación lineal (la semántica de `percentile_cont`) a partir de una lista
+    ordenada de `(valor, cantidad)`.
+    """
+    total = sum(cantidad for _, cantidad in frecuencias)
+    if not total:
+        return None
+    posicion = fraccion * (total - 1)
+    inferior = floor(posicion)
+    valores = []
+    acumulado = 0
+    for valor, cantidad in frecuencias:
+        acumulado += cantidad
+        while len(valores) < 2 and acumulado > inferior + len(valores):
+            valores.append(valor)
+        if len(valores) == 2:
+            break
+    if len(valores) == 1:
+        return valores[0]
+    return valores[0] + (valores[1] - valores[0]) * (posicion - inferior)
+
+
+class DistribucionProgreso:
+    """
+    Distribución de `Progreso.porcentajeCompletado` por curso: histograma en tramos de 10 %,
+    percentiles, promedio y cantidad de progresos sin iniciar, en curso y completados.
+
+    Todo se calcula con una consulta agrupada por curso. En PostgreSQL los percentiles salen de
+    `percentile_cont` en esa misma consulta; en otros motores se calculan a partir de una segunda
+    consulta agrupada por (curso, porcentaje), que devuelve una fila por valor distinto y no una
+    por progreso.
+    """
+    PERCENTILES = {'p25': 0.25, 'p50': 0.5, 'p90': 0.9}
+    TRAMOS = 10
+
+    def __init__(self, empresa_id=None, instructor_id=None, curso_id=None):
+        self.empresa_id = int(empresa_id) if empresa_id else None
+        self.instructor_id = int(instructor_id) if instructor_id else None
+        self.curso_id = int(curso_id) if curso_id else None
+
+    def progresos(self):
+        progresos = Progreso.objects.all()
+        if self.curso_id:
+            progresos = progresos.filter(curso_id=self.curso_id)
+        if self.empresa_id or self.instructor_id:
+            contratos = Contrato.objects.filter(
+                codigoOrganizacion=OuterRef('estudiante__codigoOrganizacion'), curso_id=OuterRef('curso_id')
+            )
+            if self.empresa_id:
+                contratos = contratos.filter(instructor__empresa_id=self.empresa_id)
+            if self.instructor_id:
+                contratos = contratos.filter(instructor_id=self.instructor_id)
+            progresos = progresos.filter(Exists(contratos))
+        return progresos
+
+    def _tramos(self):
+        ancho = 100 / self.TRAMOS
+        tramos = {}
+        for indice in range(self.TRAMOS):
+            condicion = Q(porcentajeCompletado__gte=indice * ancho)
+            if indice < self.TRAMOS - 1:
+                condicion &= Q(porcentajeCompletado__lt=(indice + 1) * ancho)
+            tramos[f'tramo_{indice}'] = Count('id', filter=condicion)
+        return tramos
+
+    def calcular(self):
+        """
+        Devuelve una lista con la distribución de cada curso con progresos, ordenada por curso.
+        """
+        progresos = self.progresos()
+        nativo = connections[progresos.db].vendor == 'postgresql'
+        agregados = {
+            'total': Count('id'),
+            'promedio': Avg('porcentajeCompletado'),
+            'no_iniciados': Count('id', filter=Q(porcentajeCompletado=0, completado=False)),
+            'completados': Count('id', filter=Q(completado=True)),
+            **self._tramos(),
+        }
+        if nativo:
+            agregados.update({
+                nombre: PercentilCont('porcentajeCompletado', fraccion)
+                for nombre, fraccion in self.PERCENTILES.items()
+            })
+        filas = list(
+            progresos.order_by().values('curso_id', titulo=F('curso__titulo')).annotate(**agregados).order_by('curso_id')
+        )
+        if not nativo and filas:
+            frecuencias = defaultdict(list)
+            for curso_id, valor, cantidad in progresos.order_by().values('curso_id', 'porcentajeCompletado').annotate(
+                cantidad=Count('id')
+            ).order_by('curso_id', 'porcentajeCompletado').values_list('curso_id', 'porcentajeCompletado', 'cantidad'):
+                frecuencias[curso_id].append((valor, cantidad))
+            for fila in filas:
+                for nombre, fraccion in self.PERCENTILES.items():
+                    fila[nombre] = percentil_cont(frecuencias[fila['curso_id']], fraccion)
+
+        ancho = 100 // self.TRAMOS
+        return [
+            {
+                'curso_id': fila['curso_id'],
+                'titulo': fila['titulo'],
+                'total': fila['total'],
+                'promedio': round(fila['promedio'] or 0, 2),
+                'no_iniciados': fila['no_iniciados'],
+                'en_curso': fila['total'] - fila['no_iniciados'] - fila['completados'],
+                'completados': fila['completados'],
+                'percentiles': {nombre: round(fila[nombre] or 0, 2) for nombre in self.PERCENTILES},
+                'histograma': [
+                    {'desde': indice * ancho, 'hasta': (indice + 1) * ancho, 'cantidad': fila[f'tramo_{indice}']}
+                    for indice in range(self.TRAMOS)
+                ],
+            }
+            for fila in filas
+        ]
@@ -0,0 +1,371 @@
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import Count, Exists, ExpressionWrapper, F, FloatField, OuterRef, Q, Sum, Value, Window
+from django.db.models.functions import Coalesce, NullIf, TruncDate
+from django.utils.timezone import now
+from ..models import Certificado, Contrato, Estudiante, EstudiantePrueba, MetricaDiaria, MetricaPendiente, Progreso
+from .cache_metricas import CacheMetricas
+from .paginacion import TAMANO_PAGINA, limitar_pagina
+from .ranking import RankingInstructores
+
+logger = logging.getLogger(__name__)
+
+MEDIDAS = ('estudiantes', 'certificados', 'pruebas', 'pruebasAprobadas', 'progresos', 'sumaPorcentajes')
+
+# Contratos de un código que cuentan para cada alcance de las filas de población.
+CONTRATOS_EN_ALCANCE = {
+    MetricaDiaria.ALCANCE_INSTRUCTOR: {'instructor_id': OuterRef('instructor_id')},
+    MetricaDiaria.ALCANCE_EMPRESA: {'instructor__empresa_id': OuterRef('empresa_id')},
+    MetricaDiaria.ALCANCE_CODIGO: {},
+}
+
+
+class MetricasDiarias:
+    """
+    Mantiene la tabla `MetricaDiaria` y calcula las métricas generales a partir de ella.
+
+    Los cambios marcan su código de organización como pendiente al confirmar la transacción
+    (señales de Contrato, Estudiante, Certificado y EstudiantePrueba, y los servicios que escriben
+    en bloque). Los pendientes los recalculan los hilos locales (`METRICAS_WORKERS`; con 0 solo el
+    comando `reconstruir_metricas --pendientes`): las filas de cada código se reemplazan con unas
+    pocas consultas agrupadas, sin recorrer los demás códigos.
+    """
+    _executor = None
+    _lock = threading.Lock()
+    _drenado_programado = False
+
+    @classmethod
+    def marcar(cls, codigos):
+        """
+        Marca los códigos de organización como pendientes cuando la transacción actual se confirme.
+        """
+        codigos = {codigo for codigo in codigos if codigo}
+        if codigos:
+            transaction.on_commit(lambda: cls._registrar(codigos))
+
+    @classmethod
+    def marcar_estudiantes(cls, estudiante_ids):
+        """
+        Marca como pendientes los códigos de organización de los estudiantes indicados.
+        """
+        estudiante_ids = set(estudiante_ids)
+        if estudiante_ids:
+            transaction.on_commit(lambda: cls._registrar(
+                Estudiante.objects.filter(id__in=estudiante_ids).values_list('codigoOrganizacion', flat=True).distinct()
+            ))
+
+    @classmethod
+    def _registrar(cls, codigos):
+        MetricaPendiente.objects.bulk_create(
+            [MetricaPendiente(codigoOrganizacion=codigo) for codigo in set(codigos)], ignore_conflicts=True
+        )
+        cls._programar_drenado()
+
+    @classmethod
+    def _programar_drenado(cls):
+        workers = getattr(settings, 'METRICAS_WORKERS', 1)
+        if workers <= 0:
+            return
+        with cls._lock:
+            if cls._drenado_programado:
+                return
+            cls._drenado_programado = True
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='metricas')
+        cls._executor.submit(cls._drenar_en_hilo)
+
+    @classmethod
+    def _drenar_en_hilo(cls):
+        with cls._lock:
+            cls._drenado_programado = False
+        try:
+            cls.drenar()
+        except Exception:
+            logger.exception("Error al recalcular las métricas pendientes")
+        finally:
+            close_old_connections()
+
+    @classmethod
+    def drenar(cls, lote=200):
+        """
+        Recalcula los códigos pendientes en lotes. Devuelve cuántos se recalcularon.
+        """
+        procesados = 0
+        while True:
+            with transaction.atomic():
+                pendientes = list(
+                    MetricaPendiente.objects.select_for_update(skip_locked=True)
+                    .order_by('id')
+                    .values_list('id', 'codigoOrganizacion')[:lote]
+                )
+                if not pendientes:
+                    return procesados
+                # Se borran antes de recalcular: un cambio confirmado durante el recálculo vuelve a marcarse.
+                MetricaPendiente.objects.filter(id__in=[pendiente_id for pendiente_id, _ in pendientes]).delete()
+                cls.recalcular(codigo for _, codigo in pendientes)
+            procesados += len(pendientes)
+
+    @classmethod
+    def reconstruir(cls, lote=200):
+        """
+        Recalcula las métricas de todos los códigos de organización con contrato, borra las de
+        los códigos que ya no tienen y reconstruye el ranking de instructores. Devuelve cuántos
+        códigos se recalcularon.
+        """
+        codigos = sorted(set(Contrato.objects.values_list('codigoOrganizacion', flat=True)))
+        MetricaPendiente.objects.all().delete()
+        for inicio in range(0, len(codigos), lote):
+            with transaction.atomic():
+                cls.recalcular(codigos[inicio:inicio + lote])
+        MetricaDiaria.objects.exclude(codigoOrganizacion__in=codigos).delete()
+        RankingInstructores.reconstruir()
+        return len(codigos)
+
+    @staticmethod
+    def recalcular(codigos):
+        """
+        Reemplaza las filas de `MetricaDiaria` de los códigos indicados.
+
+        Los estudiantes se agrupan por día de registro, los certificados por día de emisión, las
+        pruebas por día de registro de la prueba y los progresos por día de inicio del curso. Los certificados y pruebas de un curso sin
+        contrato para el código se asignan al primer instructor del código, sin fechas de contrato.
+        Los estudiantes del código se escriben una vez por instructor con contrato; el primero de
+        cada empresa lleva el alcance de empresa y el primero del código, el alcance de código.
+        """
+        codigos = set(codigos)
+        contratos = Contrato.objects.filter(codigoOrganizacion__in=codigos).order_by('-activo', 'id').values_list(
+            'codigoOrganizacion', 'curso_id', 'instructor_id', 'instructor__empresa_id',
+            'fechaInicioCapacitacion', 'fechaFinCapacitacion',
+        )
+        por_codigo = {}
+        por_curso = {}
+        cursos_por_codigo = defaultdict(list)
+        instructores_por_codigo = defaultdict(dict)
+        for codigo, curso_id, instructor_id, empresa_id, inicio, fin in contratos:
+            if (codigo, curso_id) not in por_curso:
+                por_curso[(codigo, curso_id)] = (empresa_id, instructor_id, inicio, fin)
+                cursos_por_codigo[codigo].append(curso_id)
+            por_codigo.setdefault(codigo, (empresa_id, instructor_id))
+            instructores = instructores_por_codigo[codigo]
+            if instructor_id not in instructores:
+                if not instructores:
+                    alcance = MetricaDiaria.ALCANCE_CODIGO
+                elif empresa_id not in {empresa for empresa, _ in instructores.values()}:
+                    alcance = MetricaDiaria.ALCANCE_EMPRESA
+                else:
+                    alcance = MetricaDiaria.ALCANCE_INSTRUCTOR
+                instructores[instructor_id] = (empresa_id, alcance)
+
+        filas = defaultdict(lambda: dict.fromkeys(MEDIDAS, 0))
+        estudiantes = (
+            Estudiante.objects.filter(codigoOrganizacion__in=por_codigo)
+            .annotate(dia=TruncDate('date_joined'))
+            .values('codigoOrganizacion', 'dia')
+            .annotate(total=Count('id'))
+            .values_list('codigoOrganizacion', 'dia', 'total')
+            .order_by()
+        )
+        for codigo, dia, total in estudiantes:
+            filas[(codigo, None, dia)]['estudiantes'] += total
+            for curso_id in cursos_por_codigo[codigo]:
+                filas[(codigo, curso_id, dia)]['estudiantes'] += total
+
+        certificados = (
+            Certificado.objects.filter(estudiante__codigoOrganizacion__in=por_codigo)
+            .values('estudiante__codigoOrganizacion', 'curso_id', 'fechaEmision')
+            .annotate(total=Count('id'))
+            .values_list('estudiante__codigoOrganizacion', 'curso_id', 'fechaEmision', 'total')
+            .order_by()
+        )
+        for codigo, curso_id, dia, total in certificados:
+            filas[(codigo, curso_id, dia)]['certificados'] += total
+
+        pruebas = (
+            EstudiantePrueba.objects.filter(estudiante__codigoOrganizacion__in=por_codigo)
+            .values('estudiante__codigoOrganizacion', 'prueba__curso_id', 'fechaPrueba')
+            .annotate(total=Count('id'), aprobadas=Count('id', filter=Q(estaAprobado=True)))
+            .values_list('estudiante__codigoOrganizacion', 'prueba__curso_id', 'fechaPrueba', 'total', 'aprobadas')
+            .order_by()
+        )
+        for codigo, curso_id, dia, total, aprobadas in pruebas:
+            filas[(codigo, curso_id, dia)]['pruebas'] += total
+            filas[(codigo, curso_id, dia)]['pruebasAprobadas'] += aprobadas
+
+        progresos = (
+            Progreso.objects.filter(estudiante__codigoOrganizacion__in=por_codigo)
+            .annotate(dia=Coalesce('fechaInicioCurso', TruncDate('estudiante__date_joined')))
+            .values('estudiante__codigoOrganizacion', 'curso_id', 'dia')
+            .annotate(total=Count('id'), suma=Sum('porcentajeCompletado'))
+            .values_list('estudiante__codigoOrganizacion', 'curso_id', 'dia', 'total', 'suma')
+            .order_by()
+        )
+        for codigo, curso_id, dia, total, suma in progresos:
+            filas[(codigo, curso_id, dia)]['progresos'] += total
+            filas[(codigo, curso_id, dia)]['sumaPorcentajes'] += suma or 0
+
+        metricas = []
+        for (codigo, curso_id, dia), medidas in filas.items():
+            if curso_id is None:
+                for instructor_id, (empresa_id, alcance) in instructores_por_codigo[codigo].items():
+                    metricas.append(MetricaDiaria(
+                        empresa_id=empresa_id, instructor_id=instructor_id, codigoOrganizacion=codigo, dia=dia,
+                        alcance=alcance, **medidas,
+                    ))
+                continue
+            empresa_id, instructor_id, inicio, fin = por_curso.get((codigo, curso_id), por_codigo[codigo] + (None, None))
+            metricas.append(MetricaDiaria(
+                empresa_id=empresa_id, instructor_id=instructor_id, curso_id=curso_id,
+                codigoOrganizacion=codigo, dia=dia,
+                fechaInicioCapacitacion=inicio, fechaFinCapacitacion=fin, **medidas,
+            ))
+        anteriores = MetricaDiaria.objects.filter(codigoOrganizacion__in=codigos)
+        empresas = set(anteriores.values_list('empresa_id', flat=True).distinct())
+        anteriores.delete()
+        MetricaDiaria.objects.bulk_create(metricas, batch_size=1000)
+        CacheMetricas.invalidar('MetricaDiaria')
+        RankingInstructores.actualizar(empresas | {
+            empresa_id for instructores in instructores_por_codigo.values() for empresa_id, _ in instructores.values()
+        })
+
+    @staticmethod
+    def totales(grupos, curso_id=None):
+        """
+        Suma las métricas de cada grupo de filas con una sola consulta.
+
+        `grupos` es `{nombre: (Q, alcance)}` sobre `MetricaDiaria`, con el `MetricaDiaria.ALCANCE_*`
+        del filtro (instructor, empresa o código/total), y el resultado `{nombre: {medida: valor}}`
+        con `estudiantes`, `estudiantes_activos`, `certificados`, `pruebas` y `pruebas_aprobadas`.
+        Sin `curso_id` los estudiantes se toman de las filas del código con alcance suficiente y
+        son activos si el código tiene algún contrato vigente hoy dentro del alcance; con
+        `curso_id`, de las filas del curso y según las fechas de su contrato.
+        """
+        hoy = now().date()
+        cursos = Q(curso_id=curso_id) if curso_id else Q(curso__isnull=False)
+        expresiones = {}
+        for indice, (filtro, alcance) in enumerate(grupos.values()):
+            if curso_id:
+                poblacion = Q(curso_id=curso_id)
+                activo = Q(fechaInicioCapacitacion__lte=hoy, fechaFinCapacitacion__gte=hoy)
+            else:
+                poblacion = Q(curso__isnull=True, alcance__gte=alcance)
+                activo = Q(Exists(Contrato.objects.filter(
+                    codigoOrganizacion=OuterRef('codigoOrganizacion'),
+                    fechaInicioCapacitacion__lte=hoy, fechaFinCapacitacion__gte=hoy,
+                    **CONTRATOS_EN_ALCANCE[alcance],
+                )))
+            expresiones.update({
+                f'g{indice}_estudiantes': Sum('estudiantes', filter=filtro & poblacion),
+                f'g{indice}_estudiantes_activos': Sum('estudiantes', filter=filtro & poblacion & activo),
+                f'g{indice}_certificados': Sum('certificados', filter=filtro & cursos),
+                f'g{indice}_pruebas': Sum('pruebas', filter=filtro & cursos),
+                f'g{indice}_pruebas_aprobadas': Sum('pruebasAprobadas', filter=filtro & cursos),
+            })
+        fila = MetricaDiaria.objects.aggregate(**{
+            alias: Coalesce(expresion, 0) for alias, expresion in expresiones.items()
+        })
+        return {
+            nombre: {
+                alias[len(f'g{indice}_'):]: valor
+                for alias, valor in fila.items() if alias.startswith(f'g{indice}_')
+            }
+            for indice, nombre in enumerate(grupos)
+        }
+
+
+class MetricasAgrupadas:
+    """
+    Métricas de `MetricaDiaria` agrupadas por empresa, curso, instructor o código de organización,
+    calculadas con una sola consulta GROUP BY que también devuelve el total de grupos (ventana
+    `COUNT(*) OVER ()`), ordenadas y paginadas en la base de datos.
+    """
+    GRUPOS = {
+        'empresa': ('empresa_id', 'empresa__nombre'),
+        'curso': ('curso_id', 'curso__titulo'),
+        'instructor': ('instructor_id', 'instructor__email'),
+        'codigoOrganizacion': ('codigoOrganizacion', 'codigoOrganizacion'),
+    }
+    METRICAS = ('estudiantes', 'certificados', 'aprobacion', 'progreso_promedio')
+
+    def __init__(self, grupo, metricas=None, ordenar=None, empresa_id=None, curso_id=None):
+        if grupo not in self.GRUPOS:
+            raise ValueError(f"'group_by' debe ser uno de: {', '.join(self.GRUPOS)}.")
+        metricas = list(dict.fromkeys(metricas or self.METRICAS))
+        invalidas = [metrica for metrica in metricas if metrica not in self.METRICAS]
+        if invalidas:
+            raise ValueError(f"Métricas no válidas: {', '.join(invalidas)}. Opciones: {', '.join(self.METRICAS)}.")
+        ordenar = ordenar or f"-{metricas[0]}"
+        if ordenar.lstrip('-') not in (*metricas, 'nombre'):
+            raise ValueError("'ordering' debe ser 'nombre' o una de las métricas solicitadas, con '-' para descendente.")
+        self.grupo = grupo
+        self.metricas = metricas
+        self.ordenar = ordenar
+        self.empresa_id = empresa_id
+        self.curso_id = curso_id
+
+    def _expresiones(self, poblacion):
+        expresiones = {
+            'estudiantes': Coalesce(Sum('estudiantes', filter=poblacion), 0),
+            'certificados': Coalesce(Sum('certificados'), 0),
+            'aprobacion': Coalesce(
+                ExpressionWrapper(
+                    Sum('pruebasAprobadas') * Value(100.0) / NullIf(Sum('pruebas'), 0), output_field=FloatField()
+                ),
+                Value(0.0),
+            ),
+            'progreso_promedio': Coalesce(
+                ExpressionWrapper(Sum('sumaPorcentajes') / NullIf(Sum('progresos'), 0), output_field=FloatField()),
+                Value(0.0),
+            ),
+        }
+        return {metrica: expresiones[metrica] for metrica in self.metricas}
+
+    def consulta(self):
+        campo_id, campo_nombre = self.GRUPOS[self.grupo]
+        filas = MetricaDiaria.objects.all()
+        if self.empresa_id:
+            filas = filas.filter(empresa_id=self.empresa_id)
+        # Los estudiantes se toman de las filas del código con el alcance del grupo, o de las de cada
+        # curso si se agrupa o filtra por curso, igual que en `MetricasDiarias.totales`.
+        if self.grupo == 'instructor':
+            alcance = MetricaDiaria.ALCANCE_INSTRUCTOR
+        elif self.grupo == 'empresa' or self.empresa_id:
+            alcance = MetricaDiaria.ALCANCE_EMPRESA
+        else:
+            alcance = MetricaDiaria.ALCANCE_CODIGO
+        poblacion = Q(curso__isnull=True, alcance__gte=alcance)
+        if self.curso_id:
+            filas = filas.filter(curso_id=self.curso_id)
+            poblacion = Q()
+        elif self.grupo == 'curso':
+            filas = filas.filter(curso__isnull=False)
+            poblacion = Q()
+        descendente = self.ordenar.startswith('-')
+        orden = self.ordenar.lstrip('-')
+        orden = 'grupo_nombre' if orden == 'nombre' else orden
+        return (
+            filas.values(grupo_id=F(campo_id), grupo_nombre=F(campo_nombre))
+            .annotate(**self._expresiones(poblacion))
+            .annotate(total_grupos=Window(Count('*')))
+            .order_by(F(orden).desc() if descendente else F(orden).asc(), 'grupo_id')
+        )
+
+    def pagina(self, numero=1, tamano=TAMANO_PAGINA):
+        """
+        Devuelve `(total_grupos, filas, tamano)` de la página indicada (desde 1), con el tamaño de
+        página efectivamente aplicado (ver `limitar_pagina`).
+        """
+        inicio, tamano = limitar_pagina(numero, tamano)
+        filas = list(self.consulta()[inicio:inicio + tamano])
+        total = filas[0]['total_grupos'] if filas else 0
+        resultados = []
+        for fila in filas:
+            resultado = {'id': fila['grupo_id'], 'nombre': fila['grupo_nombre']}
+            for metrica in self.metricas:
+                valor = fila[metrica]
+                resultado[metrica] = round(valor, 2) if isinstance(valor, float) else valor
+            resultados.append(resultado)
+        return total, resultados, tamano
@@ -0,0 +1,11 @@
+TAMANO_PAGINA = 50
+TAMANO_PAGINA_MAXIMO = 500
+
+
+def limitar_pagina(numero=1, tamano=TAMANO_PAGINA):
+    """
+    Devuelve `(inicio, tamano)` de la página `numero` (desde 1), con el tamaño acotado entre 1 y
+    `TAMANO_PAGINA_MAXIMO`. Lo comparten las consultas paginadas de métricas y del ranking.
+    """
+    tamano = max(1, min(int(tamano), TAMANO_PAGINA_MAXIMO))
+    return (max(1, int(numero)) - 1) * tamano, tamano
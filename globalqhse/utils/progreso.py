@@ -0,0 +1,492 @@
+import logging
+import threading
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import (
+    BooleanField, Case, Count, Exists, ExpressionWrapper, F, FloatField,
+    Max, Min, OuterRef, Q, Subquery, Sum, Value, When,
+)
+from django.db.models.functions import Coalesce, Greatest, Round
+from ..models import (
+    Certificado, EstudianteModulo, EstudiantePrueba, EstudianteSubcurso,
+    EventoAvance, Modulo, Progreso, Subcurso,
+)
+
+from .cache_metricas import CacheMetricas
+from .estructura import EstructuraCurso
+from .eventos import EventosAvance
+from .metricas_diarias import MetricasDiarias
+
+logger = logging.getLogger(__name__)
+
+PESOS_CON_SIMULACION = {'contenido': 0.5, 'simulacion': 0.3, 'prueba': 0.2}
+PESOS_SIN_SIMULACION = {'contenido': 0.8, 'simulacion': 0.0, 'prueba': 0.2}
+TOLERANCIA = 0.01
+
+
+def _como_lista(valores):
+    if isinstance(valores, (int, str)):
+        return [valores]
+    return list(valores)
+
+
+def _conteo(queryset, campo_grupo):
+    """
+    Subconsulta escalar que devuelve el número de filas de `queryset` (0 si no hay).
+    """
+    subconsulta = queryset.order_by().values(campo_grupo).annotate(n=Count('pk')).values('n')
+    return Coalesce(Subquery(subconsulta), Value(0))
+
+
+def _rangos(queryset, lote):
+    """
+    Genera rangos `[desde, hasta)` de claves primarias de tamaño `lote` que cubren el queryset.
+    """
+    limites = queryset.aggregate(minimo=Min('id'), maximo=Max('id'))
+    if limites['minimo'] is None:
+        return
+    for desde in range(limites['minimo'], limites['maximo'] + 1, lote):
+        yield desde, desde + lote
+
+
+def _agrupar_por_curso(claves):
+    estudiantes_por_curso = defaultdict(set)
+    for _, estudiante_id, curso_id in claves:
+        estudiantes_por_curso[curso_id].add(estudiante_id)
+    return estudiantes_por_curso
+
+
+class ProgresoService:
+    """
+    Motor de progreso. Los porcentajes se calculan en la base de datos a partir de los
+    contadores de `EstudianteSubcurso` y `Progreso` (aritmética O(1) por fila), con un
+    número fijo de sentencias UPDATE y sin volver a disparar las señales `post_save`.
+    Los contadores se mueven con `F()` cuando un módulo cambia de estado y se reconcilian
+    desde las tablas de detalle cuando el origen del cambio es desconocido.
+
+    Los cambios de estructura (módulos o subcursos creados o eliminados) se reconcilian en segundo
+    plano con `programar_reconciliacion`, para no recorrer a todos los inscritos dentro de la petición.
+    """
+    _executor = None
+    _lock = threading.Lock()
+    _reconciliaciones_pendientes = set()
+
+    @staticmethod
+    def porcentaje(completados, totales):
+        if totales <= 0:
+            return 0.0
+        porcentaje = round(completados / totales * 100, 2)
+        return 100.0 if porcentaje >= 99 else porcentaje
+
+    @classmethod
+    def _porcentaje_subcurso(cls):
+        return Case(
+            When(modulos_totales__gt=0, then=Round(Value(100.0) * F('modulos_completados') / F('modulos_totales'), 2)),
+            default=Value(0.0),
+            output_field=FloatField(),
+        )
+
+    @classmethod
+    def _porcentaje_curso(cls, pesos):
+        aprobado = Exists(
+            EstudiantePrueba.objects.filter(
+                estudiante_id=OuterRef('estudiante_id'),
+                prueba__curso_id=OuterRef('curso_id'),
+                estaAprobado=True,
+            )
+        )
+        contenido = F('suma_porcentajes_subcursos') / Greatest(F('subcursos_totales'), Value(1))
+        porcentaje_prueba = Case(When(aprobado, then=Value(100.0)), default=Value(0.0))
+        porcentaje_simulacion = Case(When(simulacionCompletada=True, then=Value(100.0)), default=Value(0.0))
+        return Round(
+            contenido * Value(pesos['contenido'])
+            + porcentaje_simulacion * Value(pesos['simulacion'])
+            + porcentaje_prueba * Value(pesos['prueba']),
+            2,
+            output_field=FloatField(),
+        )
+
+    @classmethod
+    def _normalizar(cls, queryset):
+        """
+        Aplica el redondeo a 100 (>= 99) y sincroniza `completado` en una sola sentencia.
+        """
+        return queryset.update(
+            completado=ExpressionWrapper(Q(porcentajeCompletado__gte=99), output_field=BooleanField()),
+            porcentajeCompletado=Case(
+                When(porcentajeCompletado__gte=99, then=Value(100.0)),
+                default=F('porcentajeCompletado'),
+                output_field=FloatField(),
+            ),
+        )
+
+    @classmethod
+    def recalcular_subcursos(cls, estudiante_ids, subcurso_ids):
+        """
+        Recalcula `EstudianteSubcurso.porcentajeCompletado` desde sus contadores para todas
+        las combinaciones de estudiantes y subcursos indicadas. Devuelve el número de filas actualizadas.
+        """
+        filas = EstudianteSubcurso.objects.filter(
+            estudiante_id__in=_como_lista(estudiante_ids),
+            subcurso_id__in=_como_lista(subcurso_ids),
+        )
+        actualizadas = filas.update(porcentajeCompletado=cls._porcentaje_subcurso())
+        if actualizadas:
+            cls._normalizar(filas)
+        return actualizadas
+
+    @classmethod
+    def recalcular_progresos(cls, estudiante_ids, curso_ids, emitir_certificados=True):
+        """
+        Recalcula `Progreso.porcentajeCompletado`, `contenidoCompletado` y `completado` desde
+        sus contadores para las combinaciones indicadas y emite los certificados que queden
+        pendientes. Devuelve el número de filas actualizadas.
+        """
+        estudiante_ids = _como_lista(estudiante_ids)
+        curso_ids = _como_lista(curso_ids)
+        filas = Progreso.objects.filter(estudiante_id__in=estudiante_ids, curso_id__in=curso_ids)
+
+        # Los pesos dependen de si el curso tiene simulación, que se toma de la estructura cacheada.
+        estructuras = EstructuraCurso.obtener_varios(curso_ids)
+        con_simulacion = [curso_id for curso_id, estructura in estructuras.items() if estructura['simulacion']]
+        sin_simulacion = [curso_id for curso_id, estructura in estructuras.items() if not estructura['simulacion']]
+        actualizadas = 0
+        for cursos, pesos in ((con_simulacion, PESOS_CON_SIMULACION), (sin_simulacion, PESOS_SIN_SIMULACION)):
+            if not cursos:
+                continue
+            actualizadas += filas.filter(curso_id__in=cursos).update(
+                porcentajeCompletado=cls._porcentaje_curso(pesos),
+                contenidoCompletado=ExpressionWrapper(
+                    Q(subcursos_totales__gt=0, subcursos_completados__gte=F('subcursos_totales')),
+                    output_field=BooleanField(),
+                ),
+            )
+        if actualizadas:
+            cls._normalizar(filas)
+            CacheMetricas.invalidar('Progreso')
+            MetricasDiarias.marcar_estudiantes(estudiante_ids)
+            if emitir_certificados:
+                cls.emitir_certificados_pendientes(estudiante_ids, curso_ids)
+        return actualizadas
+
+    @classmethod
+    def _contadores_subcurso(cls):
+        return {
+            'modulos_totales': _conteo(Modulo.objects.filter(subcurso_id=OuterRef('subcurso_id')), 'subcurso_id'),
+            'modulos_completados': _conteo(
+                EstudianteModulo.objects.filter(
+                    estudiante_id=OuterRef('estudiante_id'),
+                    modulo__subcurso_id=OuterRef('subcurso_id'),
+                    completado=True,
+                ),
+                'estudiante_id',
+            ),
+        }
+
+    @classmethod
+    def _contadores_progreso(cls):
+        estudiante_subcursos = EstudianteSubcurso.objects.filter(
+            estudiante_id=OuterRef('estudiante_id'),
+            subcurso__curso_id=OuterRef('curso_id'),
+        ).order_by().values('estudiante_id')
+        return {
+            'subcursos_totales': _conteo(Subcurso.objects.filter(curso_id=OuterRef('curso_id')), 'curso_id'),
+            'subcursos_completados': _conteo(estudiante_subcursos.filter(completado=True), 'estudiante_id'),
+            'suma_porcentajes_subcursos': Coalesce(
+                Subquery(estudiante_subcursos.annotate(s=Sum('porcentajeCompletado')).values('s')),
+                Value(0.0),
+            ),
+        }
+
+    @classmethod
+    def reconciliar_subcursos(cls, estudiante_ids, subcurso_ids):
+        """
+        Vuelve a contar los módulos de los subcursos indicados y recalcula sus porcentajes.
+        Devuelve el número de filas actualizadas.
+        """
+        filas = EstudianteSubcurso.objects.filter(
+            estudiante_id__in=_como_lista(estudiante_ids),
+            subcurso_id__in=_como_lista(subcurso_ids),
+        )
+        actualizadas = filas.update(**cls._contadores_subcurso())
+        if actualizadas:
+            cls.recalcular_subcursos(estudiante_ids, subcurso_ids)
+        return actualizadas
+
+    @classmethod
+    def reconciliar_progresos(cls, estudiante_ids, curso_ids):
+        """
+        Vuelve a agregar los subcursos de los cursos indicados y recalcula sus porcentajes.
+        Devuelve el número de filas actualizadas.
+        """
+        filas = Progreso.objects.filter(
+            estudiante_id__in=_como_lista(estudiante_ids),
+            curso_id__in=_como_lista(curso_ids),
+        )
+        actualizadas = filas.update(**cls._contadores_progreso())
+        if actualizadas:
+            cls.recalcular_progresos(estudiante_ids, curso_ids)
+        return actualizadas
+
+    @classmethod
+    def reconciliar_estructura(cls, curso_id, subcurso_id=None):
+        """
+        Reconcilia los contadores de todos los estudiantes tras un cambio en la estructura del curso
+        (módulos o subcursos creados o eliminados). Los totales se toman de `EstructuraCurso`;
+        solo los completados se cuentan en la base de datos.
+        """
+        estructura = EstructuraCurso.obtener(curso_id)
+        if estructura is None:
+            return
+        if subcurso_id is not None and subcurso_id in estructura['subcursos']:
+            filas = EstudianteSubcurso.objects.filter(subcurso_id=subcurso_id)
+            if filas.update(**{**cls._contadores_subcurso(), 'modulos_totales': estructura['subcursos'][subcurso_id]}):
+                filas.update(porcentajeCompletado=cls._porcentaje_subcurso())
+                cls._normalizar(filas)
+
+        progresos = Progreso.objects.filter(curso_id=curso_id)
+        if progresos.update(**{**cls._contadores_progreso(), 'subcursos_totales': len(estructura['subcursos'])}):
+            cls.recalcular_progresos(progresos.values_list('estudiante_id', flat=True), curso_id)
+
+    @classmethod
+    def programar_reconciliacion(cls, curso_id, subcurso_id=None):
+        """
+        Programa `reconciliar_estructura` al confirmar la transacción. Las solicitudes repetidas
+        de un mismo curso y subcurso se agrupan.
+        """
+        transaction.on_commit(lambda: cls._encolar_reconciliacion(curso_id, subcurso_id))
+
+    @classmethod
+    def _encolar_reconciliacion(cls, curso_id, subcurso_id):
+        workers = getattr(settings, 'RECONCILIACION_WORKERS', 1)
+        if workers <= 0:
+            cls.reconciliar_estructura(curso_id, subcurso_id)
+            return
+        clave = (curso_id, subcurso_id)
+        with cls._lock:
+            if clave in cls._reconciliaciones_pendientes:
+                return
+            cls._reconciliaciones_pendientes.add(clave)
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='reconciliacion')
+        cls._executor.submit(cls._reconciliar_en_hilo, curso_id, subcurso_id)
+
+    @classmethod
+    def _reconciliar_en_hilo(cls, curso_id, subcurso_id):
+        with cls._lock:
+            cls._reconciliaciones_pendientes.discard((curso_id, subcurso_id))
+        try:
+            cls.reconciliar_estructura(curso_id, subcurso_id)
+        except Exception:
+            logger.exception("Error al reconciliar la estructura del curso %s", curso_id)
+        finally:
+            close_old_connections()
+
+    @classmethod
+    def reparar_contadores(cls, curso_id=None, lote=5000):
+        """
+        Corrige en bloque los contadores que se hayan desviado de las tablas de detalle,
+        recorriendo las filas por rangos de clave primaria. Devuelve el número de filas
+        de subcursos y de progresos corregidas.
+        """
+        subcursos = EstudianteSubcurso.objects.all()
+        progresos = Progreso.objects.all()
+        if curso_id is not None:
+            subcursos = subcursos.filter(subcurso__curso_id=curso_id)
+            progresos = progresos.filter(curso_id=curso_id)
+
+        subcursos_corregidos = 0
+        for desde, hasta in _rangos(subcursos, lote):
+            with transaction.atomic():
+                contadores = cls._contadores_subcurso()
+                desviados = subcursos.filter(id__gte=desde, id__lt=hasta).annotate(
+                    **{f'{campo}_real': expresion for campo, expresion in contadores.items()}
+                ).filter(
+                    ~Q(modulos_totales=F('modulos_totales_real')) | ~Q(modulos_completados=F('modulos_completados_real'))
+                )
+                ids = list(desviados.values_list('id', flat=True))
+                if ids:
+                    EstudianteSubcurso.objects.filter(id__in=ids).update(**contadores)
+                    filas = EstudianteSubcurso.objects.filter(id__in=ids)
+                    filas.update(porcentajeCompletado=cls._porcentaje_subcurso())
+                    cls._normalizar(filas)
+                    subcursos_corregidos += len(ids)
+
+        progresos_corregidos = 0
+        for desde, hasta in _rangos(progresos, lote):
+            with transaction.atomic():
+                filas = progresos.filter(id__gte=desde, id__lt=hasta)
+                contadores = cls._contadores_progreso()
+                desviados = filas.annotate(
+                    **{f'{campo}_real': expresion for campo, expresion in contadores.items()}
+                ).filter(
+                    ~Q(subcursos_totales=F('subcursos_totales_real'))
+                    | ~Q(subcursos_completados=F('subcursos_completados_real'))
+                    | Q(suma_porcentajes_subcursos__lt=F('suma_porcentajes_subcursos_real') - TOLERANCIA)
+                    | Q(suma_porcentajes_subcursos__gt=F('suma_porcentajes_subcursos_real') + TOLERANCIA)
+                )
+                claves = list(desviados.values_list('id', 'estudiante_id', 'curso_id'))
+                if claves:
+                    Progreso.objects.filter(id__in=[clave[0] for clave in claves]).update(**contadores)
+                    for curso, estudiantes in _agrupar_por_curso(claves).items():
+                        cls.recalcular_progresos(estudiantes, curso)
+                    progresos_corregidos += len(claves)
+
+        return subcursos_corregidos, progresos_corregidos
+
+    @classmethod
+    def emitir_certificados_pendientes(cls, estudiante_ids, curso_ids):
+        """
+        Encola los certificados de los progresos completados que aún no lo tienen. Esos progresos
+        son los que se acaban de completar, así que se registran también como eventos de curso.
+        """
+        from .cola_certificados import ColaCertificados
+
+        pendientes = list(Progreso.objects.filter(
+            estudiante_id__in=_como_lista(estudiante_ids),
+            curso_id__in=_como_lista(curso_ids),
+            completado=True,
+        ).filter(
+            ~Exists(Certificado.objects.filter(estudiante_id=OuterRef('estudiante_id'), curso_id=OuterRef('curso_id')))
+        ).values_list('estudiante_id', 'curso_id'))
+        EventosAvance.registrar(
+            EventoAvance.CURSO, [(estudiante_id, curso_id, None) for estudiante_id, curso_id in pendientes]
+        )
+        ColaCertificados.encolar(pendientes)
+
+    @classmethod
+    def propagar_modulo(cls, estudiante_id, subcurso_id, curso_id):
+        """
+        Propaga a su subcurso y a su curso el cambio de un módulo cuyo estado anterior no se conoce
+        (por ejemplo, un `save()` directo), reconciliando los contadores de esas dos filas.
+        Crea los registros intermedios si aún no existen. En modo diferido el
+        recálculo del curso se encola en lugar de ejecutarse en la petición.
+        """
+        from .cola_progreso import ColaProgreso
+
+        if not cls.reconciliar_subcursos(estudiante_id, subcurso_id):
+            EstudianteSubcurso.objects.get_or_create(estudiante_id=estudiante_id, subcurso_id=subcurso_id)
+            cls.reconciliar_subcursos(estudiante_id, subcurso_id)
+
+        if ColaProgreso.modo_diferido():
+            ColaProgreso.encolar([(estudiante_id, curso_id)])
+            return
+
+        if not cls.reconciliar_progresos(estudiante_id, curso_id):
+            Progreso.objects.get_or_create(estudiante_id=estudiante_id, curso_id=curso_id)
+            cls.reconciliar_progresos(estudiante_id, curso_id)
+
+    @classmethod
+    def _aplicar_delta_modulo(cls, estudiante_id, subcurso_id, curso_id, delta):
+        """
+        Mueve los contadores del subcurso y del curso en `delta` módulos con actualizaciones `F()`.
+        """
+        from .cola_progreso import ColaProgreso
+
+        estudiante_subcurso = EstudianteSubcurso.objects.select_for_update().filter(
+            estudiante_id=estudiante_id, subcurso_id=subcurso_id
+        ).values('id', 'modulos_completados', 'modulos_totales', 'porcentajeCompletado', 'completado').first()
+        if estudiante_subcurso is None:
+            cls.propagar_modulo(estudiante_id, subcurso_id, curso_id)
+            return
+
+        porcentaje = cls.porcentaje(estudiante_subcurso['modulos_completados'] + delta, estudiante_subcurso['modulos_totales'])
+        EstudianteSubcurso.objects.filter(id=estudiante_subcurso['id']).update(
+            modulos_completados=F('modulos_completados') + delta,
+            porcentajeCompletado=porcentaje,
+            completado=porcentaje == 100,
+        )
+
+        delta_completados = int(porcentaje == 100) - int(estudiante_subcurso['completado'])
+        delta_porcentaje = porcentaje - estudiante_subcurso['porcentajeCompletado']
+        if not delta_completados and not delta_porcentaje:
+            return
+        Progreso.objects.filter(estudiante_id=estudiante_id, curso_id=curso_id).update(
+            subcursos_completados=F('subcursos_completados') + delta_completados,
+            suma_porcentajes_subcursos=F('suma_porcentajes_subcursos') + delta_porcentaje,
+        )
+        if ColaProgreso.modo_diferido():
+            ColaProgreso.encolar([(estudiante_id, curso_id)])
+        else:
+            cls.recalcular_progresos(estudiante_id, curso_id)
+
+    @classmethod
+    def actualizar_modulo(cls, estudiante_id, modulo_id, completado):
+        """
+        Cambia el estado de un módulo y propaga el cambio solo si el valor cambió.
+        Devuelve True si hubo cambio.
+        """
+        with transaction.atomic():
+            cambiados = EstudianteModulo.objects.filter(
+                estudiante_id=estudiante_id, modulo_id=modulo_id
+            ).exclude(completado=completado).update(completado=completado)
+            if not cambiados:
+                return False
+
+            modulo = Modulo.objects.select_related('subcurso').get(id=modulo_id)
+            if modulo.subcurso:
+                cls._aplicar_delta_modulo(
+                    estudiante_id, modulo.subcurso_id, modulo.subcurso.curso_id, 1 if completado else -1
+                )
+                if completado:
+                    EventosAvance.registrar(EventoAvance.MODULO, [(estudiante_id, modulo.subcurso.curso_id, modulo_id)])
+        return True
+
+    @classmethod
+    def actualizar_modulos(cls, cambios):
+        """
+        Aplica en una sola transacción una lista de cambios `(estudiante_id, modulo_id, completado)`
+        y recalcula una única vez cada subcurso y curso afectado.
+        Devuelve un diccionario con los registros no encontrados y los porcentajes resultantes.
+        """
+        solicitados = {(estudiante_id, modulo_id): completado for estudiante_id, modulo_id, completado in cambios}
+        estudiante_ids = {estudiante_id for estudiante_id, _ in solicitados}
+        modulo_ids = {modulo_id for _, modulo_id in solicitados}
+
+        with transaction.atomic():
+            registros = [
+                registro for registro in EstudianteModulo.objects.select_for_update().filter(
+                    estudiante_id__in=estudiante_ids, modulo_id__in=modulo_ids
+                ).select_related('modulo__subcurso')
+                if (registro.estudiante_id, registro.modulo_id) in solicitados
+            ]
+
+            modificados = []
+            for registro in registros:
+                completado = solicitados[(registro.estudiante_id, registro.modulo_id)]
+                if registro.completado != completado:
+                    registro.completado = completado
+                    modificados.append(registro)
+            EstudianteModulo.objects.bulk_update(modificados, ['completado'], batch_size=500)
+
+            afectados_estudiantes = {registro.estudiante_id for registro in registros if registro.modulo.subcurso_id}
+            subcurso_ids = {registro.modulo.subcurso_id for registro in registros if registro.modulo.subcurso_id}
+            curso_ids = {registro.modulo.subcurso.curso_id for registro in registros if registro.modulo.subcurso_id}
+            if modificados:
+                cls.reconciliar_subcursos(afectados_estudiantes, subcurso_ids)
+                cls.reconciliar_progresos(afectados_estudiantes, curso_ids)
+                EventosAvance.registrar(EventoAvance.MODULO, [
+                    (registro.estudiante_id, registro.modulo.subcurso.curso_id, registro.modulo_id)
+                    for registro in modificados if registro.completado and registro.modulo.subcurso_id
+                ])
+
+        encontrados = {(registro.estudiante_id, registro.modulo_id) for registro in registros}
+        return {
+            "actualizados": len(modificados),
+            "no_encontrados": [
+                {"estudiante_id": estudiante_id, "modulo_id": modulo_id}
+                for estudiante_id, modulo_id in solicitados if (estudiante_id, modulo_id) not in encontrados
+            ],
+            "subcursos": list(
+                EstudianteSubcurso.objects.filter(
+                    estudiante_id__in=afectados_estudiantes, subcurso_id__in=subcurso_ids
+                ).values('estudiante_id', 'subcurso_id', 'porcentajeCompletado', 'completado')
+            ),
+            "progresos": list(
+                Progreso.objects.filter(
+                    estudiante_id__in=afectados_estudiantes, curso_id__in=curso_ids
+                ).values('estudiante_id', 'curso_id', 'porcentajeCompletado', 'completado')
+            ),
+        }
@@ -0,0 +1,202 @@
+from collections import defaultdict
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum, Window
+from ..models import Empresa, Instructor, MetricaDiaria, RankingInstructor
+from .cache_metricas import CacheMetricas
+from .paginacion import TAMANO_PAGINA, limitar_pagina
+
+MEDIDAS = ('estudiantes', 'certificados', 'pruebas', 'pruebasAprobadas', 'progresos', 'sumaPorcentajes')
+
+
+def _porcentaje(parte, total):
+    return round(parte / total * 100, 2) if total else 0.0
+
+
+class RankingInstructores:
+    """
+    Mantiene la tabla `RankingInstructor` y la consulta.
+
+    Al recalcular las métricas diarias de unos códigos se actualizan las filas de las empresas
+    afectadas con una consulta agrupada por instructor sobre `MetricaDiaria`; después se vuelven a
+    numerar las posiciones, que se guardan solo si cambiaron. Una página del ranking o la
+    comparación de un instructor con su empresa se leen con una sola consulta.
+    """
+    METRICAS = {
+        'certificacion': 'tasaCertificacion',
+        'aprobacion': 'tasaAprobacion',
+        'progreso': 'progresoPromedio',
+    }
+
+    @staticmethod
+    def _tasas(medidas):
+        return {
+            'tasaCertificacion': _porcentaje(medidas['certificados'], medidas['estudiantes']),
+            'tasaAprobacion': _porcentaje(medidas['pruebasAprobadas'], medidas['pruebas']),
+            'progresoPromedio': round(medidas['sumaPorcentajes'] / medidas['progresos'], 2) if medidas['progresos'] else 0.0,
+        }
+
+    @classmethod
+    def actualizar(cls, empresa_ids):
+        """
+        Recalcula las cifras de los instructores y los totales de las empresas indicadas que sigan existiendo.
+        """
+        empresa_ids = set(
+            Empresa.objects.filter(id__in=[empresa_id for empresa_id in empresa_ids if empresa_id])
+            .values_list('id', flat=True)
+        )
+        if not empresa_ids:
+            return
+        sumas = (
+            MetricaDiaria.objects.filter(empresa_id__in=empresa_ids)
+            .values('instructor_id')
+            .annotate(
+                estudiantesEmpresa=Sum(
+                    'estudiantes', filter=Q(curso__isnull=True, alcance__gte=MetricaDiaria.ALCANCE_EMPRESA)
+                ),
+                estudiantes=Sum('estudiantes', filter=Q(curso__isnull=True)),
+                certificados=Sum('certificados', filter=Q(curso__isnull=False)),
+                pruebas=Sum('pruebas', filter=Q(curso__isnull=False)),
+                pruebasAprobadas=Sum('pruebasAprobadas', filter=Q(curso__isnull=False)),
+                progresos=Sum('progresos', filter=Q(curso__isnull=False)),
+                sumaPorcentajes=Sum('sumaPorcentajes', filter=Q(curso__isnull=False)),
+            )
+            .order_by()
+        )
+        por_instructor = {
+            fila['instructor_id']: {medida: fila[medida] or 0 for medida in (*MEDIDAS, 'estudiantesEmpresa')}
+            for fila in sumas
+        }
+        instructores = Instructor.objects.filter(empresa_id__in=empresa_ids).values_list('id', 'empresa_id')
+
+        filas = []
+        por_empresa = defaultdict(lambda: dict.fromkeys(MEDIDAS, 0))
+        cantidad = defaultdict(int)
+        for instructor_id, empresa_id in instructores:
+            medidas = por_instructor.get(instructor_id, dict.fromkeys((*MEDIDAS, 'estudiantesEmpresa'), 0))
+            for medida in MEDIDAS[1:]:
+                por_empresa[empresa_id][medida] += medidas[medida]
+            # Los estudiantes de un código compartido por varios instructores de la empresa se cuentan una vez.
+            por_empresa[empresa_id]['estudiantes'] += medidas['estudiantesEmpresa']
+            cantidad[empresa_id] += 1
+            filas.append(cls._fila(medidas, empresa_id=empresa_id, instructor_id=instructor_id, instructores=1))
+        for empresa_id in empresa_ids:
+            filas.append(cls._fila(por_empresa[empresa_id], empresa_id=empresa_id, instructores=cantidad[empresa_id]))
+
+        with transaction.atomic():
+            RankingInstructor.objects.filter(
+                Q(empresa_id__in=empresa_ids) | Q(instructor__empresa_id__in=empresa_ids)
+            ).delete()
+            RankingInstructor.objects.bulk_create(filas, batch_size=1000)
+            cls.numerar()
+        CacheMetricas.invalidar('RankingInstructor')
+
+    @classmethod
+    def _fila(cls, medidas, **campos):
+        return RankingInstructor(
+            estudiantes=medidas['estudiantes'],
+            certificados=medidas['certificados'],
+            pruebas=medidas['pruebas'],
+            pruebasAprobadas=medidas['pruebasAprobadas'],
+            **cls._tasas(medidas),
+            **campos,
+        )
+
+    @staticmethod
+    def _posiciones(filas, campo):
+        """
+        Posiciones con empates (1, 2, 2, 4) de `filas` ordenadas de mayor a menor por `campo`.
+        """
+        posiciones = {}
+        anterior = None
+        for indice, fila in enumerate(sorted(filas, key=lambda fila: (-fila[campo], fila['id'])), start=1):
+            if fila[campo] != anterior:
+                posicion, anterior = indice, fila[campo]
+            posiciones[fila['id']] = posicion
+        return posiciones
+
+    @classmethod
+    def numerar(cls):
+        """
+        Vuelve a calcular las posiciones dentro de cada empresa y en la plataforma, y guarda las que cambiaron.
+        """
+        columnas = ['id', 'empresa_id', 'instructor_id', *cls.METRICAS.values()]
+        posiciones = [
+            'posicionEmpresaCertificacion', 'posicionEmpresaAprobacion', 'posicionEmpresaProgreso',
+            'posicionCertificacion', 'posicionAprobacion', 'posicionProgreso',
+        ]
+        filas = list(RankingInstructor.objects.values(*columnas, *posiciones))
+        instructores = [fila for fila in filas if fila['instructor_id']]
+        empresas = [fila for fila in filas if not fila['instructor_id']]
+        por_empresa = defaultdict(list)
+        for fila in instructores:
+            por_empresa[fila['empresa_id']].append(fila)
+
+        nuevas = {fila['id']: dict.fromkeys(posiciones) for fila in filas}
+        for metrica, campo in cls.METRICAS.items():
+            sufijo = metrica.capitalize()
+            for grupo in (instructores, empresas):
+                for fila_id, posicion in cls._posiciones(grupo, campo).items():
+                    nuevas[fila_id][f'posicion{sufijo}'] = posicion
+            for grupo in por_empresa.values():
+                for fila_id, posicion in cls._posiciones(grupo, campo).items():
+                    nuevas[fila_id][f'posicionEmpresa{sufijo}'] = posicion
+
+        cambiadas = [
+            RankingInstructor(id=fila['id'], **nuevas[fila['id']])
+            for fila in filas if any(fila[campo] != nuevas[fila['id']][campo] for campo in posiciones)
+        ]
+        RankingInstructor.objects.bulk_update(cambiadas, posiciones, batch_size=500)
+        return len(cambiadas)
+
+    @classmethod
+    def reconstruir(cls):
+        """
+        Recalcula el ranking de todas las empresas con instructores o métricas.
+        """
+        empresa_ids = set(Instructor.objects.values_list('empresa_id', flat=True))
+        with transaction.atomic():
+            RankingInstructor.objects.exclude(empresa_id__in=empresa_ids).delete()
+            cls.actualizar(empresa_ids)
+        return len(empresa_ids)
+
+    @classmethod
+    def pagina(cls, metrica='certificacion', empresa_id=None, numero=1, tamano=TAMANO_PAGINA):
+        """
+        Devuelve `(total, filas, tamano)` de una página del ranking de instructores, de una empresa o
+        de toda la plataforma, ordenado por la posición en la métrica indicada. `tamano` es el tamaño
+        de página efectivamente aplicado (ver `limitar_pagina`).
+        """
+        if metrica not in cls.METRICAS:
+            raise ValueError(f"Métrica inválida. Opciones: {', '.join(cls.METRICAS)}.")
+        sufijo = metrica.capitalize()
+        posicion = f'posicionEmpresa{sufijo}' if empresa_id else f'posicion{sufijo}'
+        filas = RankingInstructor.objects.filter(instructor__isnull=False)
+        if empresa_id:
+            filas = filas.filter(empresa_id=empresa_id)
+        inicio, tamano = limitar_pagina(numero, tamano)
+        filas = list(
+            filas.annotate(posicion=F(posicion), total=Window(Count('*')))
+            .order_by('posicion', 'instructor_id')
+            .values(
+                'posicion', 'total', 'instructor_id', 'empresa_id', 'estudiantes', 'certificados', 'pruebas',
+                'pruebasAprobadas', *cls.METRICAS.values(),
+                email=F('instructor__email'), empresa_nombre=F('empresa__nombre'),
+            )[inicio:inicio + tamano]
+        )
+        total = filas[0]['total'] if filas else 0
+        for fila in filas:
+            del fila['total']
+        return total, filas, tamano
+
+    @classmethod
+    def comparacion(cls, instructor_id):
+        """
+        Devuelve `(fila_instructor, fila_empresa)` del instructor, o `(None, None)` si no está en el ranking.
+        """
+        filas = {
+            fila.instructor_id: fila
+            for fila in RankingInstructor.objects.filter(
+                Q(instructor_id=instructor_id) | Q(instructor__isnull=True, empresa__instructores__id=instructor_id)
+            ).select_related('empresa', 'instructor')
+        }
+        return filas.get(int(instructor_id)), filas.get(None)
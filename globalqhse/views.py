@@ -16,7 +16,7 @@ from django.db import IntegrityError
 from drf_yasg import openapi
 from rest_framework import generics
 from django.db import transaction
-from django.db.models import Avg
+from django.db.models import Avg, Count
 from django.utils.timezone import now
 from django.db.models import Q
 from django.utils.dateparse import parse_date			 
@@ -24,24 +24,119 @@ from django.db import models
 from django_filters.rest_framework import DjangoFilterBackend
 from datetime import date
 from django.db.models import Q
+import csv
 import random
 import string
 import logging
 from .models import (
     Usuario, Administrador, Instructor, Estudiante,
-    Curso, Subcurso, Modulo, Empresa, Contrato,Progreso,Certificado,EstudiantePrueba, Prueba, Pregunta,EstudianteModulo,EstudianteSubcurso
+    Curso, Subcurso, Modulo, Empresa, Contrato,Progreso,Certificado,EstudiantePrueba, Prueba, Pregunta,EstudianteModulo,EstudianteSubcurso,
+    TareaEliminacion, EventoAvance, MetricaDiaria
 )
 from .serializers import (
     UsuarioSerializer, AdministradorSerializer, InstructorSerializer, EstudianteSerializer,
     CursoSerializer, AdministradorDetailSerializer, InstructorDetailSerializer,
     EstudianteDetailSerializer, LoginResponseSerializer, EstudiantePruebaSerializer,  PruebaSerializer, PreguntaSerializer,PruebaConPreguntasSerializer,PreguntaParaPruebaExistenteSerializer,EstudianteModuloSerializer,EstudianteSubcursoSerializer,
-    SubcursoSerializer, ModuloSerializer, EmpresaSerializer,RegisterInstructorSerializer,ContratoSerializer,ProgresoSerializer
+    SubcursoSerializer, ModuloSerializer, EmpresaSerializer,RegisterInstructorSerializer,ContratoSerializer,ProgresoSerializer,
+    TareaEliminacionSerializer
 )
 from .utils.email import EmailService
-from django.http import FileResponse, Http404, HttpResponse
+from .utils.progreso import ProgresoService
+from .utils.cola_progreso import ColaProgreso
+from .utils.inscripcion import InscripcionService
+from .utils.importacion import ImportacionEstudiantes
+from .utils.cascada import CascadaInscripciones
+from .utils.estructura import EstructuraCurso
+from .utils.emision_masiva import EmisionMasivaCertificados
+from .utils.descargas import servir_archivo
+from .utils.exportacion import ExportacionCertificados, ExportacionNomina
+from .utils.metricas import DistribucionProgreso, MetricasDashboard, contar_consultas
+from .utils.metricas_diarias import MetricasAgrupadas, MetricasDiarias
+from .utils.cache_metricas import CacheMetricas, cachear_metricas
+from .utils.eventos import EventosAvance
+from .utils.paginacion import TAMANO_PAGINA, TAMANO_PAGINA_MAXIMO
+from .utils.ranking import RankingInstructores
+from .utils.dashboard import DashboardEstudiante
+from django.http import FileResponse, Http404, StreamingHttpResponse
+from django.utils.text import get_valid_filename
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.conf import settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 
 logger = logging.getLogger(__name__)
 
+
+def _es_asincrono(request):
+    return str(request.data.get('asincrono', '')).lower() in ('true', '1')
+
+
+def _error_no_numericos(parametros, nombres):
+    """
+    Respuesta 400 si alguno de los parámetros indicados viene y no es numérico; None si son válidos.
+    """
+    if any(parametros.get(nombre) and not parametros.get(nombre).isdigit() for nombre in nombres):
+        return Response(
+            {"error": f"Los parámetros {', '.join(nombres)} deben ser numéricos."},
+            status=status.HTTP_400_BAD_REQUEST,
+        )
+    return None
+
+
+def _pagina_solicitada(parametros):
+    """
+    Número y tamaño de página pedidos en `page` y `page_size` (ya validados como numéricos).
+    """
+    return int(parametros.get('page') or 1), int(parametros.get('page_size') or TAMANO_PAGINA)
+
+
+def _respuesta_paginada(request, numero, tamano, total, resultados):
+    """
+    Respuesta con el formato de la paginación de DRF (`count`, `next`, `previous`, `results`); los
+    enlaces se calculan con el tamaño de página aplicado por `limitar_pagina`.
+    """
+    if numero > 1 and not resultados:
+        return Response({"error": "Página inválida."}, status=status.HTTP_404_NOT_FOUND)
+    url = request.build_absolute_uri()
+    siguiente = replace_query_param(url, 'page', numero + 1) if numero * tamano < total else None
+    anterior = None
+    if numero > 1:
+        anterior = replace_query_param(url, 'page', numero - 1) if numero > 2 else remove_query_param(url, 'page')
+    return Response({
+        "count": total,
+        "next": siguiente,
+        "previous": anterior,
+        "results": resultados,
+    }, status=status.HTTP_200_OK)
+
+
+def _respuesta_cascada(tarea, mensaje):
+    """
+    Respuesta común de las operaciones por lotes sobre inscripciones: 200 con el resultado si la
+    tarea terminó en la petición, 202 con la tarea si sigue en segundo plano.
+    """
+    datos = {"message": mensaje, "tarea_id": tarea.id, "estado": tarea.estado, "procesados": tarea.procesados}
+    if tarea.estado == 'fallida':
+        return Response({"error": f"Ocurrió un error: {tarea.error}", "tarea_id": tarea.id}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+    if tarea.estado == 'completada':
+        return Response(datos, status=status.HTTP_200_OK)
+    return Response(datos, status=status.HTTP_202_ACCEPTED)
+
+
+def _codigos_del_instructor(usuario, codigo_organizacion=None, curso_id=None):
+    """
+    Códigos de organización sobre los que un instructor puede operar (los de sus contratos,
+    filtrados por el código y el curso pedidos); None para un administrador, que no tiene restricción.
+    """
+    if usuario.rol != 'instructor':
+        return None
+    contratos = Contrato.objects.filter(instructor_id=usuario.id)
+    if codigo_organizacion:
+        contratos = contratos.filter(codigoOrganizacion=codigo_organizacion)
+    if curso_id:
+        contratos = contratos.filter(curso_id=curso_id)
+    return set(contratos.values_list('codigoOrganizacion', flat=True))
+
+
 class EmpresaViewSet(viewsets.ModelViewSet):
     authentication_classes = [JWTAuthentication]
     queryset = Empresa.objects.all()
@@ -176,6 +271,7 @@ class VRLoginView(APIView):
                         )
 
                     
+                    ColaProgreso.vaciar(estudiante.id, curso_id)
                     progreso = Progreso.objects.filter(
                         estudiante=estudiante,
                         curso_id=curso_id,
@@ -222,11 +318,13 @@ class EliminarContratosAPIView(APIView):
             type=openapi.TYPE_OBJECT,
             properties={
                 'codigoOrganizacion': openapi.Schema(type=openapi.TYPE_STRING, description="Código de organización"),
+                'asincrono': openapi.Schema(type=openapi.TYPE_BOOLEAN, description="Elimina las inscripciones en segundo plano y responde 202 con la tarea (opcional)"),
             },
             required=['codigoOrganizacion']
         ),
         responses={
             200: "Contratos eliminados exitosamente.",
+            202: "Eliminación de inscripciones en curso; consulte el avance en /api/tareas-eliminacion/<id>/.",
             400: "Error en los datos enviados.",
             500: "Error interno del servidor.",
         }
@@ -246,24 +344,14 @@ class EliminarContratosAPIView(APIView):
                                     status=status.HTTP_404_NOT_FOUND)
  
                 
-                cursos_ids = contratos.values_list('curso_id', flat=True)
- 
-                
-                estudiantes = Estudiante.objects.filter(codigoOrganizacion=codigo_organizacion)
- 
-                
-                Progreso.objects.filter(estudiante__in=estudiantes, curso_id__in=cursos_ids).delete()
-                pruebas = Prueba.objects.filter(curso_id__in=cursos_ids)
-                EstudiantePrueba.objects.filter(estudiante__in=estudiantes, prueba__in=pruebas).delete()
-                subcursos = Subcurso.objects.filter(curso_id__in=cursos_ids)
-                EstudianteSubcurso.objects.filter(estudiante__in=estudiantes, subcurso__in=subcursos).delete()
-                modulos = Modulo.objects.filter(subcurso__in=subcursos)
-                EstudianteModulo.objects.filter(estudiante__in=estudiantes, modulo__in=modulos).delete()
- 
-                
+                cursos_ids = list(contratos.values_list('curso_id', flat=True))
                 contratos.delete()
- 
-                return Response({"message": "Contratos y registros relacionados eliminados exitosamente."}, status=status.HTTP_200_OK)
+                tarea = CascadaInscripciones.crear_tarea(codigo_organizacion, cursos_ids, solicitante=request.user)
+
+            return _respuesta_cascada(
+                CascadaInscripciones.iniciar(tarea, _es_asincrono(request)),
+                "Contratos y registros relacionados eliminados exitosamente."
+            )
  
         except Exception as e:
             return Response({"error": f"Ocurrió un error: {str(e)}"}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
@@ -433,6 +521,7 @@ class ModificarInstructorAPIView(APIView):
 
             
             contratos = Contrato.objects.filter(instructor=instructor_anterior)
+            MetricasDiarias.marcar(contratos.values_list('codigoOrganizacion', flat=True))
             contratos.update(instructor=nuevo_instructor)
 
            
@@ -624,6 +713,85 @@ class RegistroEstudianteAPIView(APIView):
             )
 
 
+
+class ImportarEstudiantesAPIView(APIView):
+    """
+    API para importar en bloque los estudiantes de un código de organización desde un archivo CSV o JSONL.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+    parser_classes = [MultiPartParser, FormParser]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Importa estudiantes desde un archivo CSV (con encabezado) o JSONL con los campos "
+            "email, first_name, last_name y password, y los inscribe en los cursos del código de organización. "
+            "Los errores se informan por número de fila."
+        ),
+        manual_parameters=[
+            openapi.Parameter('archivo', openapi.IN_FORM, type=openapi.TYPE_FILE, required=True, description='Archivo CSV o JSONL'),
+            openapi.Parameter('codigoOrganizacion', openapi.IN_FORM, type=openapi.TYPE_STRING, required=True, description='Código de organización'),
+            openapi.Parameter('formato', openapi.IN_FORM, type=openapi.TYPE_STRING, description="'csv' o 'jsonl' (por defecto se deduce de la extensión)"),
+        ],
+        responses={
+            200: openapi.Response(
+                'Resumen de la importación',
+                openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'procesadas': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'creados': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'errores': openapi.Schema(
+                            type=openapi.TYPE_ARRAY,
+                            items=openapi.Schema(
+                                type=openapi.TYPE_OBJECT,
+                                properties={
+                                    'fila': openapi.Schema(type=openapi.TYPE_INTEGER),
+                                    'email': openapi.Schema(type=openapi.TYPE_STRING),
+                                    'error': openapi.Schema(type=openapi.TYPE_STRING),
+                                }
+                            )
+                        ),
+                    }
+                )
+            ),
+            400: 'Error en los datos enviados.',
+            403: 'El usuario no es administrador ni instructor, o el código no es de sus contratos.',
+        }
+    )
+    def post(self, request):
+        if request.user.rol not in ('admin', 'instructor'):
+            return Response({"error": "No tiene permisos para importar estudiantes."}, status=status.HTTP_403_FORBIDDEN)
+
+        archivo = request.FILES.get('archivo')
+        codigo_organizacion = request.data.get('codigoOrganizacion')
+        if not archivo or not codigo_organizacion:
+            return Response(
+                {"error": "Los campos 'archivo' y 'codigoOrganizacion' son requeridos."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if _codigos_del_instructor(request.user, codigo_organizacion) == set():
+            return Response(
+                {"error": "No tiene contratos con ese código de organización."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        try:
+            formato = ImportacionEstudiantes.detectar_formato(archivo.name, request.data.get('formato'))
+            importacion = ImportacionEstudiantes(codigo_organizacion)
+        except ValidationError as e:
+            return Response({"error": e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            resumen = importacion.importar(archivo, formato)
+        except (UnicodeDecodeError, csv.Error) as e:
+            return Response(
+                {"error": f"El archivo no es un {formato.upper()} válido en UTF-8: {e}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        return Response(resumen, status=status.HTTP_200_OK)
+
 class LoginView(APIView):
     permission_classes = [AllowAny]
 
@@ -859,6 +1027,37 @@ class SubcursoViewSet(viewsets.ModelViewSet):
     serializer_class = SubcursoSerializer
     permission_classes = [IsAuthenticated]
 
+
+class DashboardEstudianteAPIView(APIView):
+    """
+    API con todo el dashboard del estudiante autenticado en una sola llamada: sus cursos con los
+    subcursos, los módulos y su avance, el estado de la prueba y del certificado. La respuesta
+    lleva ETag; con `If-None-Match` y el dashboard sin cambios se devuelve 304.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Dashboard del estudiante autenticado: curso → subcursos → módulos, prueba y certificado.",
+        responses={
+            200: "Cursos del estudiante con su avance",
+            304: "El dashboard no cambió desde la versión indicada en If-None-Match",
+            403: "El usuario no es estudiante",
+        }
+    )
+    def get(self, request):
+        if request.user.rol != 'estudiante':
+            return Response({"error": "Solo los estudiantes tienen dashboard."}, status=status.HTTP_403_FORBIDDEN)
+
+        cursos = DashboardEstudiante(request.user.id, request).construir()
+        etag = DashboardEstudiante.etag(cursos)
+        condicional = get_conditional_response(request, etag=etag)
+        response = condicional if condicional is not None else Response({"cursos": cursos}, status=status.HTTP_200_OK)
+        response['ETag'] = etag
+        patch_cache_control(response, private=True, no_cache=True)
+        return response
+
+
 class SubcursosPorCursoAPIView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
@@ -1021,41 +1220,7 @@ class ContratoAPIView(APIView):
 
                 
                 estudiantes = Estudiante.objects.filter(codigoOrganizacion=codigo_organizacion)
-
-                
-                progreso_records = []
-                estudiante_prueba_records = []
-                estudiante_subcurso_records = []
-                estudiante_modulo_records = []
-
-                for estudiante in estudiantes:
-                    progreso_records.append(
-                        Progreso(estudiante=estudiante, curso_id=curso_id, completado=False, porcentajeCompletado=0)
-                    )
-			  
-
-                    pruebas = Prueba.objects.filter(curso_id=curso_id)
-                    for prueba in pruebas:
-                        estudiante_prueba_records.append(
-                            EstudiantePrueba(estudiante=estudiante, prueba=prueba)
-                        )
-
-                    subcursos = Subcurso.objects.filter(curso_id=curso_id)
-                    for subcurso in subcursos:
-                        estudiante_subcurso_records.append(
-                            EstudianteSubcurso(estudiante=estudiante, subcurso=subcurso, completado=False, porcentajeCompletado=0.0)
-                        )
-
-                        modulos = Modulo.objects.filter(subcurso=subcurso)
-                        for modulo in modulos:
-                            estudiante_modulo_records.append(
-                                EstudianteModulo(estudiante=estudiante, modulo=modulo, completado=False)
-                            )
-
-                Progreso.objects.bulk_create(progreso_records)
-                EstudiantePrueba.objects.bulk_create(estudiante_prueba_records)
-                EstudianteSubcurso.objects.bulk_create(estudiante_subcurso_records)
-                EstudianteModulo.objects.bulk_create(estudiante_modulo_records)
+                InscripcionService.inscribir(estudiantes.values_list('id', flat=True), [curso_id])
 
             return Response({"message": "Relación creada exitosamente."}, status=status.HTTP_201_CREATED)
         except IntegrityError:
@@ -1071,11 +1236,13 @@ class ContratoAPIView(APIView):
                 'codigoOrganizacion': openapi.Schema(type=openapi.TYPE_STRING, description='Código de organización del contrato'),
                 'instructor': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID del instructor'),
                 'curso': openapi.Schema(type=openapi.TYPE_INTEGER, description='ID del curso'),
+                'asincrono': openapi.Schema(type=openapi.TYPE_BOOLEAN, description="Elimina las inscripciones en segundo plano y responde 202 con la tarea (opcional)"),
             },
             required=['codigoOrganizacion', 'instructor', 'curso']
         ),
         responses={
             200: openapi.Response('Relación eliminada exitosamente.'),
+            202: "Eliminación de inscripciones en curso; consulte el avance en /api/tareas-eliminacion/<id>/.",
             400: 'Error en los datos enviados.',
             404: 'Relación no encontrada.',
         }
@@ -1100,24 +1267,13 @@ class ContratoAPIView(APIView):
                     instructor_id=instructor_id,
                     curso_id=curso_id
                 )
-																		
-
-                
-                estudiantes = Estudiante.objects.filter(codigoOrganizacion=codigo_organizacion)
-
-               
-                Progreso.objects.filter(estudiante__in=estudiantes, curso_id=curso_id).delete()
-                pruebas = Prueba.objects.filter(curso_id=curso_id)
-                EstudiantePrueba.objects.filter(estudiante__in=estudiantes, prueba__in=pruebas).delete()
-                subcursos = Subcurso.objects.filter(curso_id=curso_id)
-                EstudianteSubcurso.objects.filter(estudiante__in=estudiantes, subcurso__in=subcursos).delete()
-                modulos = Modulo.objects.filter(subcurso__in=subcursos)
-                EstudianteModulo.objects.filter(estudiante__in=estudiantes, modulo__in=modulos).delete()
-
-               
                 relacion.delete()
+                tarea = CascadaInscripciones.crear_tarea(codigo_organizacion, [curso_id], solicitante=request.user)
 
-            return Response({"message": "Relación eliminada exitosamente."}, status=status.HTTP_200_OK)
+            return _respuesta_cascada(
+                CascadaInscripciones.iniciar(tarea, _es_asincrono(request)),
+                "Relación eliminada exitosamente."
+            )
         except Contrato.DoesNotExist:
             return Response(
                 {"error": "La relación entre el instructor, el curso, y el código de organización no fue encontrada."},
@@ -1196,8 +1352,19 @@ class ProgresoViewSet(viewsets.ModelViewSet):
         """
         estudiante_id = self.request.query_params.get('estudiante_id')  
         if estudiante_id:
+            ColaProgreso.vaciar(estudiante_id)
             return Progreso.objects.filter(estudiante_id=estudiante_id)
         return super().get_queryset()  
+
+    def get_object(self):
+        """
+        Fuerza el recálculo pendiente del registro antes de devolverlo.
+        """
+        progreso = super().get_object()
+        if ColaProgreso.modo_diferido():
+            ColaProgreso.vaciar(progreso.estudiante_id, progreso.curso_id)
+            progreso.refresh_from_db()
+        return progreso
    
     @swagger_auto_schema(
         operation_description="Actualiza el campo `simulacionCompletada` de un registro de progreso basado en `estudiante_id` y `curso_id`.",
@@ -1239,8 +1406,13 @@ class ProgresoViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_404_NOT_FOUND
             )
 
+        completada_antes = progreso.simulacionCompletada
         progreso.simulacionCompletada = simulacion_completada
-        progreso.save()
+        with transaction.atomic():
+            progreso.save()
+            completada = Progreso._meta.get_field('simulacionCompletada').to_python(simulacion_completada)
+            if completada and not completada_antes:
+                EventosAvance.registrar(EventoAvance.SIMULACION, [(progreso.estudiante_id, progreso.curso_id, None)])
         serializer = ProgresoSerializer(progreso)
 
         return Response(serializer.data, status=status.HTTP_200_OK)
@@ -1299,7 +1471,7 @@ class EmitirCertificadoAPIView(APIView):
             required=['estudiante_id', 'curso_id']
         ),
         responses={
-            201: openapi.Response("Certificado emitido exitosamente."),
+            201: openapi.Response("Certificado emitido exitosamente; el PDF se genera en segundo plano."),
             200: openapi.Response("El certificado ya ha sido emitido."),
             400: openapi.Response("Error en los datos o progreso incompleto."),
             404: openapi.Response("Estudiante o curso no encontrado."),
@@ -1323,14 +1495,75 @@ class EmitirCertificadoAPIView(APIView):
             return Response({"error": "Curso no encontrado."}, status=status.HTTP_404_NOT_FOUND)
 
         
+        ColaProgreso.vaciar(estudiante.id, curso.id)
         resultado = Certificado.emitir_certificado(estudiante, curso)
         if resultado == "El estudiante no ha completado el curso.":
             return Response({"error": resultado}, status=status.HTTP_400_BAD_REQUEST)
         if resultado == "El certificado ya ha sido emitido.":
-            return Response({"message": resultado}, status=status.HTTP_200_OK)
+            estado = Certificado.objects.filter(estudiante=estudiante, curso=curso).values_list('estado', flat=True).first()
+            return Response({"message": resultado, "estado": estado}, status=status.HTTP_200_OK)
 
-        return Response({"message": resultado}, status=status.HTTP_201_CREATED)
+        return Response({"message": resultado, "estado": "pendiente"}, status=status.HTTP_201_CREATED)
         
+class EmisionMasivaCertificadosAPIView(APIView):
+    """
+    API para emitir los certificados de todos los estudiantes de un código de organización que
+    completaron sus cursos (por ejemplo, al finalizar un contrato).
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Emite en bloque los certificados pendientes de un código de organización. "
+            "Los certificados ya listos no se regeneran, así que la operación se puede repetir para retomarla."
+        ),
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'codigoOrganizacion': openapi.Schema(type=openapi.TYPE_STRING, description='Código de organización'),
+                'curso_ids': openapi.Schema(
+                    type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_INTEGER),
+                    description='Limitar la emisión a estos cursos (opcional)'
+                ),
+            },
+            required=['codigoOrganizacion']
+        ),
+        responses={
+            200: openapi.Response(
+                'Resumen de la emisión',
+                openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'elegibles': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'emitidos': openapi.Schema(type=openapi.TYPE_INTEGER),
+                        'segundos': openapi.Schema(type=openapi.TYPE_NUMBER),
+                        'certificados_por_segundo': openapi.Schema(type=openapi.TYPE_NUMBER),
+                        'errores': openapi.Schema(type=openapi.TYPE_ARRAY, items=openapi.Schema(type=openapi.TYPE_OBJECT)),
+                    }
+                )
+            ),
+            400: 'Error en los datos enviados.',
+            403: 'El usuario no es administrador.',
+        }
+    )
+    def post(self, request):
+        if request.user.rol != 'admin':
+            return Response({"error": "No tiene permisos para emitir certificados en bloque."}, status=status.HTTP_403_FORBIDDEN)
+
+        codigo_organizacion = request.data.get('codigoOrganizacion')
+        curso_ids = request.data.get('curso_ids')
+        if not codigo_organizacion:
+            return Response({"error": "El campo 'codigoOrganizacion' es requerido."}, status=status.HTTP_400_BAD_REQUEST)
+        if curso_ids is not None and (
+            not isinstance(curso_ids, list)
+            or not all(isinstance(curso_id, int) and not isinstance(curso_id, bool) for curso_id in curso_ids)
+        ):
+            return Response({"error": "El campo 'curso_ids' debe ser una lista de enteros."}, status=status.HTTP_400_BAD_REQUEST)
+
+        resumen = EmisionMasivaCertificados(codigo_organizacion, curso_ids=curso_ids).emitir()
+        return Response(resumen, status=status.HTTP_200_OK)
+
 class PruebaViewSet(viewsets.ModelViewSet):
     queryset = Prueba.objects.all()
     authentication_classes = [JWTAuthentication]
@@ -1420,7 +1653,8 @@ class PruebaViewSet(viewsets.ModelViewSet):
             )
 
         
-        tiene_prueba = Prueba.objects.filter(curso_id=curso_id).exists()
+        estructura = EstructuraCurso.obtener(curso_id)
+        tiene_prueba = bool(estructura and estructura['pruebas'])
 
         return Response(
             {
@@ -1488,6 +1722,19 @@ class CertificadoAPIView(APIView):
         ],
         responses={
             200: "Certificado PDF enviado como respuesta",
+            206: "Rango de bytes del PDF (cabecera Range)",
+            304: "El PDF no cambió desde la versión indicada en If-None-Match / If-Modified-Since",
+            202: openapi.Response(
+                "El PDF del certificado aún se está generando; reintentar más tarde",
+                openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'message': openapi.Schema(type=openapi.TYPE_STRING),
+                        'estado': openapi.Schema(type=openapi.TYPE_STRING, description="pendiente"),
+                        'intentos': openapi.Schema(type=openapi.TYPE_INTEGER),
+                    }
+                )
+            ),
             400: openapi.Response(
                 "Faltan parámetros",
                 openapi.Schema(
@@ -1519,6 +1766,7 @@ class CertificadoAPIView(APIView):
                 status=status.HTTP_400_BAD_REQUEST
             )
 
+        ColaProgreso.vaciar(estudiante_id, curso_id)
         try:
             certificado = Certificado.objects.get(curso_id=curso_id, estudiante_id=estudiante_id)
         except Certificado.DoesNotExist:
@@ -1527,7 +1775,19 @@ class CertificadoAPIView(APIView):
                 status=status.HTTP_404_NOT_FOUND
             )
 
-       
+        if certificado.estado == 'pendiente':
+            response = Response(
+                {"message": "El certificado se está generando.", "estado": certificado.estado, "intentos": certificado.intentos},
+                status=status.HTTP_202_ACCEPTED
+            )
+            response['Retry-After'] = '2'
+            return response
+        if certificado.estado == 'fallido':
+            return Response(
+                {"error": "No se pudo generar el certificado.", "estado": certificado.estado, "detalle": certificado.error},
+                status=status.HTTP_500_INTERNAL_SERVER_ERROR
+            )
+
         if not certificado.archivoPdf:
             return Response(
                 {"error": "El certificado no tiene un archivo PDF asociado."},
@@ -1535,12 +1795,8 @@ class CertificadoAPIView(APIView):
             )
 
        
-        pdf_path = certificado.archivoPdf.path
         try:
-            with open(pdf_path, 'rb') as pdf_file:
-                response = HttpResponse(pdf_file.read(), content_type='application/pdf')
-                response['Content-Disposition'] = f'attachment; filename="{certificado.archivoPdf.name}"'
-                return response
+            return servir_archivo(request, certificado.archivoPdf, content_type='application/pdf')
         except FileNotFoundError:
             return Response(
                 {"error": "El archivo PDF no se encontró en el servidor."},
@@ -1548,6 +1804,183 @@ class CertificadoAPIView(APIView):
             )
         
 
+class VerificarCertificadoAPIView(APIView):
+    """
+    API pública para verificar la autenticidad de un certificado por su código de verificación o
+    por el SHA-256 de su PDF. Solo consulta la base de datos (búsqueda por índice).
+    """
+    authentication_classes = []
+    permission_classes = [AllowAny]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Verifica un certificado por el código impreso en el PDF (ruta) o por el SHA-256 del archivo "
+            "(parámetro `sha256`). Las respuestas se pueden cachear."
+        ),
+        manual_parameters=[
+            openapi.Parameter('sha256', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="SHA-256 del PDF"),
+        ],
+        responses={
+            200: openapi.Response(
+                "Certificado válido",
+                openapi.Schema(
+                    type=openapi.TYPE_OBJECT,
+                    properties={
+                        'valido': openapi.Schema(type=openapi.TYPE_BOOLEAN),
+                        'codigoVerificacion': openapi.Schema(type=openapi.TYPE_STRING),
+                        'estudiante': openapi.Schema(type=openapi.TYPE_STRING),
+                        'curso': openapi.Schema(type=openapi.TYPE_STRING),
+                        'fechaEmision': openapi.Schema(type=openapi.TYPE_STRING, format='date'),
+                        'sha256': openapi.Schema(type=openapi.TYPE_STRING),
+                    }
+                )
+            ),
+            400: "Falta el código o el SHA-256",
+            404: "No existe un certificado emitido con ese código o SHA-256",
+        }
+    )
+    def get(self, request, codigo=None):
+        sha256 = (request.query_params.get('sha256') or '').strip().lower()
+        certificados = Certificado.objects.filter(estado='listo')
+        if codigo:
+            certificados = certificados.filter(codigoVerificacion=codigo.replace('-', '').replace(' ', '').upper())
+        elif sha256:
+            certificados = certificados.filter(hashPdf=sha256)
+        else:
+            return Response(
+                {"error": "Se requiere el código de verificación o el parámetro 'sha256'."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        certificado = certificados.values(
+            'codigoVerificacion', 'hashPdf', 'fechaEmision',
+            'estudiante__first_name', 'estudiante__last_name', 'curso__titulo',
+        ).first()
+        if certificado is None:
+            response = Response({"valido": False, "error": "Certificado no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+            patch_cache_control(response, public=True, max_age=getattr(settings, 'VERIFICACION_CACHE_NO_ENCONTRADO', 60))
+            return response
+
+        response = Response({
+            "valido": True,
+            "codigoVerificacion": certificado['codigoVerificacion'],
+            "estudiante": f"{certificado['estudiante__first_name']} {certificado['estudiante__last_name']}",
+            "curso": certificado['curso__titulo'],
+            "fechaEmision": certificado['fechaEmision'],
+            "sha256": certificado['hashPdf'],
+        }, status=status.HTTP_200_OK)
+        patch_cache_control(response, public=True, max_age=getattr(settings, 'VERIFICACION_CACHE', 3600))
+        return response
+
+
+class ExportarCertificadosZipAPIView(APIView):
+    """
+    API para descargar en un ZIP todos los certificados de un código de organización y/o un curso.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Descarga un ZIP con los certificados listos de un código de organización y/o un curso. "
+            "El archivo se genera mientras se descarga."
+        ),
+        manual_parameters=[
+            openapi.Parameter('codigoOrganizacion', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Código de organización"),
+            openapi.Parameter('curso_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="ID del curso"),
+        ],
+        responses={
+            200: "ZIP con un PDF por certificado, agrupados por curso",
+            400: "Falta el código de organización o el curso",
+            403: "El usuario no es administrador ni instructor del código de organización o del curso",
+        }
+    )
+    def get(self, request):
+        if request.user.rol not in ('admin', 'instructor'):
+            return Response({"error": "No tiene permisos para exportar certificados."}, status=status.HTTP_403_FORBIDDEN)
+
+        codigo_organizacion = request.query_params.get('codigoOrganizacion')
+        curso_id = request.query_params.get('curso_id')
+        if not codigo_organizacion and not curso_id:
+            return Response(
+                {"error": "Se requiere el parámetro 'codigoOrganizacion' o 'curso_id'."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if curso_id and not curso_id.isdigit():
+            return Response({"error": "El parámetro 'curso_id' debe ser numérico."}, status=status.HTTP_400_BAD_REQUEST)
+
+        codigos = _codigos_del_instructor(request.user, codigo_organizacion, curso_id)
+        if codigos is not None and not codigos:
+            return Response(
+                {"error": "No tiene contratos con ese código de organización o curso."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        exportacion = ExportacionCertificados(codigo_organizacion, curso_id, codigos=codigos)
+        nombre = get_valid_filename(f"certificados_{codigo_organizacion or ''}_{curso_id or ''}".rstrip('_'))
+        response = StreamingHttpResponse(exportacion.generar(), content_type='application/zip')
+        response['Content-Disposition'] = f'attachment; filename="{nombre}.zip"'
+        return response
+
+
+class ExportarNominaAPIView(APIView):
+    """
+    API para descargar en CSV o XLSX la nómina de un código de organización y/o un curso, con el
+    avance, la prueba, la simulación y el certificado de cada estudiante en cada curso.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Descarga la nómina con una fila por estudiante y curso. El archivo se genera mientras se descarga."
+        ),
+        manual_parameters=[
+            openapi.Parameter('codigoOrganizacion', openapi.IN_QUERY, type=openapi.TYPE_STRING, description="Código de organización"),
+            openapi.Parameter('curso_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="ID del curso"),
+            openapi.Parameter('formato', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              enum=list(ExportacionNomina.FORMATOS), description="Formato del archivo (por defecto, csv)"),
+        ],
+        responses={
+            200: "Archivo CSV o XLSX",
+            400: "Parámetros inválidos",
+            403: "El usuario no es administrador ni instructor del código de organización",
+        }
+    )
+    def get(self, request):
+        if request.user.rol not in ('admin', 'instructor'):
+            return Response({"error": "No tiene permisos para exportar la nómina."}, status=status.HTTP_403_FORBIDDEN)
+
+        codigo_organizacion = request.query_params.get('codigoOrganizacion')
+        curso_id = request.query_params.get('curso_id')
+        formato = request.query_params.get('formato') or 'csv'
+        if not codigo_organizacion and not curso_id:
+            return Response(
+                {"error": "Se requiere el parámetro 'codigoOrganizacion' o 'curso_id'."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if curso_id and not curso_id.isdigit():
+            return Response({"error": "El parámetro 'curso_id' debe ser numérico."}, status=status.HTTP_400_BAD_REQUEST)
+        if formato not in ExportacionNomina.FORMATOS:
+            return Response(
+                {"error": f"Formato inválido. Opciones: {', '.join(ExportacionNomina.FORMATOS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        # El instructor solo exporta estudiantes de sus propios códigos de organización.
+        codigos = _codigos_del_instructor(request.user, codigo_organizacion, curso_id)
+        if codigos is not None and not codigos:
+            return Response(
+                {"error": "No tiene contratos con ese código de organización o curso."},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        exportacion = ExportacionNomina(codigo_organizacion, curso_id, codigos=codigos)
+        nombre = get_valid_filename(f"nomina_{codigo_organizacion or ''}_{curso_id or ''}".rstrip('_'))
+        response = StreamingHttpResponse(exportacion.generar(formato), content_type=ExportacionNomina.FORMATOS[formato])
+        response['Content-Disposition'] = f'attachment; filename="{nombre}.{formato}"'
+        return response
+
+
 class ActualizarEstudiantePruebaAPIView(APIView):
     """
     API para actualizar los campos de un registro de EstudiantePrueba.
@@ -1593,10 +2026,16 @@ class ActualizarEstudiantePruebaAPIView(APIView):
  
         estudiante_prueba.intento += 1
         estudiante_prueba.fechaPrueba = date.today()
+        aprobado_antes = estudiante_prueba.estaAprobado
  
         serializer = EstudiantePruebaSerializer(estudiante_prueba, data=request.data, partial=True)
         if serializer.is_valid():
-            serializer.save()  
+            with transaction.atomic():
+                serializer.save()
+                if estudiante_prueba.estaAprobado and not aprobado_antes:
+                    EventosAvance.registrar(
+                        EventoAvance.PRUEBA, [(estudiante_id, estudiante_prueba.prueba.curso_id, estudiante_prueba.prueba_id)]
+                    )
             return Response(serializer.data, status=status.HTTP_200_OK)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -1689,9 +2128,13 @@ class ResponderPruebaAPIView(APIView):
                 calificacion_total += puntos_por_pregunta
 
        
+        aprobado_antes = estudiante_prueba.estaAprobado
         estudiante_prueba.calificacion = calificacion_total
         estudiante_prueba.estaAprobado = calificacion_total >= 60 
-        estudiante_prueba.save()
+        with transaction.atomic():
+            estudiante_prueba.save()
+            if estudiante_prueba.estaAprobado and not aprobado_antes:
+                EventosAvance.registrar(EventoAvance.PRUEBA, [(estudiante_id, estudiante_prueba.prueba.curso_id, prueba_id)])
 
         return Response({
             "calificacion": estudiante_prueba.calificacion,
@@ -1900,7 +2343,11 @@ class ActualizarContratosAPIView(APIView):
     API para actualizar múltiples contratos asociados a un `codigoOrganizacion`.
     """
     @swagger_auto_schema(
-        operation_description="Actualiza todos los contratos asociados a un código de organización.",
+        operation_description=(
+            "Actualiza todos los contratos asociados a un código de organización. "
+            "Al desactivarlos, las inscripciones se archivan (o eliminan, según CONTRATOS_DESACTIVACION); "
+            "al reactivarlos, se restauran desde el archivo."
+        ),
         request_body=openapi.Schema(
             type=openapi.TYPE_OBJECT,
             properties={
@@ -1916,11 +2363,13 @@ class ActualizarContratosAPIView(APIView):
                     description="Nueva fecha de fin de capacitación (opcional)"
                 ),
                 'activo': openapi.Schema(type=openapi.TYPE_BOOLEAN, description="Estado del contrato (opcional)"),
+                'asincrono': openapi.Schema(type=openapi.TYPE_BOOLEAN, description="Archiva, elimina o restaura las inscripciones en segundo plano y responde 202 con la tarea (opcional)"),
             },
             required=['codigoOrganizacion']
         ),
         responses={
             200: "Contratos actualizados exitosamente.",
+            202: "Eliminación de inscripciones en curso; consulte el avance en /api/tareas-eliminacion/<id>/.",
             400: "Error en los datos enviados.",
             500: "Error interno del servidor.",
 										 
@@ -1947,8 +2396,9 @@ class ActualizarContratosAPIView(APIView):
                     )
 
                 
-                cursos_ids = contratos.values_list('curso_id', flat=True)
-                estudiantes = Estudiante.objects.filter(codigoOrganizacion=codigo_organizacion)
+                desactivados = list(contratos.filter(activo=True).values_list('curso_id', flat=True))
+                reactivados = list(contratos.filter(activo=False).values_list('curso_id', flat=True))
+                tarea = None
 
                 for contrato in contratos:
                     if fecha_inicio:
@@ -1957,17 +2407,24 @@ class ActualizarContratosAPIView(APIView):
                         contrato.fechaFinCapacitacion = fecha_fin
                     if activo is not None:
                         contrato.activo = activo
-                        if not activo:  
-                            Progreso.objects.filter(estudiante__in=estudiantes, curso_id__in=cursos_ids).delete()
-                            pruebas = Prueba.objects.filter(curso_id__in=cursos_ids)
-                            EstudiantePrueba.objects.filter(estudiante__in=estudiantes, prueba__in=pruebas).delete()
-                            subcursos = Subcurso.objects.filter(curso_id__in=cursos_ids)
-                            EstudianteSubcurso.objects.filter(estudiante__in=estudiantes, subcurso__in=subcursos).delete()
-                            modulos = Modulo.objects.filter(subcurso__in=subcursos)
-                            EstudianteModulo.objects.filter(estudiante__in=estudiantes, modulo__in=modulos).delete()
                     contrato.save()
 
-                return Response({"message": "Contratos actualizados exitosamente."}, status=status.HTTP_200_OK)
+                if activo is not None and not activo and desactivados:
+                    tarea = CascadaInscripciones.crear_tarea(
+                        codigo_organizacion, desactivados, CascadaInscripciones.operacion_desactivacion(),
+                        solicitante=request.user,
+                    )
+                elif activo and reactivados:
+                    tarea = CascadaInscripciones.crear_tarea(
+                        codigo_organizacion, reactivados, 'restaurar', solicitante=request.user
+                    )
+
+            if tarea is not None:
+                return _respuesta_cascada(
+                    CascadaInscripciones.iniciar(tarea, _es_asincrono(request)),
+                    "Contratos actualizados exitosamente."
+                )
+            return Response({"message": "Contratos actualizados exitosamente."}, status=status.HTTP_200_OK)
 														   
 																							  
 								
@@ -1980,15 +2437,40 @@ class ActualizarContratosAPIView(APIView):
 														
 
 
-class ContratosPorInstructorAPIView(APIView):
+
+class TareaEliminacionAPIView(APIView):
     """
-    API para obtener todos los contratos asociados al ID del instructor, agrupados por código de organización.
+    API para consultar el avance de una eliminación de inscripciones. Un instructor solo puede
+    consultar las tareas que solicitó o las de los códigos de sus contratos.
     """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
     @swagger_auto_schema(
-        operation_description="Obtiene todos los contratos asociados al ID de un instructor, agrupados por código de organización.",
-        manual_parameters=[
-            openapi.Parameter(
-                'instructor_id',
+        operation_description="Obtiene el estado y el avance de una tarea de eliminación de inscripciones.",
+        responses={
+            200: TareaEliminacionSerializer,
+            403: "El usuario no es administrador ni instructor, o la tarea no es de sus códigos.",
+            404: "Tarea no encontrada.",
+        }
+    )
+    def get(self, request, pk):
+        if request.user.rol not in ('admin', 'instructor'):
+            return Response({"error": "No tiene permisos para consultar tareas de eliminación."}, status=status.HTTP_403_FORBIDDEN)
+        tarea = get_object_or_404(TareaEliminacion, pk=pk)
+        if tarea.solicitante_id != request.user.id and _codigos_del_instructor(request.user, tarea.codigoOrganizacion) == set():
+            return Response({"error": "No tiene permisos para consultar esta tarea."}, status=status.HTTP_403_FORBIDDEN)
+        return Response(TareaEliminacionSerializer(tarea).data, status=status.HTTP_200_OK)
+
+class ContratosPorInstructorAPIView(APIView):
+    """
+    API para obtener todos los contratos asociados al ID del instructor, agrupados por código de organización.
+    """
+    @swagger_auto_schema(
+        operation_description="Obtiene todos los contratos asociados al ID de un instructor, agrupados por código de organización.",
+        manual_parameters=[
+            openapi.Parameter(
+                'instructor_id',
                 openapi.IN_QUERY,
                 description="ID del instructor",
                 type=openapi.TYPE_INTEGER,
@@ -2041,242 +2523,118 @@ class ContratosPorInstructorAPIView(APIView):
  
  
 class GeneralMetricsAPIView(APIView):
+    """
+    Métricas generales, opcionalmente filtradas por ?empresa_id= y ?curso_id=.
+    Las cifras de estudiantes, certificados y pruebas se leen de `MetricaDiaria` con una consulta.
+    """
+    @cachear_metricas('metricas_general', ('MetricaDiaria', 'Contrato', 'Instructor', 'Empresa', 'Curso'))
     def get(self, request):
-        from django.utils.timezone import now
-        from django.db.models import Q
- 
         empresa_id = request.query_params.get('empresa_id')
         curso_id = request.query_params.get('curso_id')
         fecha_actual = now().date()
- 
-        
-        contrato_filter = Q()
-        if empresa_id:
-            contrato_filter &= Q(instructor__empresa_id=empresa_id)
-        if curso_id:
-            contrato_filter &= Q(curso__id=curso_id)
- 
-       
-        contratos_filtrados = Contrato.objects.filter(contrato_filter).distinct()
- 
-       
-        cursos_filtrados_ids = contratos_filtrados.values_list('curso_id', flat=True)
-        codigos_org_filtrados = contratos_filtrados.values_list('codigoOrganizacion', flat=True)
- 
-        
-        total_estudiantes = Estudiante.objects.filter(codigoOrganizacion__in=codigos_org_filtrados).distinct().count()
- 
-       
+
         if empresa_id:
-            total_instructores = Instructor.objects.filter(empresa_id=empresa_id).count()
+            general = (Q(empresa_id=empresa_id), MetricaDiaria.ALCANCE_EMPRESA)
         else:
-            total_instructores = Instructor.objects.count()
- 
-       
-        total_empresas = Empresa.objects.count()
-        total_cursos = Curso.objects.count()
- 
-        
-        total_certificados = Certificado.objects.filter(
-            Q(curso_id__in=cursos_filtrados_ids) |
-            Q(estudiante__codigoOrganizacion__in=codigos_org_filtrados)
-        ).count()
- 
-       
-        total_pruebas = EstudiantePrueba.objects.filter(
-            prueba__curso_id__in=cursos_filtrados_ids
-        ).count()
- 
-        pruebas_aprobadas = EstudiantePrueba.objects.filter(
-            estaAprobado=True,
-            prueba__curso_id__in=cursos_filtrados_ids
-        ).count()
- 
-       
-        instructores_activos_qs = Instructor.objects.filter(
+            general = (Q(), MetricaDiaria.ALCANCE_CODIGO)
+        metricas = MetricasDiarias.totales({'general': general}, curso_id=curso_id)['general']
+
+        instructores = Instructor.objects.all()
+        if empresa_id:
+            instructores = instructores.filter(empresa_id=empresa_id)
+        contrato_activo = Q(
             cursos_asignados__fechaInicioCapacitacion__lte=fecha_actual,
-            cursos_asignados__fechaFinCapacitacion__gte=fecha_actual
+            cursos_asignados__fechaFinCapacitacion__gte=fecha_actual,
         )
-        if empresa_id:
-            instructores_activos_qs = instructores_activos_qs.filter(empresa_id=empresa_id)
         if curso_id:
-            instructores_activos_qs = instructores_activos_qs.filter(
-                cursos_asignados__curso_id=curso_id
-            )
-        instructores_activos = instructores_activos_qs.distinct().count()
- 
-       
-        contratos_activos_filtrados = contratos_filtrados.filter(
-            fechaInicioCapacitacion__lte=fecha_actual,
-            fechaFinCapacitacion__gte=fecha_actual
+            contrato_activo &= Q(cursos_asignados__curso_id=curso_id)
+        instructores = instructores.aggregate(
+            total=Count('id', distinct=True),
+            activos=Count('id', distinct=True, filter=contrato_activo),
         )
-        codigos_activos = contratos_activos_filtrados.values_list('codigoOrganizacion', flat=True)
-        estudiantes_activos = Estudiante.objects.filter(
-            codigoOrganizacion__in=codigos_activos
-        ).distinct().count()
- 
-        
+
         tasa_certificacion = (
-            (total_certificados / total_estudiantes) * 100 if total_estudiantes > 0 else 0
+            (metricas['certificados'] / metricas['estudiantes']) * 100 if metricas['estudiantes'] > 0 else 0
         )
         tasa_aprobacion = (
-            (pruebas_aprobadas / total_pruebas) * 100 if total_pruebas > 0 else 0
+            (metricas['pruebas_aprobadas'] / metricas['pruebas']) * 100 if metricas['pruebas'] > 0 else 0
         )
- 
+
         data = {
-            "total_estudiantes": total_estudiantes,
-            "total_instructores": total_instructores,
-            "total_empresas": total_empresas,
-            "total_cursos": total_cursos,
-            "total_certificados": total_certificados,
+            "total_estudiantes": metricas['estudiantes'],
+            "total_instructores": instructores['total'],
+            "total_empresas": Empresa.objects.count(),
+            "total_cursos": Curso.objects.count(),
+            "total_certificados": metricas['certificados'],
             "tasa_certificacion": round(tasa_certificacion, 2),
-            "total_pruebas": total_pruebas,
-            "pruebas_aprobadas": pruebas_aprobadas,
+            "total_pruebas": metricas['pruebas'],
+            "pruebas_aprobadas": metricas['pruebas_aprobadas'],
             "tasa_aprobacion": round(tasa_aprobacion, 2),
-            "instructores_activos": instructores_activos,
-            "estudiantes_activos": estudiantes_activos,
+            "instructores_activos": instructores['activos'],
+            "estudiantes_activos": metricas['estudiantes_activos'],
         }
         return Response(data)
- 
+
+
 class InstructorGeneralMetricsAPIView(APIView):
     """
     API para obtener métricas de UN instructor vs. las métricas generales de su empresa.
     Recibe como parámetro: ?instructor_id=123
     """
+    @cachear_metricas('metricas_instructor', ('MetricaDiaria', 'Contrato', 'Instructor', 'Empresa', 'Curso'))
     def get(self, request):
-        
         instructor_id = request.query_params.get('instructor_id', None)
         if not instructor_id:
             return Response({"error": "Debes proporcionar ?instructor_id="}, status=400)
-       
-        
-        instructor = get_object_or_404(Instructor, id=instructor_id)
-       
-        
+
+        instructor = get_object_or_404(Instructor.objects.select_related('empresa'), id=instructor_id)
         empresa = instructor.empresa
-        fecha_actual = now().date()
-       
-        
-        contratos_instructor = Contrato.objects.filter(instructor=instructor).distinct()
-       
-        cursos_instructor_ids = contratos_instructor.values_list('curso_id', flat=True)
-        codigos_org_instructor = contratos_instructor.values_list('codigoOrganizacion', flat=True)
-       
-        total_estudiantes_instructor = Estudiante.objects.filter(
-            codigoOrganizacion__in=codigos_org_instructor
-        ).distinct().count()
-       
-        total_certificados_instructor = Certificado.objects.filter(
-            Q(curso_id__in=cursos_instructor_ids) |
-            Q(estudiante__codigoOrganizacion__in=codigos_org_instructor)
-        ).count()
-       
-        total_pruebas_instructor = EstudiantePrueba.objects.filter(
-            prueba__curso_id__in=cursos_instructor_ids
-        ).count()
-       
-        pruebas_aprobadas_instructor = EstudiantePrueba.objects.filter(
-            estaAprobado=True,
-            prueba__curso_id__in=cursos_instructor_ids
-        ).count()
-       
-       
-        contratos_activos_instructor = contratos_instructor.filter(
-            fechaInicioCapacitacion__lte=fecha_actual,
-            fechaFinCapacitacion__gte=fecha_actual
-        )
-        codigos_activos_instructor = contratos_activos_instructor.values_list('codigoOrganizacion', flat=True)
-        estudiantes_activos_instructor = Estudiante.objects.filter(
-            codigoOrganizacion__in=codigos_activos_instructor
-        ).distinct().count()
-       
-        
-        tasa_certificacion_instructor = (
-            (total_certificados_instructor / total_estudiantes_instructor) * 100
-            if total_estudiantes_instructor > 0 else 0
-        )
-        tasa_aprobacion_instructor = (
-            (pruebas_aprobadas_instructor / total_pruebas_instructor) * 100
-            if total_pruebas_instructor > 0 else 0
-        )
-       
-        
-        contratos_empresa = Contrato.objects.filter(instructor__empresa=empresa).distinct()
-       
-        cursos_empresa_ids = contratos_empresa.values_list('curso_id', flat=True)
-        codigos_org_empresa = contratos_empresa.values_list('codigoOrganizacion', flat=True)
-       
-        total_estudiantes_empresa = Estudiante.objects.filter(
-            codigoOrganizacion__in=codigos_org_empresa
-        ).distinct().count()
-       
-        total_instructores_empresa = Instructor.objects.filter(empresa=empresa).count()
-       
-        total_certificados_empresa = Certificado.objects.filter(
-            Q(curso_id__in=cursos_empresa_ids) |
-            Q(estudiante__codigoOrganizacion__in=codigos_org_empresa)
-        ).count()
-       
-        total_pruebas_empresa = EstudiantePrueba.objects.filter(
-            prueba__curso_id__in=cursos_empresa_ids
-        ).count()
-       
-        pruebas_aprobadas_empresa = EstudiantePrueba.objects.filter(
-            estaAprobado=True,
-            prueba__curso_id__in=cursos_empresa_ids
-        ).count()
-       
-        contratos_activos_empresa = contratos_empresa.filter(
-            fechaInicioCapacitacion__lte=fecha_actual,
-            fechaFinCapacitacion__gte=fecha_actual
-        )
-        codigos_activos_empresa = contratos_activos_empresa.values_list('codigoOrganizacion', flat=True)
-        estudiantes_activos_empresa = Estudiante.objects.filter(
-            codigoOrganizacion__in=codigos_activos_empresa
-        ).distinct().count()
-       
-        tasa_certificacion_empresa = (
-            (total_certificados_empresa / total_estudiantes_empresa) * 100
-            if total_estudiantes_empresa > 0 else 0
-        )
-        tasa_aprobacion_empresa = (
-            (pruebas_aprobadas_empresa / total_pruebas_empresa) * 100
-            if total_pruebas_empresa > 0 else 0
-        )
-       
-       
-        total_cursos_empresa = Curso.objects.filter(id__in=cursos_empresa_ids).count()
- 
+
+        metricas = MetricasDiarias.totales({
+            'instructor': (Q(instructor_id=instructor.id), MetricaDiaria.ALCANCE_INSTRUCTOR),
+            'empresa': (Q(empresa_id=empresa.id), MetricaDiaria.ALCANCE_EMPRESA),
+        })
+
+        def tasas(medidas):
+            return {
+                "tasa_certificacion": round(
+                    (medidas['certificados'] / medidas['estudiantes']) * 100 if medidas['estudiantes'] > 0 else 0, 2
+                ),
+                "tasa_aprobacion": round(
+                    (medidas['pruebas_aprobadas'] / medidas['pruebas']) * 100 if medidas['pruebas'] > 0 else 0, 2
+                ),
+            }
+
+        del_instructor = metricas['instructor']
+        de_empresa = metricas['empresa']
         data = {
             "instructor_metrics": {
                 "instructor_id": instructor_id,
                 "instructor_email": instructor.email,
                 "empresa_id": empresa.id,
                 "empresa_nombre": empresa.nombre,
-                "total_estudiantes": total_estudiantes_instructor,
-                "total_certificados": total_certificados_instructor,
-                "total_pruebas": total_pruebas_instructor,
-                "pruebas_aprobadas": pruebas_aprobadas_instructor,
-                "estudiantes_activos": estudiantes_activos_instructor,
-                "tasa_certificacion": round(tasa_certificacion_instructor, 2),
-                "tasa_aprobacion": round(tasa_aprobacion_instructor, 2),
+                "total_estudiantes": del_instructor['estudiantes'],
+                "total_certificados": del_instructor['certificados'],
+                "total_pruebas": del_instructor['pruebas'],
+                "pruebas_aprobadas": del_instructor['pruebas_aprobadas'],
+                "estudiantes_activos": del_instructor['estudiantes_activos'],
+                **tasas(del_instructor),
             },
             "empresa_metrics": {
                 "nombre_empresa": empresa.nombre,
-                "total_instructores": total_instructores_empresa,
-                "total_estudiantes": total_estudiantes_empresa,
-                "total_certificados": total_certificados_empresa,
-                "total_pruebas": total_pruebas_empresa,
-                "pruebas_aprobadas": pruebas_aprobadas_empresa,
-                "estudiantes_activos": estudiantes_activos_empresa,
-                "tasa_certificacion": round(tasa_certificacion_empresa, 2),
-                "tasa_aprobacion": round(tasa_aprobacion_empresa, 2),
-                "total_cursos": total_cursos_empresa,
+                "total_instructores": Instructor.objects.filter(empresa=empresa).count(),
+                "total_estudiantes": de_empresa['estudiantes'],
+                "total_certificados": de_empresa['certificados'],
+                "total_pruebas": de_empresa['pruebas'],
+                "pruebas_aprobadas": de_empresa['pruebas_aprobadas'],
+                "estudiantes_activos": de_empresa['estudiantes_activos'],
+                **tasas(de_empresa),
+                "total_cursos": Curso.objects.filter(instructores_asignados__instructor__empresa=empresa).distinct().count(),
             }
         }
-       
+
         return Response(data, status=status.HTTP_200_OK)
- 
+
 class InstructorCursosTasaFinalizacionAPIView(APIView):
     """
     API para ver la tasa de finalización de los cursos de UN instructor
@@ -2356,6 +2714,7 @@ class InstructorCursosTasaFinalizacionAPIView(APIView):
         }
     )
 
+    @cachear_metricas('metricas_instructor_finalizacion', ('Progreso', 'Contrato', 'Instructor', 'Curso'))
     def get(self, request):
         
         instructor_id = request.query_params.get('instructor_id', None)
@@ -2421,6 +2780,7 @@ class FilteredMetricsAPIView(APIView):
     """
     API para métricas con filtros.
     """
+    @cachear_metricas('metricas_filtro', ('Estudiante', 'Certificado', 'EstudiantePrueba', 'Curso'))
     def get(self, request):
         empresa_id = request.query_params.get('empresa_id', None)
         curso_id = request.query_params.get('curso_id', None)
@@ -2463,6 +2823,267 @@ class FilteredMetricsAPIView(APIView):
  
 
  
+class DashboardAdministradorAPIView(APIView):
+    """
+    API que devuelve en una sola respuesta todas las cifras del dashboard del administrador
+    (las de los endpoints de totales, promedios, tasas y distribución por empresa).
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description=(
+            "Cifras del dashboard del administrador con los filtros opcionales `empresa_id` y `curso_id`. "
+            "La cabecera `X-Query-Count` indica cuántas consultas SQL se usaron."
+        ),
+        manual_parameters=[
+            openapi.Parameter('empresa_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="ID de la empresa"),
+            openapi.Parameter('curso_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="ID del curso"),
+        ],
+        responses={200: "Cifras del dashboard", 400: "Filtro no numérico", 404: "Empresa o curso no encontrado"}
+    )
+    @cachear_metricas('dashboard_administrador', (
+        'Progreso', 'Certificado', 'EstudiantePrueba', 'Contrato', 'Estudiante', 'Instructor', 'Empresa', 'Curso',
+    ))
+    def get(self, request):
+        error = _error_no_numericos(request.query_params, ('empresa_id', 'curso_id'))
+        if error:
+            return error
+        empresa_id = request.query_params.get('empresa_id')
+        curso_id = request.query_params.get('curso_id')
+
+        with contar_consultas() as contador:
+            data = MetricasDashboard(empresa_id, curso_id).calcular()
+        if data is None:
+            return Response({"error": "Empresa o curso no encontrado."}, status=status.HTTP_404_NOT_FOUND)
+
+        response = Response(data, status=status.HTTP_200_OK)
+        response['X-Query-Count'] = str(contador['consultas'])
+        return response
+
+
+class MetricasAgrupadasAPIView(APIView):
+    """
+    API de métricas agrupadas por empresa, curso, instructor o código de organización, ordenadas
+    y paginadas. Cada página se obtiene con una sola consulta GROUP BY sobre `MetricaDiaria`.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Métricas agrupadas, ordenadas y paginadas.",
+        manual_parameters=[
+            openapi.Parameter('group_by', openapi.IN_QUERY, type=openapi.TYPE_STRING, required=True,
+                              enum=list(MetricasAgrupadas.GRUPOS), description="Campo por el que se agrupa"),
+            openapi.Parameter('metric', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="Métricas separadas por comas: " + ", ".join(MetricasAgrupadas.METRICAS)),
+            openapi.Parameter('ordering', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              description="'nombre' o una métrica solicitada; con '-' es descendente"),
+            openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Página (desde 1)"),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description=f"Grupos por página (máximo {TAMANO_PAGINA_MAXIMO})"),
+            openapi.Parameter('empresa_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="ID de la empresa"),
+            openapi.Parameter('curso_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="ID del curso"),
+        ],
+        responses={200: "Página de grupos", 400: "Parámetros inválidos", 404: "Página inválida"}
+    )
+    @cachear_metricas('metricas_agrupadas', ('MetricaDiaria', 'Empresa', 'Curso', 'Instructor'))
+    def get(self, request):
+        parametros = request.query_params
+        error = _error_no_numericos(parametros, ('empresa_id', 'curso_id', 'page', 'page_size'))
+        if error:
+            return error
+        metricas = [metrica.strip() for metrica in parametros.get('metric', '').split(',') if metrica.strip()]
+        try:
+            agrupadas = MetricasAgrupadas(
+                parametros.get('group_by'), metricas, parametros.get('ordering'),
+                empresa_id=parametros.get('empresa_id'), curso_id=parametros.get('curso_id'),
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        numero, tamano = _pagina_solicitada(parametros)
+        total, resultados, tamano = agrupadas.pagina(numero, tamano)
+        return _respuesta_paginada(request, numero, tamano, total, resultados)
+
+
+class EstadisticasCacheMetricasAPIView(APIView):
+    """
+    API que devuelve los aciertos y fallos de la caché de cada endpoint de métricas.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    def get(self, request):
+        return Response(CacheMetricas.estadisticas(), status=status.HTTP_200_OK)
+
+
+class TendenciasAvanceAPIView(APIView):
+    """
+    API de tendencias: cantidad de módulos, pruebas, simulaciones o cursos completados por día o
+    por semana, por curso, empresa u objeto (módulo o prueba), a partir de `EventoAvance`.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Serie temporal de avances completados.",
+        manual_parameters=[
+            openapi.Parameter('tipo', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(EventosAvance.TIPOS),
+                              description="Tipo de avance (por defecto, curso)"),
+            openapi.Parameter('intervalo', openapi.IN_QUERY, type=openapi.TYPE_STRING, enum=list(EventosAvance.INTERVALOS),
+                              description="Agrupación por día o por semana (por defecto, dia)"),
+            openapi.Parameter('desde', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE,
+                              description=f"Fecha inicial (por defecto, {EventosAvance.DIAS_POR_DEFECTO} días antes de la final)"),
+            openapi.Parameter('hasta', openapi.IN_QUERY, type=openapi.TYPE_STRING, format=openapi.FORMAT_DATE,
+                              description="Fecha final (por defecto, hoy)"),
+            openapi.Parameter('curso_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="ID del curso"),
+            openapi.Parameter('empresa_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="ID de la empresa"),
+            openapi.Parameter('objeto_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description="ID del módulo o de la prueba"),
+        ],
+        responses={200: "Serie temporal", 400: "Parámetros inválidos"}
+    )
+    @cachear_metricas('tendencias', ('EventoAvance',))
+    def get(self, request):
+        parametros = request.query_params
+        error = _error_no_numericos(parametros, ('curso_id', 'empresa_id', 'objeto_id'))
+        if error:
+            return error
+        try:
+            desde = parse_date(parametros['desde']) if parametros.get('desde') else None
+            hasta = parse_date(parametros['hasta']) if parametros.get('hasta') else None
+        except ValueError:
+            desde = hasta = None
+        if (parametros.get('desde') and desde is None) or (parametros.get('hasta') and hasta is None):
+            return Response({"error": "Las fechas deben tener el formato AAAA-MM-DD."}, status=status.HTTP_400_BAD_REQUEST)
+
+        tipo = parametros.get('tipo') or 'curso'
+        intervalo = parametros.get('intervalo') or 'dia'
+        try:
+            serie = EventosAvance.tendencias(
+                tipo, desde, hasta, intervalo,
+                curso_id=parametros.get('curso_id'), empresa_id=parametros.get('empresa_id'),
+                objeto=parametros.get('objeto_id'),
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            "tipo": tipo,
+            "intervalo": intervalo,
+            "total": sum(punto['cantidad'] for punto in serie),
+            "serie": serie,
+        }, status=status.HTTP_200_OK)
+
+
+class RankingInstructoresAPIView(APIView):
+    """
+    API con el ranking de instructores de una empresa o de toda la plataforma por tasa de
+    certificación, tasa de aprobación o progreso promedio, leído de `RankingInstructor`.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Ranking paginado de instructores.",
+        manual_parameters=[
+            openapi.Parameter('metrica', openapi.IN_QUERY, type=openapi.TYPE_STRING,
+                              enum=list(RankingInstructores.METRICAS), description="Métrica del ranking (por defecto, certificacion)"),
+            openapi.Parameter('empresa_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description="ID de la empresa; sin él, ranking de toda la plataforma"),
+            openapi.Parameter('page', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="Página (desde 1)"),
+            openapi.Parameter('page_size', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description=f"Instructores por página (máximo {TAMANO_PAGINA_MAXIMO})"),
+        ],
+        responses={200: "Página del ranking", 400: "Parámetros inválidos", 404: "Página inválida"}
+    )
+    @cachear_metricas('ranking_instructores', ('RankingInstructor', 'Instructor', 'Empresa'))
+    def get(self, request):
+        parametros = request.query_params
+        error = _error_no_numericos(parametros, ('empresa_id', 'page', 'page_size'))
+        if error:
+            return error
+        numero, tamano = _pagina_solicitada(parametros)
+        try:
+            total, resultados, tamano = RankingInstructores.pagina(
+                parametros.get('metrica') or 'certificacion', parametros.get('empresa_id'), numero, tamano
+            )
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        return _respuesta_paginada(request, numero, tamano, total, resultados)
+
+
+class ComparacionInstructorAPIView(APIView):
+    """
+    API con las cifras y posiciones de un instructor frente a las de su empresa, leídas de
+    `RankingInstructor` con una sola consulta. Un instructor solo puede consultar las suyas.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(
+        operation_description="Cifras y posiciones del instructor frente a su empresa.",
+        manual_parameters=[
+            openapi.Parameter('instructor_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER,
+                              description="ID del instructor (por defecto, el usuario autenticado)"),
+        ],
+        responses={200: "Comparación", 400: "Parámetros inválidos", 403: "Sin permisos", 404: "Instructor no encontrado"}
+    )
+    def get(self, request):
+        instructor_id = request.query_params.get('instructor_id') or str(request.user.id)
+        if not instructor_id.isdigit():
+            return Response({"error": "El parámetro instructor_id debe ser numérico."}, status=status.HTTP_400_BAD_REQUEST)
+        if request.user.rol != 'admin' and int(instructor_id) != request.user.id:
+            return Response({"error": "No tiene permisos para ver este instructor."}, status=status.HTTP_403_FORBIDDEN)
+
+        del_instructor, de_empresa = RankingInstructores.comparacion(instructor_id)
+        if del_instructor is None:
+            instructor = get_object_or_404(Instructor, id=instructor_id)
+            RankingInstructores.actualizar([instructor.empresa_id])
+            del_instructor, de_empresa = RankingInstructores.comparacion(instructor_id)
+
+        def cifras(fila):
+            return {
+                "total_estudiantes": fila.estudiantes,
+                "total_certificados": fila.certificados,
+                "total_pruebas": fila.pruebas,
+                "pruebas_aprobadas": fila.pruebasAprobadas,
+                "tasa_certificacion": fila.tasaCertificacion,
+                "tasa_aprobacion": fila.tasaAprobacion,
+                "progreso_promedio": fila.progresoPromedio,
+            }
+
+        return Response({
+            "instructor": {
+                "instructor_id": del_instructor.instructor_id,
+                "instructor_email": del_instructor.instructor.email,
+                **cifras(del_instructor),
+                "posicion_empresa": {
+                    "certificacion": del_instructor.posicionEmpresaCertificacion,
+                    "aprobacion": del_instructor.posicionEmpresaAprobacion,
+                    "progreso": del_instructor.posicionEmpresaProgreso,
+                },
+                "posicion_global": {
+                    "certificacion": del_instructor.posicionCertificacion,
+                    "aprobacion": del_instructor.posicionAprobacion,
+                    "progreso": del_instructor.posicionProgreso,
+                },
+            },
+            "empresa": {
+                "empresa_id": de_empresa.empresa_id,
+                "nombre_empresa": de_empresa.empresa.nombre,
+                "total_instructores": de_empresa.instructores,
+                **cifras(de_empresa),
+                "posicion_entre_empresas": {
+                    "certificacion": de_empresa.posicionCertificacion,
+                    "aprobacion": de_empresa.posicionAprobacion,
+                    "progreso": de_empresa.posicionProgreso,
+                },
+            },
+            "fecha_actualizacion": del_instructor.fechaActualizacion,
+        }, status=status.HTTP_200_OK)
+
+
 class EmpresasTotalesAPIView(APIView):
  
     authentication_classes = [JWTAuthentication]
@@ -2471,6 +3092,7 @@ class EmpresasTotalesAPIView(APIView):
     """
     API para obtener el número total de empresas registradas.
     """
+    @cachear_metricas('empresas_total', ('Empresa',))
     def get(self, request):
         total_empresas = Empresa.objects.count()
         return Response({"total_empresas": total_empresas}, status=status.HTTP_200_OK)
@@ -2480,6 +3102,7 @@ class UsuariosTotalesAPIView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAdminUser]
  
+    @cachear_metricas('usuarios_total', ('Estudiante', 'Instructor', 'Contrato', 'Empresa'))
     def get(self, request):
         empresa_id = request.query_params.get('empresa_id')
  
@@ -2516,6 +3139,7 @@ class CursosTotalesAPIView(APIView):
     """
     API para obtener el número total de cursos registrados, con opción de filtrar por empresa.
     """
+    @cachear_metricas('cursos_total', ('Curso', 'Contrato', 'Instructor', 'Empresa'))
     def get(self, request):
         empresa_id = request.query_params.get('empresa_id')
        
@@ -2531,6 +3155,7 @@ class ProgresoPromedioAPIView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAdminUser]
  
+    @cachear_metricas('progreso_promedio', ('Progreso', 'Contrato', 'Empresa', 'Curso'))
     def get(self, request):
         empresa_id = request.query_params.get('empresa_id')
         curso_id = request.query_params.get('curso_id')
@@ -2565,6 +3190,7 @@ class SimulacionesCompletadasAPIView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAdminUser]
    
+    @cachear_metricas('simulaciones_completadas', ('Progreso', 'Contrato', 'Empresa', 'Curso'))
     def get(self, request):
         empresa_id = request.query_params.get('empresa_id')
         curso_id = request.query_params.get('curso_id')
@@ -2607,6 +3233,7 @@ class TasaCertificacionAPIView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAdminUser]
    
+    @cachear_metricas('tasa_certificacion', ('Certificado', 'Estudiante', 'Contrato', 'Instructor', 'Empresa', 'Curso'))
     def get(self, request):
         empresa_id = request.query_params.get('empresa_id')
         curso_id = request.query_params.get('curso_id')
@@ -2633,6 +3260,7 @@ class TasaAprobacionPruebasAPIView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAdminUser]
  
+    @cachear_metricas('tasa_aprobacion', ('EstudiantePrueba', 'Contrato', 'Empresa', 'Curso'))
     def get(self, request):
         empresa_id = request.query_params.get('empresa_id')
         curso_id = request.query_params.get('curso_id')
@@ -2675,25 +3303,12 @@ class EstudiantesPorEmpresaAPIView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAdminUser]
  
+    @cachear_metricas('estudiantes_empresa', ('Estudiante', 'Contrato', 'Empresa'))
     def get(self, request):
         """
         API para obtener el número total de estudiantes asociados a cada empresa.
         """
-        empresas = Empresa.objects.all()
-        data = {}
- 
-        for empresa in empresas:
-            
-            codigos_organizacion = Contrato.objects.filter(
-                instructor__empresa=empresa
-            ).values_list('codigoOrganizacion', flat=True).distinct()
- 
-            
-            total_estudiantes = Estudiante.objects.filter(codigoOrganizacion__in=codigos_organizacion).count()
- 
-          
-            data[empresa.nombre] = total_estudiantes
- 
+        data = {nombre: estudiantes for nombre, _, estudiantes in MetricasDashboard().empresas().values()}
         return Response(data, status=status.HTTP_200_OK)
  
    
@@ -2706,6 +3321,7 @@ class InstructoresPorEmpresaAPIView(APIView):
     """
     API para obtener el total de instructores registrados por empresa.
     """
+    @cachear_metricas('instructores_empresa', ('Instructor', 'Empresa'))
     def get(self, request):
         instructores_por_empresa = Empresa.objects.annotate(total_instructores=models.Count('instructores'))
         data = {empresa.nombre: empresa.total_instructores for empresa in instructores_por_empresa}
@@ -2720,6 +3336,7 @@ class CursosTasaFinalizacionAPIView(APIView):
     API para obtener los cursos con mayor y menor tasa de finalización,
     con opción de filtrar por empresa.
     """
+    @cachear_metricas('cursos_tasa_finalizacion', ('Progreso', 'Contrato', 'Curso'))
     def get(self, request):
         from django.db.models import Avg
  
@@ -2767,6 +3384,37 @@ class CursosTasaFinalizacionAPIView(APIView):
         return Response(data, status=status.HTTP_200_OK)
  
  
+class DistribucionProgresoAPIView(APIView):
+    """
+    API con la distribución del progreso de cada curso: histograma en tramos de 10 %, percentiles
+    (p25, p50, p90) y progresos sin iniciar, en curso y completados.
+    """
+    authentication_classes = [JWTAuthentication]
+    permission_classes = [IsAdminUser]
+
+    @swagger_auto_schema(
+        operation_description="Distribución del progreso por curso, calculada en la base de datos.",
+        manual_parameters=[
+            openapi.Parameter('empresa_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="ID de la empresa"),
+            openapi.Parameter('instructor_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="ID del instructor"),
+            openapi.Parameter('curso_id', openapi.IN_QUERY, type=openapi.TYPE_INTEGER, description="ID del curso"),
+        ],
+        responses={200: "Distribución por curso", 400: "Parámetros inválidos"}
+    )
+    @cachear_metricas('progreso_distribucion', ('Progreso', 'Contrato', 'Curso', 'Estudiante'))
+    def get(self, request):
+        parametros = request.query_params
+        error = _error_no_numericos(parametros, ('empresa_id', 'instructor_id', 'curso_id'))
+        if error:
+            return error
+        distribucion = DistribucionProgreso(
+            empresa_id=parametros.get('empresa_id'),
+            instructor_id=parametros.get('instructor_id'),
+            curso_id=parametros.get('curso_id'),
+        )
+        return Response({"cursos": distribucion.calcular()}, status=status.HTTP_200_OK)
+
+
 class EstudianteSubcursoViewSet(viewsets.ModelViewSet):
     authentication_classes = [JWTAuthentication]
     queryset = EstudianteSubcurso.objects.all()
@@ -2830,8 +3478,8 @@ class EstudianteModuloViewSet(viewsets.ModelViewSet):
                 )
  
            
+            ProgresoService.actualizar_modulo(estudiante_id, modulo_id, completado)
             estudiante_modulo.completado = completado
-            estudiante_modulo.save()
  
             
             serializer = self.get_serializer(estudiante_modulo)
@@ -2847,6 +3495,86 @@ class EstudianteModuloViewSet(viewsets.ModelViewSet):
                 {"error": f"Ocurrió un error inesperado: {str(e)}"},
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR,
             )
+
+    @swagger_auto_schema(
+        operation_description="Actualiza en lote el estado de completado de varios módulos, para uno o varios estudiantes, recalculando una sola vez cada subcurso y curso afectado.",
+        request_body=openapi.Schema(
+            type=openapi.TYPE_OBJECT,
+            properties={
+                'estudiante_id': openapi.Schema(type=openapi.TYPE_INTEGER, description="ID del estudiante (si todos los módulos son del mismo estudiante)"),
+                'modulos': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'modulo_id': openapi.Schema(type=openapi.TYPE_INTEGER, description="ID del módulo"),
+                            'completado': openapi.Schema(type=openapi.TYPE_BOOLEAN, description="Estado de completado"),
+                        },
+                        required=['modulo_id', 'completado']
+                    ),
+                    description="Módulos del estudiante indicado en `estudiante_id`"
+                ),
+                'registros': openapi.Schema(
+                    type=openapi.TYPE_ARRAY,
+                    items=openapi.Schema(
+                        type=openapi.TYPE_OBJECT,
+                        properties={
+                            'estudiante_id': openapi.Schema(type=openapi.TYPE_INTEGER, description="ID del estudiante"),
+                            'modulo_id': openapi.Schema(type=openapi.TYPE_INTEGER, description="ID del módulo"),
+                            'completado': openapi.Schema(type=openapi.TYPE_BOOLEAN, description="Estado de completado"),
+                        },
+                        required=['estudiante_id', 'modulo_id', 'completado']
+                    ),
+                    description="Módulos de varios estudiantes"
+                ),
+            }
+        ),
+        responses={
+            200: "Porcentajes actualizados de los subcursos y cursos afectados",
+            400: "Error en los datos enviados",
+        }
+    )
+    @action(detail=False, methods=['patch'], url_path='update-completion-batch')
+    def update_completion_batch(self, request):
+        """
+        Actualiza el estado de completado de varios registros EstudianteModulo en una sola transacción.
+        """
+        def entero(valor):
+            return (isinstance(valor, int) and not isinstance(valor, bool)) or (isinstance(valor, str) and valor.isdigit())
+
+        estudiante_id = request.data.get('estudiante_id')
+        registros = request.data.get('modulos') if estudiante_id is not None else request.data.get('registros')
+        if not registros or not isinstance(registros, list):
+            return Response(
+                {"error": "Se requiere `estudiante_id` con la lista `modulos`, o la lista `registros`."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        cambios = []
+        for registro in registros:
+            if not isinstance(registro, dict):
+                return Response(
+                    {"error": "Cada elemento de la lista debe ser un objeto."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            if estudiante_id is not None:
+                registro = dict(registro, estudiante_id=estudiante_id)
+            if not entero(registro.get('estudiante_id')) or not entero(registro.get('modulo_id')):
+                return Response(
+                    {"error": "Cada registro requiere 'estudiante_id' y 'modulo_id' enteros."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            completado = registro.get('completado')
+            if not isinstance(completado, bool):
+                return Response(
+                    {"error": "El campo 'completado' debe ser un valor booleano."},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            cambios.append((int(registro['estudiante_id']), int(registro['modulo_id']), completado))
+
+        resultado = ProgresoService.actualizar_modulos(cambios)
+        return Response(resultado, status=status.HTTP_200_OK)
+
     @swagger_auto_schema(
         operation_description="Verifica si un módulo está completo para un estudiante dado.",
         manual_parameters=[